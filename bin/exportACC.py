@@ -10,6 +10,7 @@ sys.path.insert(0, "/home/san/data/Turmschwingungen/src/library")
 
 from bikbox import *
 from LIDAR import *
+from store import *
 
 from glob import glob
 from math import sqrt, log
@@ -26,6 +27,9 @@ if __name__ == "__main__":
     parser.add_argument("-v", "--verbose", help="turn on detailed output", action="store_true")
     parser.add_argument("-i", "--input", help="input pickle file containing measurement data", type=str)
     parser.add_argument("-o", "--output", help="name of output csv file", type=str)
+    parser.add_argument("-s", "--store", help="campaign store directory, used as input instead of a pickle", type=str)
+    parser.add_argument("--start", help="start time, only used with --store", type=str)
+    parser.add_argument("--end", help="end time, only used with --store", type=str)
 
     # parse arguments
     args = parser.parse_args()
@@ -33,8 +37,8 @@ if __name__ == "__main__":
     if args.verbose: print("* verbose: on")
     if args.verbose: print("* TOMTool v{}".format(VERSION))
 
-    if not isfile(args.input):
-        raise Exception("please provide an input pickle file")
+    if not args.store and not (args.input and isfile(args.input)):
+        raise Exception("please provide an input pickle file or a store directory")
 
     if not args.output:
         raise Exception("please provide an output file name for data export")
@@ -42,10 +46,14 @@ if __name__ == "__main__":
     if args.output and args.verbose:
         print("* exporting csv to: {}".format(args.output))
 
-    data = pd.read_pickle(args.input)
+    if args.store:
+        # only the accelerations are read from the store
+        data = readStore(args.store, "tom", start=args.start, end=args.end, columns=['acc_x', 'acc_y', 'acc_z'])
+    else:
+        data = pd.read_pickle(args.input)
 
-    # keep only accelerations
-    data = data.loc[:, 'acc_x' : 'acc_z']
+        # keep only accelerations
+        data = data.loc[:, 'acc_x' : 'acc_z']
 
     if args.output:
         if path.isfile(args.output):
@@ -7,6 +7,7 @@ sys.path.insert(0, "../yasb")
 
 from bikbox import *
 from LIDAR import *
+from store import *
 
 from glob import glob
 from math import sqrt, log
@@ -32,6 +33,7 @@ if __name__ == "__main__":
     parser.add_argument("-w", "--waves", help="wave data pickle", type=str)
     parser.add_argument("-l", "--lidar", help="lidar data pickle", type=str)
     parser.add_argument("-t", "--tom", help="tom box data pickle", type=str)
+    parser.add_argument("--store", help="campaign store directory, used instead of the tom, wave and lidar pickles", type=str)
     parser.add_argument("--start", help="start time", type=str) 
     parser.add_argument("--end", help="end time", type=str) 
     parser.add_argument("--timezone", help="time zone of the data", default="Europe/Berlin")
@@ -45,13 +47,13 @@ if __name__ == "__main__":
     if args.verbose: print("* verbose: on")
     if args.verbose: print("* TOMTool v{}".format(VERSION))
 
-    if not args.tom:
+    if not args.tom and not args.store:
         raise Exception('*! please provide a tom pickle')
 
-    if not args.waves:
+    if not args.waves and not args.store:
         raise Exception('*! please provide a wave pickle file')
 
-    if not args.lidar:
+    if not args.lidar and not args.store:
         raise Exception('*! please provide a lidar pickle file')
 
     if not args.output:
@@ -73,27 +75,39 @@ if __name__ == "__main__":
     except Exception as e:
         print("*! failed to parse star time: {}".format(e))
 
-    try:
-        tom = pd.read_pickle(args.tom)
-    except Exception as e:
-        print ('*! failed to read in tom pickle: {}'.format(e)) 
-
-    try:
-        waves = pd.read_pickle(args.waves)
-    except Exception as e:
-        print ('*! failed to read in tom pickle: {}'.format(e))
- 
-    try:
-        lidar = pd.read_pickle(args.lidar)
-    except Exception as e:
-        print ('*! failed to read in tom pickle: {}'.format(e))
-
     # only keep neccessary value: pos_x, pos_y, pos_z, deflection, ws_3, dir_3, Hm0, Dirp, Tp, Tz
     
     wind_speed = "ws_{}".format(args.lidar_return_level)
     wind_dir = "dir_{}".format(args.lidar_return_level)
     wind_dir_corrected = "dir_{}_corr".format(args.lidar_return_level)
 
+    if args.store:
+        # read only the selected time range and the necessary columns from the store
+        tom = readStore(args.store, "integrated", start=start_time, end=end_time,
+                        columns=['pos_x', 'pos_y', 'pos_z', 'deflection'],
+                        timeZone=args.timezone, verbose=args.verbose)
+        waves = readStore(args.store, "waves", start=start_time, end=end_time,
+                          columns=['Hm0', 'Dirp', 'Sprp', 'Tz', 'Tp'],
+                          timeZone=args.timezone, verbose=args.verbose)
+        lidar = readStore(args.store, "lidar", start=start_time, end=end_time,
+                          columns=[wind_speed, wind_dir, wind_dir_corrected],
+                          timeZone=args.timezone, verbose=args.verbose)
+    else:
+        try:
+            tom = pd.read_pickle(args.tom)
+        except Exception as e:
+            print ('*! failed to read in tom pickle: {}'.format(e)) 
+
+        try:
+            waves = pd.read_pickle(args.waves)
+        except Exception as e:
+            print ('*! failed to read in tom pickle: {}'.format(e))
+     
+        try:
+            lidar = pd.read_pickle(args.lidar)
+        except Exception as e:
+            print ('*! failed to read in tom pickle: {}'.format(e))
+
     lidar = pd.DataFrame({'wind_speed' : lidar[wind_speed],
                           'wind_dir' : lidar[wind_dir],
                           'wind_dir_corr' : lidar[wind_dir_corrected],
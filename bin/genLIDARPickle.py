@@ -6,6 +6,7 @@ import sys
 sys.path.insert(0, "../yasb")
 
 from LIDAR import *
+from store import *
 
 from glob import glob
 from math import sqrt, log
@@ -28,6 +29,7 @@ if __name__ == "__main__":
     parser.add_argument("-og", "--output-global", help="used to export the global data frame", type=str)
     parser.add_argument("-i", "--input-dir", help="name of input directory", type=str)
     parser.add_argument("-j", "--procs", help="number of processor to use", type=int, default=8)
+    parser.add_argument("-s", "--store", help="campaign store directory, data is written to the store partitioned by day", type=str)
     parser.add_argument("-p", "--lidar-pattern", help="glob pattern to select the files containing lidar data. If not provided, genLIDARPickle defaults to *.csv", type=str, default="*.csv")
 
     # parse arguments
@@ -122,6 +124,12 @@ if __name__ == "__main__":
             data.to_pickle(exportPickle)
         except:
             print("*! failed to export data as pickles")
+    if args.store:
+        if args.verbose: print('* writing data to store: {}'.format(args.store))
+        try:
+            writeLIDAR(frames, args.store, verbose=args.verbose)
+        except Exception as e:
+            print('*! failed to write to store {}'.format(e))
     if args.output_global:
         if args.verbose: print('* saving global pickle')
         try:
@@ -10,6 +10,7 @@ sys.path.insert(0, "../yasb")
 
 from bikbox import *
 from LIDAR import *
+from store import *
 
 from glob import glob
 from math import sqrt, log
@@ -27,6 +28,7 @@ if __name__ == "__main__":
     parser.add_argument("-i", "--input", help="path to MSR log file", type=str)
     parser.add_argument("-o", "--output", help="name of output pickle file", type=str)
     parser.add_argument("-m", "--substract-mean", help="substract mean values from acceleration", action="store_true")
+    parser.add_argument("-s", "--store", help="campaign store directory, data is written to the store partitioned by day", type=str)
     parser.add_argument("-t", "--time-zone", help="time zone of time series", type=str, default='Europe/Berlin')
 
 
@@ -39,8 +41,8 @@ if __name__ == "__main__":
     if not isfile(args.input):
         raise Exception('please provide an input file')
 
-    if not args.output:
-        raise Exception("please provide an output file name for data export")
+    if not args.output and not args.store:
+        raise Exception("please provide an output file name or a store directory for data export")
 
     if args.output and args.verbose:
         print("* exporting pickle to: {}".format(args.output))
@@ -65,6 +67,14 @@ if __name__ == "__main__":
         print('* removing duplicate indices')
     data = data.loc[~data.index.duplicated(keep='first')]
 
+    if args.store:
+        if args.verbose: print("* writing data to store: {}".format(args.store))
+        try:
+            writeMSR(data, args.store, verbose=args.verbose)
+        except Exception as e:
+            print("*! failed to write to store!")
+            print("*! -> {}".format(e))
+
     if args.output:
         if path.isfile(args.output):
             print("*! file already exists, done")
@@ -10,6 +10,7 @@ sys.path.insert(0, "../yasb")
 
 from bikbox import *
 from LIDAR import *
+from store import *
 
 from glob import glob
 from math import sqrt, log
@@ -26,8 +27,13 @@ if __name__ == "__main__":
     parser.add_argument("-v", "--verbose", help="turn on detailed output", action="store_true")
     parser.add_argument("-i", "--input", help="input directory containing TOMBox log files", type=str)
     parser.add_argument("-o", "--output", help="name of output pickle file", type=str)
-    parser.add_argument("-j", "--procs", help="number of processors to use", type=int)
-    parser.add_argument("-m", "--substract-mean", help="substract mean values from acceleration", action="store_true")
+    parser.add_argument("-j", "--procs", help="number of processors to use, default is all available processors", type=int)
+    parser.add_argument("-m", "--substract-mean", help="substract mean values from acceleration: global (default if no value is given) or per log file (file)", nargs="?", const="global", choices=["global", "file"], default=False)
+    parser.add_argument("--cache", help="keep a binary cache (log_????.txt.npy) next to every log file and use it on later runs", action="store_true")
+    parser.add_argument("--shared-memory", help="return worker results via shared memory instead of pickling them", action="store_true")
+    parser.add_argument("--incremental", help="only parse new or changed log files and merge them into the existing output pickle, uses a manifest stored next to the output", action="store_true")
+    parser.add_argument("-s", "--store", help="campaign store directory, data is written to the store partitioned by day", type=str)
+    parser.add_argument("--memory-budget", help="memory budget in MB when streaming into a store without output pickle, default is 512 MB", default=512, type=float)
 
 
     # parse arguments
@@ -44,40 +50,102 @@ if __name__ == "__main__":
     if len(glob(path.join(args.input, "*.txt"))) == 0:
         raise Exception("could not find any *.txt file in {} -> exit".format(args.input))
 
-    if not args.output:
-        raise Exception("please provide an output file name for data export")
+    if not args.output and not args.store:
+        raise Exception("please provide an output file name or a store directory for data export")
 
 
     if args.output and args.verbose:
         print("* exporting pickle to: {}".format(args.output))
     
     if not args.procs:
-        args.procs=4
+        args.procs=availableCPUs()
 
     if not path.isdir(args.input):
         raise Exception("Please provide a valid input directory")
 
+    if args.incremental and not args.output:
+        raise Exception("incremental processing requires an output pickle")
+
     if args.verbose: print("* calling parallel processing function, using {} processors".format(args.procs))
 
-    data = processDataSet_parallel(
-            args.input,
-            nProcs=args.procs,
-            verbose=args.verbose,
-            substractMean=args.substract_mean,
-            )
+    if args.store and not args.output:
+        # stream the box directory into the store chunk by chunk with bounded memory
+        if args.substract_mean == "global":
+            print("*! substracting the global mean is not supported when streaming, use -m file, skipping")
+
+        for chunk in iterDataSet(args.input,
+                                 nProcs=args.procs,
+                                 memoryBudget=args.memory_budget * 2**20,
+                                 verbose=args.verbose,
+                                 cache=args.cache,
+                                 substractMean=args.substract_mean == "file" and "file",
+                                ):
+            if args.verbose: print("* writing chunk {} -> {} to store: {}".format(chunk.index[0], chunk.index[-1], args.store))
+            try:
+                writeTOM(chunk, args.store, verbose=args.verbose)
+            except Exception as e:
+                print("*! failed to write to store!")
+                print("*! -> {}".format(e))
+        exit()
+
+    if args.incremental:
+        manifestPath = "{}.manifest.json".format(args.output)
+        previous = None
+        if path.isfile(args.output) and path.isfile(manifestPath):
+            if args.verbose: print("* reading previous result: {}".format(args.output))
+            try:
+                previous = pd.read_pickle(args.output)
+            except Exception as e:
+                print("*! could not read previous result, rebuilding from scratch")
+                print("*! -> {}".format(e))
+        elif path.isfile(manifestPath):
+            print("*! previous result {} is missing, rebuilding from scratch".format(args.output))
+
+        if args.substract_mean == "global":
+            print("*! substracting the global mean is not supported in incremental mode, use -m file, skipping")
+
+        data, manifest = processDataSet_incremental(
+                args.input,
+                data=previous,
+                manifestPath=manifestPath,
+                nProcs=args.procs,
+                verbose=args.verbose,
+                substractMean=args.substract_mean,
+                )
+        if data is None:
+            raise Exception("could not find any data in {}".format(args.input))
+    else:
+        data = processDataSet_parallel(
+                args.input,
+                nProcs=args.procs,
+                verbose=args.verbose,
+                substractMean=args.substract_mean,
+                sharedMemory=args.shared_memory,
+                cache=args.cache,
+                )
 
     # remove duplicate indices
     if args.verbose:
         print('* removing duplicate indices')
     data = data.loc[~data.index.duplicated(keep='first')]
 
+    if args.store:
+        if args.verbose: print("* writing data to store: {}".format(args.store))
+        try:
+            writeTOM(data, args.store, verbose=args.verbose)
+        except Exception as e:
+            print("*! failed to write to store!")
+            print("*! -> {}".format(e))
+
     if args.output:
-        if path.isfile(args.output):
+        if path.isfile(args.output) and not args.incremental:
             print("*! file already exists, done")
             exit()
         else:
             try:
                 data.to_pickle(args.output)
+                if args.incremental:
+                    writeManifest(manifest, manifestPath)
             except Exception as e:
                 print("*! failed to export pickle!")
                 print("*! -> {}".format(e))
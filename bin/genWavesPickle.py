@@ -7,6 +7,7 @@ sys.path.insert(0, "../yasb")
 
 from bikbox import *
 from LIDAR import *
+from store import *
 
 from glob import glob
 from math import sqrt, log
@@ -26,6 +27,7 @@ if __name__ == "__main__":
     parser.add_argument("-i", "--input", help="input directory containing wave files", type=str)
     parser.add_argument("-o", "--output", help="name of output pickle file", type=str)
     parser.add_argument("-j", "--procs", help="number of processors to use", type=int)
+    parser.add_argument("-s", "--store", help="campaign store directory, data is written to the store partitioned by day", type=str)
     parser.add_argument("-g", "--glob", help="glob pattern to select wave files, default is *.xls*", default='*.xls*')
 
     # parse arguments
@@ -38,8 +40,8 @@ if __name__ == "__main__":
         if args.verbose: print("* setting input directory to cwd")
         args.input=path.curdir
 
-    if not args.output:
-        raise Exception("please provide an output pickle name")
+    if not args.output and not args.store:
+        raise Exception("please provide an output pickle name or a store directory")
     
     if not args.procs:
         args.procs=4
@@ -83,9 +85,17 @@ if __name__ == "__main__":
     waves.Hm0 = waves.Hm0.apply(lambda x: x/100.0)
     waves.Hmax = waves.Hmax.apply(lambda x: x/100.0)
 
-    try:
-        waves.to_pickle(args.output)
-    except Exception as e:
-        print('*! failed to export pickle file {} -> {}'.format(args.output, e))
+    if args.store:
+        if args.verbose: print('* writing data to store: {}'.format(args.store))
+        try:
+            writeWaves(waves, args.store, verbose=args.verbose)
+        except Exception as e:
+            print('*! failed to write to store {} -> {}'.format(args.store, e))
+
+    if args.output:
+        try:
+            waves.to_pickle(args.output)
+        except Exception as e:
+            print('*! failed to export pickle file {} -> {}'.format(args.output, e))
 
 
@@ -8,6 +8,8 @@ import sys
 sys.path.insert(0, "../yasb")
 
 from bikbox import *
+from store import *
+from stats import *
 
 from glob import glob
 from math import sqrt, log
@@ -24,7 +26,13 @@ if __name__ == "__main__":
     parser.add_argument("-v", "--verbose", help="turn on detailed output", action="store_true")
     parser.add_argument("-i", "--input", help="input file: tom box pickle", type=str)
     parser.add_argument("-o", "--output", help="name of output pickle file", type=str)
-    parser.add_argument("-j", "--procs", help="number of processors to use", type=int)
+    parser.add_argument("-j", "--procs", help="number of processors to use, default is all available processors", type=int)
+    parser.add_argument("--store", help="campaign store directory, used as input instead of a pickle", type=str)
+    parser.add_argument("--output-store", help="campaign store directory the integrated data is written to", type=str)
+    parser.add_argument("--start", help="start time, only used with --store", type=str)
+    parser.add_argument("--end", help="end time, only used with --store", type=str)
+    parser.add_argument("--timezone", help="time zone of start and end time, default is Europe/Berlin", default="Europe/Berlin")
+    parser.add_argument("--shared-memory", help="return worker results via shared memory instead of pickling them", action="store_true")
     parser.add_argument("--dry-run", help="if true, simulates exection without acutal data", default=False, action="store_true")
 
     # processing 
@@ -32,16 +40,36 @@ if __name__ == "__main__":
     parser.add_argument("-s", "--select-by", help="selection of data based on PARAMETER OPERATOR VALUE, where OPERATOR can be '==', '>', '<', '<=', '>='", default=False, type=tuple)
     parser.add_argument("--integrate", help="integration flag, default is True", default=True)
     parser.add_argument("--integration-interval", help="saddle point to restart integration to ensure numerical stability, default is 10min", default="10min", type=str)
+    parser.add_argument("--integration-engine", help="integration in the time domain (double cumulative trapezoid) or in the frequency domain (division by (i omega)^2, not available with --streaming), default is time", choices=["time", "frequency"], default="time")
+    parser.add_argument("--backend", help="integration backend: numpy (reference), numba (fused kernel, requires numba) or auto (numba if installed and applicable), default is numpy", choices=["numpy", "numba", "auto"], default="numpy")
+    parser.add_argument("--batched", help="integrate all integration intervals at once as a (windows, samples, axes) array in a single process", action="store_true")
+    parser.add_argument("--batch-size", help="batched only: number of integration intervals processed at once, default is 256", default=256, type=int)
+    parser.add_argument("--overlap", help="give every integration interval OVERLAP (e.g. 1min) of extra data on both sides and cross-fade neighbouring intervals, default is off", default=None, type=str)
+    parser.add_argument("--streaming", help="integrate chunk by chunk (chunks of --integration-interval) and carry the filter state over chunk borders", action="store_true")
+    parser.add_argument("--reset-interval", help="streaming only: restart the integration every RESET_INTERVAL to bound drift, default is 1h", default="1h", type=str)
     parser.add_argument("--resample", help="resample flag, default is True", default=True)
     parser.add_argument("--resample-interval", help="resample frequency, default is 33ms", default="33ms", type=str)
+    parser.add_argument("--resample-method", help="resampling onto the uniform grid: bfill, linear or nearest, default is bfill", choices=["bfill", "linear", "nearest"], default="bfill")
+    parser.add_argument("--max-gap", help="mark samples within gaps longer than MAX_GAP (e.g. 1s) and do not integrate over them, adds a gap column, default is off", default=None, type=str)
+    parser.add_argument("--detrend", help="remove the mean or a linear trend of every integration interval before filtering: mean or linear, default is off", choices=["mean", "linear"], default=None)
     parser.add_argument("--filter", help="filter flag, default is True", default=True)
     parser.add_argument("--filter-lower-frequency", help="lower cutoff filter frequency, default is 0.1 Hz", default=0.1, type=float)
     parser.add_argument("--filter-upper-frequency", help="upper cutoff filter frequency, default is 1 Hz", default=1, type=float)
     parser.add_argument("--filter-frequency", help="filter frequency, default is 30 Hz", default=30, type=float)
     parser.add_argument("--filter-order", help="filter order, dedfault is 3", default=3, type=int)
+    parser.add_argument("--filter-type", help="filter implementation: lfilter (transfer function), sos (second-order sections) or zerophase (forward-backward sos, not available with --streaming), default is lfilter", choices=["lfilter", "sos", "zerophase"], default="lfilter")
     parser.add_argument("--calculate-deflection", help="calculate acceleration magnitude, default is True", default=True)
-    parser.add_argument("--calculate-direction", help="calculate direction of oscillation, default is False", action="store_true", default=False)
-    parser.add_argument("--magnetic-correction", help="correction oscillation direction by using the magnetic field. EXPERIMENTAL!, default is False", action="store_true")
+    parser.add_argument("--calculate-direction", help="rotate the accelerations into the earth frame (roll, pitch, yaw) before integration and calculate the direction of oscillation, default is False", action="store_true", default=False)
+    parser.add_argument("--magnetic-correction", help="correction oscillation direction by using the magnetic field (tilt compensated heading instead of yaw). EXPERIMENTAL!, default is False", action="store_true")
+    parser.add_argument("--orientation", help="source of the frame rotation: the angles of the firmware or an estimate fused from the gyroscope, accelerometer and magnetometer (complementary or madgwick filter), default is firmware", choices=["firmware", "complementary", "madgwick"], default="firmware")
+    parser.add_argument("--orientation-interval", help="estimate the orientation of independent windows of the given length in parallel, default is 1h", default="1h")
+    parser.add_argument("--rotation-chunk-size", help="number of samples rotated at once, default is 262144", default=2**18, type=int)
+    parser.add_argument("--statistics", help="export per window statistics (mean, std, rms, min, max) of the positions and the deflection to the given pickle, computed within the integration workers")
+    parser.add_argument("--statistics-interval", help="window of the statistics, has to divide the integration interval, default is 10min", default="10min")
+    parser.add_argument("--percentiles", help="percentiles (0 - 100) added to the statistics", nargs="*", type=float, default=[])
+    parser.add_argument("--thresholds", help="thresholds of the exceedance counts added to the statistics", nargs="*", type=float, default=[])
+    parser.add_argument("--fatigue", help="export the damage equivalent loads (rainflow counting) of the positions and the deflection per --statistics-interval window to the given pickle")
+    parser.add_argument("--wohler-exponents", help="Wöhler exponents of the damage equivalent loads, default is 4", nargs="+", type=float, default=[4])
     parser.add_argument("--check-duplicate-indices", help="checks for duplicated indices", action="store_true")
 
     # parse arguments
@@ -50,26 +78,39 @@ if __name__ == "__main__":
     if args.verbose: print("* verbose: on")
     if args.verbose: print("* TOMTool v{}".format(VERSION))
 
-    if not args.input:
+    if not args.input and not args.store:
         raise Exception("*! please provide input data!")
 
-    if not path.isfile(args.input):
+    if args.input and not path.isfile(args.input):
         raise Exception("*! not valid file: {}".format(args.input))
 
-    if not args.output:
+    if not args.output and not args.output_store:
         raise Exception("*! please provide an output file name for data export")
 
     if args.output and args.verbose:
         print("* exporting pickle to: {}".format(args.output))
     
     if not args.procs:
-        args.procs=4
+        args.procs=availableCPUs()
     
 
     ### main logic
-    # read in pickle from genTOMPickle.py
+    # read in pickle from genTOMPickle.py or the accelerations from the store
     try:
-        data = pd.read_pickle(args.input)
+        if args.store:
+            data = readStore(args.store,
+                             "tom",
+                             start=args.start,
+                             end=args.end,
+                             columns=["acc_x", "acc_y", "acc_z"]
+                                     + (["roll", "pitch", "yaw"] if (args.calculate_direction or args.magnetic_correction) and args.orientation == "firmware" else [])
+                                     + (["mag_x", "mag_y", "mag_z"] if args.magnetic_correction or args.orientation != "firmware" else [])
+                                     + (["rot_x", "rot_y", "rot_z"] if args.orientation != "firmware" else []),
+                             timeZone=args.timezone,
+                             verbose=args.verbose,
+                            )
+        else:
+            data = pd.read_pickle(args.input)
     except Exception as e:
         print("*! could not read data")
         print("*! -> {}".format(e))
@@ -85,10 +126,77 @@ if __name__ == "__main__":
         if args.verbose: print("* checking for duplicate indices")
         data = data.loc[~data.index.duplicated(keep="first")]
 
+    # rotate the accelerations into the earth frame
+    if args.calculate_direction or args.magnetic_correction:
+        try:
+            quaternions = None
+            if args.orientation != "firmware":
+                quaternions = estimateOrientation_parallel(data,
+                                                           interval=args.orientation_interval,
+                                                           nProcs=args.procs,
+                                                           method=args.orientation,
+                                                           verbose=args.verbose,
+                                                          )
+            data = rotateToEarthFrame(data,
+                                      magneticCorrection=args.magnetic_correction,
+                                      quaternions=quaternions,
+                                      chunkSize=args.rotation_chunk_size,
+                                      verbose=args.verbose,
+                                     )
+        except Exception as e:
+            print("*! could not rotate data into the earth frame")
+            print("*! -> {}".format(e))
+            exit()
+
+    statistics = None
+    if args.statistics:
+        statistics = partial(windowStatistics,
+                             interval=args.statistics_interval,
+                             percentiles=args.percentiles,
+                             thresholds=args.thresholds,
+                            )
+
     if args.verbose: print("* calling parallel processing function, using {} processors".format(args.procs))
     # apply resampling, filtering and integration
 
-    if args.procs > 1:
+    if args.streaming:
+        if args.detrend:
+            print("*! detrending is not supported in streaming mode, skipping")
+        if args.integration_engine != "time":
+            print("*! only time domain integration is supported in streaming mode")
+        if args.resample_method != "bfill" or args.max_gap:
+            print("*! streaming mode resamples with bfill and restarts the integration after gaps, skipping --resample-method and --max-gap")
+        integral = applyIntegration_streaming(data,
+                                              verbose=args.verbose,
+                                              chunkInterval=args.integration_interval,
+                                              resetInterval=args.reset_interval,
+                                              resampleInterval=args.resample_interval,
+                                              filterLowCut=args.filter_lower_frequency,
+                                              filterHighCut=args.filter_upper_frequency,
+                                              filterFrequency=args.filter_frequency,
+                                              filterOrder=args.filter_order,
+                                              calculateDeflection=args.calculate_deflection,
+                                              filterType=args.filter_type,
+                                             )
+    elif args.batched:
+        integral = applyIntegration_batched(data,
+                                            verbose=args.verbose,
+                                            integrationInterval=args.integration_interval,
+                                            resampleInterval=args.resample_interval,
+                                            filterLowCut=args.filter_lower_frequency,
+                                            filterHighCut=args.filter_upper_frequency,
+                                            filterFrequency=args.filter_frequency,
+                                            filterOrder=args.filter_order,
+                                            calculateDeflection=args.calculate_deflection,
+                                            detrend=args.detrend,
+                                            filterType=args.filter_type,
+                                            integrationEngine=args.integration_engine,
+                                            resampleMethod=args.resample_method,
+                                            maxGap=args.max_gap,
+                                            backend=args.backend,
+                                            batchSize=args.batch_size,
+                                           )
+    elif args.procs > 1 or args.overlap:
         integral = applyIntegration_parallel(data,
                                              verbose=args.verbose,
                                              integrationInterval=args.integration_interval,
@@ -99,6 +207,15 @@ if __name__ == "__main__":
                                              filterFrequency=args.filter_frequency,
                                              filterOrder=args.filter_order,
                                              calculateDeflection=args.calculate_deflection,
+                                             sharedMemory=args.shared_memory,
+                                             detrend=args.detrend,
+                                             filterType=args.filter_type,
+                                             integrationEngine=args.integration_engine,
+                                             resampleMethod=args.resample_method,
+                                             maxGap=args.max_gap,
+                                             backend=args.backend,
+                                             overlap=args.overlap,
+                                             statistics=statistics,
                                             )
     else:
         integral = applyIntegration(data,
@@ -110,14 +227,60 @@ if __name__ == "__main__":
                                     filterFrequency=args.filter_frequency,
                                     filterOrder=args.filter_order,
                                     calculateDeflection=args.calculate_deflection,
+                                    detrend=args.detrend,
+                                    filterType=args.filter_type,
+                                    integrationEngine=args.integration_engine,
+                                    resampleMethod=args.resample_method,
+                                    maxGap=args.max_gap,
+                                    backend=args.backend,
+                                    statistics=statistics,
                                    )
 
+    # the streaming and batched integration return the integrated data only
+    if statistics is not None and not isinstance(integral, tuple):
+        integral = (integral, statistics(integral))
 
-    try:
-        if args.verbose: print("* exporting pickle: {}".format(args.output))
-        integral.to_pickle(args.output)
-    except Exception as e:
-        print("* could not export data as pickle")
-        print("*! -> {}".format(e))
+    if statistics is not None:
+        integral, windowStats = integral
+        try:
+            if args.verbose: print("* exporting statistics of {} windows: {}".format(len(windowStats), args.statistics))
+            windowStats.to_pickle(args.statistics)
+        except Exception as e:
+            print("* could not export statistics as pickle")
+            print("*! -> {}".format(e))
+
+    if args.fatigue:
+        try:
+            dels, histograms, edges = fatigueWindows(integral,
+                                                     interval=args.statistics_interval,
+                                                     exponents=args.wohler_exponents,
+                                                     nProcs=args.procs,
+                                                     verbose=args.verbose,
+                                                    )
+            if args.verbose: print("* exporting damage equivalent loads of {} windows: {}".format(len(dels), args.fatigue))
+            dels.to_pickle(args.fatigue)
+        except Exception as e:
+            print("* could not export damage equivalent loads")
+            print("*! -> {}".format(e))
+
+    if args.calculate_direction:
+        if args.verbose: print("* calculating direction of oscillation")
+        integral["direction"] = oscillationDirection(integral)
+
+    if args.output_store:
+        try:
+            if args.verbose: print("* writing data to store: {}".format(args.output_store))
+            writeIntegrated(integral, args.output_store, verbose=args.verbose)
+        except Exception as e:
+            print("* could not write data to store")
+            print("*! -> {}".format(e))
+
+    if args.output:
+        try:
+            if args.verbose: print("* exporting pickle: {}".format(args.output))
+            integral.to_pickle(args.output)
+        except Exception as e:
+            print("* could not export data as pickle")
+            print("*! -> {}".format(e))
 
 
@@ -1,11 +1,16 @@
 #!/usr/bin/python3
 
+import sys
+sys.path.insert(0, "../yasb")
+
 import pandas as pd
 import argparse
 from os import path
 from glob import glob
 import datetime
 
+from store import readStore
+
 inputFiles = list()
 dfs = list()
 
@@ -14,6 +19,9 @@ if __name__ == '__main__':
 
     parser.add_argument('-i', '--input', nargs='+', help='input glob pattern or file')
     parser.add_argument('-o', '--output', help='input directory or file')
+    parser.add_argument('-s', '--store', help='campaign store directory, used as input instead of pickles')
+    parser.add_argument('--source', help='data source within the store, default is tom', default='tom')
+    parser.add_argument('-c', '--columns', nargs='+', help='columns to read from the store, default is all columns')
     parser.add_argument('-v', '--verbose', help='input directory or file', action='store_true')
     
     parser.add_argument('-tz', '--time-zone', help='select values by time', default='Europe/Berlin')
@@ -26,23 +34,34 @@ if __name__ == '__main__':
     args = parser.parse_args()
 
     # check if the user provided input
-    if not args.input:
-        print('*! please provide an input file or glob pattern')
+    if not args.input and not args.store:
+        print('*! please provide an input file, glob pattern or store')
         exit()
 
     if args.start_time: print('* start time: {}'.format(args.start_time))
     if args.end_time: print('* end time: {}'.format(args.end_time))
-    for f in args.input:
-        if path.isfile(f):
-            if args.verbose: print('* processing file {}'.format(f))
-            inputFiles.append(f)
-        else:
-            print('*! skipping: {}'.format(f))
+    if args.store:
+        # time range and columns are selected while reading the store
+        data = readStore(args.store,
+                         args.source,
+                         start=args.start_time,
+                         end=args.end_time,
+                         columns=args.columns,
+                         timeZone=args.time_zone,
+                         verbose=args.verbose,
+                        )
+    else:
+        for f in args.input:
+            if path.isfile(f):
+                if args.verbose: print('* processing file {}'.format(f))
+                inputFiles.append(f)
+            else:
+                print('*! skipping: {}'.format(f))
 
-    for f in inputFiles:
-        dfs.append(pd.read_pickle(f))
+        for f in inputFiles:
+            dfs.append(pd.read_pickle(f))
 
-    data = pd.concat(dfs) 
+        data = pd.concat(dfs) 
 
     if args.start_time and args.end_time:
         start = pd.to_datetime(args.start_time).tz_localize(args.time_zone)
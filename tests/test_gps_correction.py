@@ -0,0 +1,57 @@
+"""
+GPSDateTimeCorrection has to recover the true time of the samples from the
+run time of the box and the GPS time stamps with one second resolution
+"""
+
+import sys
+from os import path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, path.join(path.dirname(path.dirname(path.abspath(__file__))), "yasb"))
+
+from bikbox import GPSDateTimeCorrection, decodeGPSTime
+
+def test_anchor_accuracy():
+    rng = np.random.default_rng(0)
+    period = 0.033 + rng.uniform(-0.003, 0.003, 18000)
+    true = 1588340000.4 + np.cumsum(period)
+    runtime = np.round(((true - true[0]) * (1 + 2e-5) + 150) * 1000).astype(np.int64)
+    gpstime = pd.to_datetime(np.floor(true).astype(np.int64), unit="s").strftime("%Y-%m-%d-%H-%M-%S").values
+
+    df = pd.DataFrame({"runtime" : runtime, "gpstime" : gpstime}, index=pd.to_datetime(runtime, unit="ms"))
+    assert GPSDateTimeCorrection(df)
+
+    # well below half the sample period, the bias of anchoring on the first sample of a second
+    error = df.index.asi8 / 1e9 - true
+    assert np.sqrt(np.mean(error ** 2)) < 0.005
+
+def test_decode_malformed():
+    seconds, valid = decodeGPSTime(np.array(["2020-05-01-12-00-00",
+                                             "2020-05-01-12-00-00xyz",
+                                             "2020-05-01-12-00-0",
+                                             "2020-05-01-12-00-0ä",
+                                             np.nan,
+                                             b"2020-05-01-12-00-01",
+                                            ], dtype=object))
+    assert valid.tolist() == [True, False, False, False, False, True]
+    assert seconds[0] == pd.Timestamp("2020-05-01 12:00:00", tz="UTC").value // 10**9
+    assert seconds[-1] == seconds[0] + 1
+
+def test_non_ascii_time_stamps():
+    runtime = np.arange(0, 60000, 33)
+    df = pd.DataFrame({"runtime" : runtime, "gpstime" : "ä" * 19}, index=pd.to_datetime(runtime, unit="ms"))
+    assert not GPSDateTimeCorrection(df)
+
+def test_missing_run_time():
+    runtime = np.arange(0, 60000, 33).astype(np.float64)
+    true = 1588340000.4 + runtime / 1000
+    gpstime = pd.to_datetime(np.floor(true).astype(np.int64), unit="s").strftime("%Y-%m-%d-%H-%M-%S").values
+    runtime[100] = np.nan
+
+    df = pd.DataFrame({"runtime" : runtime, "gpstime" : gpstime}, index=pd.to_datetime(np.nan_to_num(runtime), unit="ms"))
+    assert GPSDateTimeCorrection(df)
+    assert df.index[100] is pd.NaT
+    valid = df.index.notna()
+    assert np.all(np.abs(df.index.asi8[valid] / 1e9 - true[valid]) < 0.05)
@@ -0,0 +1,69 @@
+"""
+processDataSet_incremental has to reproduce a full run (processDataSet_parallel
+followed by dropping duplicate time stamps, keep='first') after files of the
+box were added, changed or removed
+"""
+
+import sys
+from os import path, remove
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, path.join(path.dirname(path.dirname(path.abspath(__file__))), "yasb"))
+
+from bikbox import processDataSet_incremental, processDataSet_parallel, writeManifest, SOURCECOLUMN
+
+START = 1588340000
+
+def writeLog(fileName, first, n, value):
+    """
+    writes a version 2 log file of n samples at 20 Hz, starting at sample
+    first, all channels set to value
+    """
+
+    with open(fileName, "w") as logFile:
+        logFile.write("header,stuff\n12.3,4\ngarbage line\n")
+        for i in range(first, first + n):
+            gpstime = pd.Timestamp(START + i // 20, unit="s").strftime("%Y-%m-%d-%H-%M-%S")
+            logFile.write("{:.3f},{},{},".format(i * 0.05, i * 50, gpstime) + ",".join(["{:.5f}".format(value)] * 15) + "\n")
+
+def fullRun(dataSet):
+    data = processDataSet_parallel(dataSet, nProcs=1, substractMean=False)
+    return data.loc[~data.index.duplicated(keep="first")]
+
+def incrementalRun(dataSet, data, manifestPath):
+    data, manifest = processDataSet_incremental(dataSet, data=data, manifestPath=manifestPath, nProcs=1)
+    writeManifest(manifest, manifestPath)
+    return data, manifest
+
+def assertSameData(incremental, full):
+    incremental = incremental.drop(columns=SOURCECOLUMN)
+    assert incremental.index.is_monotonic_increasing
+    assert incremental.index.equals(full.sort_index().index)
+    assert np.array_equal(incremental["acc_x"].values, full.sort_index()["acc_x"].values)
+
+def test_incremental_matches_full_run(tmp_path):
+    dataSet = str(tmp_path)
+    manifestPath = path.join(dataSet, "manifest.json")
+
+    # overlapping files, the first file wins the duplicated time stamps
+    writeLog(path.join(dataSet, "log_0000.txt"), 0, 400, 1.0)
+    writeLog(path.join(dataSet, "log_0001.txt"), 300, 400, 2.0)
+    writeLog(path.join(dataSet, "log_0002.txt"), 800, 400, 3.0)
+
+    data, manifest = incrementalRun(dataSet, None, manifestPath)
+    assertSameData(data, fullRun(dataSet))
+    assert (data["acc_x"] == 2.0).sum() == 300
+
+    # changed file
+    writeLog(path.join(dataSet, "log_0000.txt"), 0, 400, 4.0)
+    data, manifest = incrementalRun(dataSet, data, manifestPath)
+    assertSameData(data, fullRun(dataSet))
+
+    # removed file, the overlapping rows of the next file come back
+    remove(path.join(dataSet, "log_0000.txt"))
+    data, manifest = incrementalRun(dataSet, data, manifestPath)
+    assert sorted(manifest) == ["log_0001.txt", "log_0002.txt"]
+    assert set(data[SOURCECOLUMN]) == {"log_0001.txt", "log_0002.txt"}
+    assertSameData(data, fullRun(dataSet))
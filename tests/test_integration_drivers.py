@@ -0,0 +1,67 @@
+"""
+the integration drivers (per window, batched, streaming, parallel) have to
+give the same result as applyIntegration on the same data
+"""
+
+import sys
+from functools import partial
+from os import path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, path.join(path.dirname(path.dirname(path.abspath(__file__))), "yasb"))
+
+from bikbox import applyIntegration, applyIntegration_batched, applyIntegration_parallel, applyIntegration_streaming
+from bikbox import streamingIntegrator, streamIntegration
+from stats import windowStatistics
+
+@pytest.fixture(scope="module")
+def dataset():
+    # samples off the resampling grid and a 5 s gap
+    index = pd.date_range("2020-05-01 15:30:00.017", "2020-05-01 16:10", freq="33ms")
+    acc = np.random.default_rng(1).normal(0, 0.01, (len(index), 3))
+    df = pd.DataFrame(acc, index=index, columns=["acc_x", "acc_y", "acc_z"])
+    return df.loc[(df.index <= "2020-05-01 15:35:00") | (df.index >= "2020-05-01 15:35:05")]
+
+@pytest.mark.parametrize("resampleMethod", ["bfill", "linear", "nearest"])
+@pytest.mark.parametrize("maxGap", [None, "1s"])
+def test_batched(dataset, resampleMethod, maxGap):
+    expected = applyIntegration(dataset, resampleMethod=resampleMethod, maxGap=maxGap, backend="numpy")
+    result = applyIntegration_batched(dataset, resampleMethod=resampleMethod, maxGap=maxGap, backend="numpy")
+    assert result.index.equals(expected.index)
+    assert np.allclose(result.values.astype(float), expected.values.astype(float), equal_nan=True)
+
+def test_streaming_grid(dataset):
+    expected = applyIntegration(dataset, backend="numpy")
+    result = applyIntegration_streaming(dataset, chunkInterval="10min")
+    assert result.index.equals(expected.index)
+
+def test_streaming_gap_within_chunk(dataset):
+    # a gap inside a chunk restarts the integration like a gap between chunks
+    chunk = dataset.loc[:"2020-05-01 15:40"]
+    before, after = chunk.loc[:"2020-05-01 15:35:00"], chunk.loc["2020-05-01 15:35:05":]
+
+    state = streamingIntegrator(maxGap="1s")
+    expected = pd.concat([streamIntegration(state, before), streamIntegration(state, after)])
+    result = streamIntegration(streamingIntegrator(maxGap="1s"), chunk)
+
+    assert result.index.equals(expected.index)
+    assert np.allclose(result.values, expected.values)
+    assert (result.loc[result.index > before.index[-1], ["vel_x", "vel_y", "vel_z"]].iloc[0] == 0).all()
+
+@pytest.mark.parametrize("maxGap", [None, "1s"])
+def test_overlap_grid(dataset, maxGap):
+    expected = applyIntegration(dataset, maxGap=maxGap, backend="numpy")
+    result = applyIntegration_parallel(dataset, nProcs=1, overlap="1min", maxGap=maxGap, backend="numpy")
+    assert result.index.equals(expected.index)
+    assert result.columns.tolist() == expected.columns.tolist()
+    assert np.allclose(result["deflection"], np.hypot(result["pos_x"], result["pos_z"]))
+
+def test_statistics(dataset):
+    statistics = partial(windowStatistics, interval="1min")
+    frames, expected = applyIntegration_parallel(dataset, nProcs=1, statistics=statistics, backend="numpy")
+    frames, result = applyIntegration(dataset, statistics=statistics, backend="numpy")
+    assert result.index.equals(expected.index)
+    assert np.allclose(result.values, expected.values, equal_nan=True)
@@ -0,0 +1,44 @@
+"""
+the modal analysis has to find the frequency, damping and shape of a single
+lightly damped mode driven by white noise
+"""
+
+import sys
+from os import path
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.signal import bilinear, lfilter
+
+sys.path.insert(0, path.join(path.dirname(path.dirname(path.abspath(__file__))), "yasb"))
+
+from modal import modalAnalysis
+
+FREQUENCY = 0.35
+DAMPING = 0.02
+SHAPE = np.array([1, 0.2, 0.5]) / np.linalg.norm([1, 0.2, 0.5])
+
+@pytest.fixture(scope="module")
+def dataset():
+    fs = 20.0
+    omega = 2 * np.pi * FREQUENCY
+    b, a = bilinear([1], [1, 2 * DAMPING * omega, omega ** 2], fs)
+
+    index = pd.date_range("2020-05-01 00:00", periods=int(3600 * fs), freq="50ms", tz="Europe/Berlin")
+    rng = np.random.default_rng(0)
+    modal = lfilter(b, a, rng.standard_normal(len(index)))
+    acc = (modal / modal.std())[:, np.newaxis] * SHAPE + 0.05 * rng.standard_normal((len(index), 3))
+
+    return pd.DataFrame(acc, index=index, columns=["acc_x", "acc_y", "acc_z"])
+
+@pytest.mark.parametrize("method", ["fdd", "ssi"])
+def test_single_mode(dataset, method):
+    table, shapes = modalAnalysis(dataset, method=method, nModes=1, band=(0.1, 2.0), nProcs=1)
+
+    assert len(table) == 6
+    # fdd is limited to the frequency resolution of the welch segments (1 / 75 s)
+    assert np.allclose(table["f_0"], FREQUENCY, atol=0.01)
+    assert np.allclose(shapes[:, 0], SHAPE, atol=0.01)
+    if method == "ssi":
+        assert np.allclose(table["d_0"], DAMPING, atol=0.015)
@@ -0,0 +1,55 @@
+"""
+orientation estimation: a box at rest keeps gravity on its vertical axis,
+the horizontal (deflection) axes x and z carry no acceleration
+"""
+
+import sys
+from os import path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, path.join(path.dirname(path.dirname(path.abspath(__file__))), "yasb"))
+
+from bikbox import ORIENTATIONMETHODS, estimateOrientation, rotateToEarthFrame, rotationMatrices
+
+def staticBox(tilt=0.0, verticalAxis="y", n=900):
+    """
+    readings of a box at rest, tilted by tilt degrees about the first
+    horizontal axis
+    """
+
+    k = "xyz".index(verticalAxis)
+    gravity = np.zeros(3)
+    gravity[k] = 1.0
+    field = np.zeros(3)
+    field[(k + 1) % 3], field[k] = 0.4, -0.3
+
+    angles = np.zeros(3)
+    angles[(k + 1) % 3] = tilt
+    matrix = rotationMatrices(*[np.array([a]) for a in angles])[0]
+
+    rng = np.random.default_rng(0)
+    readings = np.concatenate([rng.normal(0, 0.01, (n, 3)),
+                               np.tile(matrix.T @ gravity, (n, 1)) + rng.normal(0, 1e-3, (n, 3)),
+                               np.tile(matrix.T @ field, (n, 1)),
+                              ], axis=1)
+    columns = ["rot_x", "rot_y", "rot_z", "acc_x", "acc_y", "acc_z", "mag_x", "mag_y", "mag_z"]
+
+    return pd.DataFrame(readings, index=pd.date_range("2020-05-01", periods=n, freq="33ms"), columns=columns)
+
+@pytest.mark.parametrize("method", ORIENTATIONMETHODS)
+@pytest.mark.parametrize("tilt", [0.0, 10.0])
+def test_static_box(method, tilt):
+    df = staticBox(tilt=tilt)
+    quaternions = estimateOrientation(df, method=method)
+    earth = rotateToEarthFrame(df, quaternions=quaternions)[["acc_x", "acc_y", "acc_z"]].iloc[-100:].mean()
+    assert np.allclose(earth, [0, 1, 0], atol=5e-3)
+
+@pytest.mark.parametrize("verticalAxis", ["x", "z"])
+def test_vertical_axis(verticalAxis):
+    df = staticBox(verticalAxis=verticalAxis)
+    quaternions = estimateOrientation(df, method="complementary", verticalAxis=verticalAxis)
+    earth = rotateToEarthFrame(df, quaternions=quaternions)[["acc_x", "acc_y", "acc_z"]].iloc[-100:].mean()
+    assert np.allclose(earth, np.eye(3)["xyz".index(verticalAxis)], atol=5e-3)
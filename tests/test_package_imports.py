@@ -0,0 +1,66 @@
+"""
+the bin scripts import the modules flat (../yasb on sys.path), notebooks
+and other tools import them as the yasb package. Both have to work in any
+order, in particular the numba compiled kernels must not depend on the
+module name they were first compiled under.
+"""
+
+import subprocess
+import sys
+from os import path
+
+import pytest
+
+ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+
+FLAT = """
+import sys
+sys.path.insert(0, "yasb")
+from bikbox import integrationBackend
+from stats import rainflow
+import waves
+import modal
+integrationBackend("auto")
+rainflow([0.0, 1.0, -1.0, 2.0, 0.0])
+"""
+
+PACKAGE = """
+import numpy as np
+import pandas as pd
+import yasb.bikbox as bikbox
+import yasb.stats as stats
+import yasb.waves
+import yasb.modal
+
+backend = bikbox.integrationBackend("auto")
+assert backend in ("numpy", "numba"), backend
+
+index = pd.date_range("2020-05-01 15:00", periods=6000, freq="30ms")
+acc = np.random.default_rng(0).normal(0, 0.01, (len(index), 3))
+df = pd.DataFrame(acc, index=index, columns=["acc_x", "acc_y", "acc_z"])
+integrated = bikbox.integrateVelocityAcceleration(df, backend="auto")
+assert len(integrated) and np.isfinite(integrated["pos_x"]).all()
+
+n = 500
+readings = np.zeros((n, 9))
+readings[:, 5] = 1.0
+readings[:, 6] = 1.0
+sensors = pd.DataFrame(readings,
+                       index=pd.date_range("2020-05-01", periods=n, freq="33ms"),
+                       columns=["rot_x", "rot_y", "rot_z", "acc_x", "acc_y", "acc_z", "mag_x", "mag_y", "mag_z"])
+quaternions = bikbox.estimateOrientation(sensors, method="madgwick")
+assert np.allclose(np.linalg.norm(quaternions.values, axis=1), 1)
+
+ranges, means, counts = stats.rainflow([-2, 1, -3, 5, -1, 3, -4, 4, -2])
+assert np.isclose(np.sum(counts * ranges), 23)
+"""
+
+def run(code):
+    return subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+
+@pytest.mark.parametrize("order", [("flat", "package"), ("package", "flat")])
+def test_flat_and_package_imports(order):
+    scripts = {"flat": FLAT, "package": PACKAGE}
+    for name in order:
+        result = run(scripts[name])
+        assert result.returncode == 0, "{} import failed:\n{}".format(name, result.stderr)
@@ -0,0 +1,37 @@
+"""
+per window statistics have to match pandas and use the windows of the
+integration drivers
+"""
+
+import sys
+from os import path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, path.join(path.dirname(path.dirname(path.abspath(__file__))), "yasb"))
+
+from stats import windowStatistics
+
+def test_moments():
+    index = pd.date_range("2020-05-01 15:30:00.017", "2020-05-01 17:10", freq="33ms", tz="Europe/Berlin")
+    df = pd.DataFrame({"pos_x" : np.random.default_rng(0).normal(1e3, 0.01, len(index))}, index=index)
+    df.iloc[100:200] = np.nan
+
+    result = windowStatistics(df, interval="10min", statistics=("count", "mean", "std", "rms"))
+    windows = df["pos_x"].resample("10min")
+
+    assert np.allclose(result["pos_x_count"], windows.count())
+    assert np.allclose(result["pos_x_mean"], windows.mean(), rtol=1e-12)
+    assert np.allclose(result["pos_x_std"], windows.std(), rtol=1e-6)
+    assert np.allclose(result["pos_x_rms"], windows.apply(lambda x: np.sqrt(np.nanmean(x ** 2))), rtol=1e-12)
+
+def test_local_windows():
+    # local midnight is not a full hour in UTC, the windows follow local time
+    index = pd.date_range("2020-05-01 03:10", "2020-05-01 09:00", freq="1s", tz="Asia/Kolkata")
+    df = pd.DataFrame({"pos_x" : np.arange(len(index), dtype=np.float64)}, index=index)
+
+    result = windowStatistics(df, interval="1h", statistics=("count",))
+
+    assert result.index.equals(df.resample("1h").count().index)
+    assert (result.index.minute == 0).all()
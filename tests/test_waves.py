@@ -0,0 +1,34 @@
+"""
+the parametric wave spectra have to reproduce the significant wave height
+(Hs = 4 sqrt(m0)) and the peak period they are built from
+"""
+
+import sys
+from os import path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, path.join(path.dirname(path.dirname(path.abspath(__file__))), "yasb"))
+
+from waves import spectralMoment, waveSpectra
+
+@pytest.mark.parametrize("spectrum, gamma", [("pm", 3.3), ("jonswap", 1.0), ("jonswap", 3.3), ("jonswap", "dnv")])
+def test_significant_wave_height(spectrum, gamma):
+    waves = pd.DataFrame({"Hs" : [0.5, 1.5, 3.0], "Tp" : [4.0, 7.0, 11.0]})
+    frequencies = np.linspace(0, 2, 4001)
+
+    spectra = waveSpectra(waves, frequencies, spectrum=spectrum, gamma=gamma)
+
+    # the JONSWAP normalization 1 - 0.287 ln(gamma) is accurate to a few percent
+    assert np.allclose(4 * np.sqrt(spectralMoment(frequencies, spectra)), waves["Hs"], rtol=0.03)
+    assert np.allclose(1 / frequencies[np.argmax(spectra, axis=1)], waves["Tp"], rtol=0.01)
+
+def test_missing_parameters():
+    waves = pd.DataFrame({"Hm0" : [1.0, np.nan, 1.0], "Tp" : [6.0, 6.0, 0.0]})
+
+    spectra = waveSpectra(waves, np.linspace(0, 1, 101))
+
+    assert np.isfinite(spectra[0]).all()
+    assert np.isnan(spectra[1:]).all()
@@ -9,11 +9,42 @@ import matplotlib.pyplot as plt
 import matplotlib.lines as mlines
 from matplotlib.pyplot import cm
 from multiprocessing import Pool
+from multiprocessing import cpu_count
+from functools import partial
+from multiprocessing import shared_memory
+from multiprocessing import resource_tracker
+from collections import deque
 from glob import glob
+from io import BytesIO
+from time import perf_counter
 from os import path
+from os import stat
+from os import replace as replaceFile
+from os.path import getmtime
+import json
+import hashlib
 import scipy
 from scipy import integrate
-from scipy.signal import butter, lfilter
+from scipy.signal import butter, lfilter, lfilter_zi
+from scipy.signal import sosfilt, sosfiltfilt, sosfilt_zi, sosfreqz
+from scipy.fft import next_fast_len
+from functools import lru_cache
+from scipy.signal import detrend as scipyDetrend
+import math
+
+# optional just in time compiler for the fused integration kernel and the
+# orientation filter
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# optional csv reader of pyarrow for the log files, see parseLogFile
+try:
+    import pyarrow
+    from pyarrow import csv as pyarrowCSV
+except ImportError:
+    pyarrowCSV = None
 
 # Definition of constants
 # matplotlib
@@ -62,8 +93,181 @@ columns2 = [
     "yaw",
 ]
 
+# data type of every channel of both log file versions, applied at parse time.
+# gpstime is kept as string until the GPS time correction is done, afterwards all
+# string columns are dropped (see cleanDataFrame)
+schema = {
+    "time" : np.float64,
+    "runtime" : np.int64,
+    "gpstime" : object,
+    "latitude" : np.float64,
+    "longitude" : np.float64,
+    "elevation" : np.float32,
+    "rot_x" : np.float32,
+    "rot_y" : np.float32,
+    "rot_z" : np.float32,
+    "acc_x" : np.float32,
+    "acc_y" : np.float32,
+    "acc_z" : np.float32,
+    "mag_x" : np.float32,
+    "mag_y" : np.float32,
+    "mag_z" : np.float32,
+    "roll" : np.float32,
+    "pitch" : np.float32,
+    "yaw" : np.float32,
+}
+
 ### Data aggregation and cleaning
 
+def applySchema(df, schema=schema, verbose=False):
+    """
+    casts the columns of a given dataframe to the data types given in the schema.
+    Integer columns containing NaNs are kept as float, columns not in the schema
+    are left untouched.
+
+    returns the dataframe
+    """
+
+    for c in df.columns:
+        if c not in schema or df[c].dtype == schema[c]:
+            continue
+        if np.issubdtype(schema[c], np.integer) and df[c].isna().any():
+            if verbose: print("NaNs in integer column {}, keeping float".format(c))
+            continue
+        try:
+            df[c] = df[c].astype(schema[c])
+        except (ValueError, TypeError):
+            print("could not convert column {} to {}".format(c, schema[c]))
+
+    return df
+
+def splitLogFile(raw, skipheader=3):
+    """
+    splitLogFile(raw, skipheader=3):
+
+    cuts the header lines and the last line of the raw bytes of a log file.
+    The box writes the log files line by line, hence the last line is
+    usually truncated and dropped -> same as skipfooter=1, but without
+    having to fall back to the python parser.
+
+    returns the bytes containing only the data lines
+    """
+
+    start = 0
+    for i in range(skipheader):
+        start = raw.find(b"\n", start) + 1
+        if start == 0:
+            return b""
+
+    end = raw.rstrip(b"\r\n").rfind(b"\n")
+    if end < start:
+        return b""
+
+    return raw[start:end + 1]
+
+def parseLogFile(
+    logFilePath,
+    columns=columns,
+    skipheader=3,
+    verbose=False,
+    errorOnBadLine=False,
+    schema=schema,
+    engine="auto",
+):
+    """
+    parseLogFile(logFilePath, columns=columns, skipheader=3, engine="auto"):
+
+    fast parser for the two known log file layouts (columns and columns2).
+    The file is read as bytes, header and truncated last line are cut off
+    and the remaining lines are handed to the csv reader of pyarrow
+    (engine="pyarrow") or the C tokenizer of pandas (engine="c") with the
+    dtype given for every column in the schema. engine="auto" uses pyarrow
+    if installed. Files pyarrow cannot parse like pandas (bad lines, see
+    parseLogFileArrow) are handed to the C tokenizer, with engine="auto"
+    also if pyarrow fails on the file.
+
+    returns a dataframe containing the data from a given log file
+    """
+
+    if engine not in ("auto", "pyarrow", "c"):
+        raise Exception("unknown log file engine: {}, use auto, pyarrow or c".format(engine))
+    if engine == "pyarrow" and pyarrowCSV is None:
+        raise Exception("the pyarrow log file engine requires pyarrow -> pip install pyarrow")
+
+    startTime = perf_counter()
+
+    with open(logFilePath, "rb") as logFile:
+        body = splitLogFile(logFile.read(), skipheader=skipheader)
+
+    if not body:
+        return pd.DataFrame(columns=columns)
+
+    # integer columns are left to the parser and cast afterwards, as they might contain NaNs
+    dtypes = {c : schema.get(c, np.float64) for c in columns}
+    dtypes = {c : t for c, t in dtypes.items() if not np.issubdtype(t, np.integer)}
+
+    tempDataFrame = None
+    if engine != "c" and pyarrowCSV is not None:
+        try:
+            tempDataFrame = parseLogFileArrow(body, columns, dtypes, errorOnBadLine)
+            if tempDataFrame is None and verbose: print("* bad lines in {}, using the C engine".format(logFilePath))
+        except pyarrow.ArrowInvalid as e:
+            if engine == "pyarrow":
+                raise
+            if verbose: print("*! pyarrow could not parse {}, using the C engine -> {}".format(logFilePath, e))
+
+    if tempDataFrame is None:
+        tempDataFrame = pd.read_csv(
+            BytesIO(body),
+            header=None,
+            names=columns,
+            dtype=dtypes,
+            engine="c",
+            on_bad_lines="error" if errorOnBadLine else "skip",
+            )
+    applySchema(tempDataFrame, schema)
+
+    if verbose:
+        deltaT = perf_counter() - startTime
+        print("parsed {} rows in {:.3f} s -> {:.0f} rows/s".format(len(tempDataFrame),
+                                                                    deltaT,
+                                                                    len(tempDataFrame) / max(deltaT, 1e-9)))
+
+    return tempDataFrame
+
+def parseLogFileArrow(body, columns, dtypes, errorOnBadLine=False):
+    """
+    parses the data lines of a log file (see splitLogFile) with the csv
+    reader of pyarrow. Columns missing in dtypes (integers) are read as
+    float64, string columns are converted to python strings as with pandas.
+    The files are read by one thread, they are processed in parallel by the
+    callers (processDataSet_parallel). pyarrow can only drop lines with a wrong number of fields, while pandas
+    fills short lines with NaN, hence files with such lines are left to the
+    C tokenizer.
+
+    returns a dataframe, None if the file contains bad lines
+    """
+
+    types = dict()
+    for c in columns:
+        dtype = dtypes.get(c, np.float64)
+        types[c] = pyarrow.string() if dtype is object else pyarrow.from_numpy_dtype(np.dtype(dtype))
+
+    badLines = list()
+    def skipBadLine(row):
+        badLines.append(row.number)
+        return "skip"
+
+    table = pyarrowCSV.read_csv(pyarrow.py_buffer(body),
+                                read_options=pyarrowCSV.ReadOptions(column_names=list(columns), use_threads=False),
+                                parse_options=pyarrowCSV.ParseOptions(invalid_row_handler=None if errorOnBadLine else skipBadLine),
+                                convert_options=pyarrowCSV.ConvertOptions(column_types=types),
+                               )
+    if badLines:
+        return None
+
+    return table.to_pandas()
+
 def readLogFile(
     logFilePath,
     columns=columns,
@@ -71,13 +275,14 @@ def readLogFile(
     verbose=False,
     lowMemory=True,
     errorOnBadLine=False,
-    engine="python",
+    engine="auto",
 ):
     """
-    readLogFile(logFilePath, columns=columns, skipheader=2, skipfooter=1):
+    readLogFile(logFilePath, columns=columns, skipheader=3, engine="auto"):
 
     opens the given path, tries to read in the data, convert it to a dataframe
-    and append it.
+    and append it. engine="auto", "pyarrow" or "c" use the fixed schema parser
+    parseLogFile, any other engine falls back to pd.read_csv with skipfooter=1.
 
     returns a dataframe containing the data from a given csv file
     """
@@ -85,19 +290,30 @@ def readLogFile(
     if verbose: print("processing file: {}".format(logFilePath))
 
     if not isfile(logFilePath):
-        print("no such file: {} -> skipping".format(logFile))
+        print("no such file: {} -> skipping".format(logFilePath))
         return None
 
     try:
-        tempDataFrame = pd.read_csv(
-            logFilePath,
-            skiprows=skipheader,
-            names=columns,
-            low_memory=lowMemory,
-            error_bad_lines=errorOnBadLine,
-            skipfooter=1,
-            engine=engine,
-            )
+        if engine in ("auto", "pyarrow", "c"):
+            tempDataFrame = parseLogFile(
+                logFilePath,
+                columns=columns,
+                skipheader=skipheader,
+                verbose=verbose,
+                errorOnBadLine=errorOnBadLine,
+                engine=engine,
+                )
+        else:
+            tempDataFrame = pd.read_csv(
+                logFilePath,
+                skiprows=skipheader,
+                names=columns,
+                low_memory=lowMemory,
+                error_bad_lines=errorOnBadLine,
+                skipfooter=1,
+                engine=engine,
+                )
+            applySchema(tempDataFrame)
         if verbose: print(tempDataFrame.info())
 
     except:
@@ -116,6 +332,7 @@ def cleanDataFrame(
     correctTimeByGPS=True,
     timeZone="Europe/Berlin",
     dropDuplicateIndices=True,
+    dropStrings=True,
 ):
 
     if df.empty:
@@ -142,9 +359,17 @@ def cleanDataFrame(
 
     if correctTimeByGPS:
         if verbose: print("correcting time stamp via GPS")
-        if len(df.columns) == 17: # only log file version to is egligible to gps time correction
+        if "gpstime" in df.columns: # only log file version 2 is egligible to gps time correction
             if not GPSDateTimeCorrection(df, verbose=False):
                 return pd.DataFrame()
+            # samples without run time cannot be placed in time
+            if df.index.hasnans:
+                df = df.loc[df.index.notna()].copy()
+
+    if dropStrings:
+        stringColumns = [c for c in df.columns if df[c].dtype == object]
+        if verbose: print("dropping string columns: {}".format(stringColumns))
+        df.drop(columns=stringColumns, inplace=True)
 
     if timeZone:
         try:
@@ -167,7 +392,7 @@ def concatDataFiles(dataDir, cols, pattern="log_0???.txt"):
     for dataFile in sorted(glob(path.join(dataDir, pattern))):
         print(dataFile)
         tempData = readLogFile(dataFile, verbose=False, columns=cols)           # read in the dataFile
-        if tempData.empty:
+        if tempData is None or tempData.empty:
             print("skipping corrupt file: {}".format(dataFile))
             continue
         tempData = cleanDataFrame(tempData, verbose=False)        # clean it -> generate index, etc.
@@ -181,28 +406,272 @@ def concatDataFiles(dataDir, cols, pattern="log_0???.txt"):
 
     return pd.concat(frames)
 
+### running moments and mean removal
+
+def momentsOf(values, starts=None):
+    """
+    returns count, mean and sum of squared deviations (M2) of every column of
+    a 2d array, ignoring NaNs. With starts (the first row of every segment,
+    e.g. the windows of a time sorted array) the moments of all segments are
+    returned at once, from a single pass over the data: the sums are taken
+    relative to the first value of every segment, which keeps the
+    cancellation in M2 small. Moments of parts merge with mergeMoments.
+    """
+
+    values = np.asarray(values, dtype=np.float64)
+
+    if starts is not None:
+        finite = np.isfinite(values)
+        shift = np.where(finite[starts], values[starts], 0)
+        shifted = np.where(finite, values - np.repeat(shift, np.diff(np.r_[starts, len(values)]), axis=0), 0)
+        count = np.add.reduceat(finite, starts, axis=0)
+        first, second = np.split(np.add.reduceat(np.concatenate((shifted, shifted ** 2), axis=1), starts, axis=0), 2, axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(count > 0, first / count, 0)
+        return count, shift + mean, np.maximum(second - first * mean, 0)
+
+    count = np.sum(~np.isnan(values), axis=0)
+    mean = np.nanmean(values, axis=0) if values.size else np.zeros(values.shape[1:])
+    m2 = np.nansum((values - mean) ** 2, axis=0)
+
+    return count, np.nan_to_num(mean), m2
+
+def mergeMoments(a, b):
+    """
+    merges two sets of moments (count, mean, M2) with the parallel variant of
+    Welford's algorithm (Chan et al.), so that moments of blocks computed in
+    different workers or chunks combine to the moments of the whole data
+    """
+
+    if a is None:
+        return b
+    if b is None:
+        return a
+
+    countA, meanA, m2A = a
+    countB, meanB, m2B = b
+    count = countA + countB
+    delta = meanB - meanA
+    with np.errstate(invalid="ignore", divide="ignore"):
+        weightB = np.where(count > 0, countB / np.maximum(count, 1), 0)
+    mean = meanA + delta * weightB
+    m2 = m2A + m2B + delta ** 2 * countA * weightB
+
+    return count, mean, m2
+
+def accumulateMoments(moments, values):
+    """
+    updates running moments (or None) with a new block of values
+
+    returns the merged moments (count, mean, M2)
+    """
+
+    return mergeMoments(moments, momentsOf(values))
+
+def substractFileMean(df, components=("acc_x", "acc_y", "acc_z")):
+    """
+    substracts the mean of the given components of a single frame (e.g. one
+    log file) in place, so that slow sensor bias drift is removed file by file
+    without a second pass over the whole data set
+
+    returns the moments (count, mean, M2) of the removed components
+    """
+
+    components = [c for c in components if c in df.columns]
+    moments = momentsOf(df[components].values)
+    for c, mean in zip(components, moments[1]):
+        df[c] -= np.array(mean, dtype=df[c].dtype)
+
+    return moments
+
+def detrendWindow(values, mode="mean", axis=0):
+    """
+    removes the mean (mode="mean") or a least squares linear trend
+    (mode="linear") of every column of an array of equally spaced samples
+    along axis
+
+    returns the detrended array
+    """
+
+    if mode == "mean":
+        return values - np.mean(values, axis=axis, keepdims=True)
+    elif mode == "linear":
+        return scipyDetrend(values, axis=axis, type="linear")
+    else:
+        raise Exception("unknown detrend mode: {}, use mean or linear".format(mode))
+
+### binary cache of parsed log files
+
+def cachePath(dataFile):
+    """
+    returns the path of the binary sidecar cache of a given log file
+    """
+
+    return "{}.npy".format(dataFile)
+
+def writeCache(df, dataFile, verbose=False):
+    """
+    writeCache(df, dataFile):
+
+    writes the parsed and cleaned data of a log file to a fixed dtype sidecar
+    file (numpy structured array: UTC time index in ns followed by all numeric
+    columns), which can be memory mapped by readCache
+    """
+
+    numeric = [c for c in df.columns if np.issubdtype(df[c].dtype, np.number)]
+    indexName = df.index.name or "time"
+
+    cache = np.empty(len(df), dtype=[(indexName, np.int64)] + [(c, df[c].dtype) for c in numeric])
+    cache[indexName] = df.index.asi8
+    for c in numeric:
+        cache[c] = df[c].values
+
+    # write to a temporary file first, so that a crash never leaves a broken cache
+    tempPath = "{}.tmp.npy".format(dataFile)
+    np.save(tempPath, cache)
+    replaceFile(tempPath, cachePath(dataFile))
+
+    if verbose: print("wrote cache: {}".format(cachePath(dataFile)))
+
+def readCache(dataFile, timeZone="Europe/Berlin", verbose=False):
+    """
+    readCache(dataFile, timeZone="Europe/Berlin"):
+
+    memory maps the sidecar cache of a given log file, if it exists and is
+    not older than the log file itself
+
+    returns a dataframe or None if there is no valid cache
+    """
+
+    cacheFile = cachePath(dataFile)
+
+    if not isfile(cacheFile) or getmtime(cacheFile) < getmtime(dataFile):
+        return None
+
+    try:
+        cache = np.load(cacheFile, mmap_mode="r")
+    except Exception as e:
+        print("could not read cache {} -> {}".format(cacheFile, e))
+        return None
+
+    if verbose: print("reading cache: {}".format(cacheFile))
+
+    indexName = cache.dtype.names[0]
+    index = pd.DatetimeIndex(pd.to_datetime(cache[indexName], unit="ns", utc=True), name=indexName)
+    if timeZone:
+        index = index.tz_convert(timeZone)
+
+    return pd.DataFrame({c : cache[c] for c in cache.dtype.names[1:]}, index=index)
+
 ### new parallel processing of logfiles
 
-def processDataFile(dataFile, cols=columns2, verbose=False):
+def processDataFile(dataFile, cols=columns2, verbose=False, cache=False, substractMean=False):
     
     tempData = pd.DataFrame()
     
     if not isfile(dataFile):
         print("not a file: {}, skipping".format(dataFile))
         return pd.DataFrame()
+
+    if cache:
+        tempData = readCache(dataFile, verbose=verbose)
+        if tempData is not None:
+            if substractMean == "file":
+                substractFileMean(tempData)
+            return tempData
     
     tempData = readLogFile(dataFile, verbose=verbose, columns=cols)
     
-    if tempData.empty:
+    if tempData is None or tempData.empty:
         print("skipping corrupt file: {}".format(dataFile))
         return pd.DataFrame()
     
     tempData = cleanDataFrame(tempData, verbose=verbose)        # clean it -> generate index, etc.
 
     if not tempData.empty:                     # append the dataframes to the global dataframe
+        if cache:
+            try:
+                writeCache(tempData, dataFile, verbose=verbose)
+            except Exception as e:
+                print("could not write cache for {} -> {}".format(dataFile, e))
+        if substractMean == "file":
+            if verbose: print("substracting file mean")
+            substractFileMean(tempData)
         return tempData
     
-def processDataSet_parallel(dataSet, pickleName=None, pattern = "log_0???.txt", nProcs = 32, verbose=False, substractMean=True):
+### parallel helpers
+
+def availableCPUs():
+    """
+    returns the number of cpus available to this process
+    """
+
+    try:
+        from os import sched_getaffinity
+        return len(sched_getaffinity(0))
+    except ImportError:
+        return cpu_count()
+
+def poolSize(nJobs, nProcs=None):
+    """
+    returns the number of worker processes to use for nJobs jobs: nProcs
+    (default: all available cpus), but never more than there are jobs
+    """
+
+    if not nProcs:
+        nProcs = availableCPUs()
+
+    return max(1, min(nProcs, nJobs))
+
+def mapOrdered(function, jobs, nJobs, nProcs=None, pool=None, chunkSize=None, maxPending=None):
+    """
+    mapOrdered(function, jobs, nJobs, nProcs=None, pool=None, chunkSize=None, maxPending=None):
+
+    generator applying function to every job in a pool of workers. Results are
+    yielded in the order of the jobs as soon as they are available, so the
+    caller can consume them while the workers are still busy. If a pool is
+    given, it is used and left open for further calls, otherwise a pool sized
+    by poolSize is created and closed afterwards; if that is a single worker,
+    the jobs are run in this process instead. chunkSize defaults to roughly
+    four chunks per worker. With maxPending at most that many jobs are
+    submitted ahead of the caller, so results of a slow consumer do not pile
+    up in memory (one job per task, chunkSize is ignored).
+
+    yields the results of function
+    """
+
+    nWorkers = poolSize(nJobs, nProcs)
+
+    if pool is None and nWorkers == 1:
+        for job in jobs:
+            yield function(job)
+        return
+
+    if not chunkSize:
+        chunkSize = max(1, nJobs // (4 * nWorkers))
+
+    ownPool = pool is None
+    if ownPool:
+        pool = Pool(nWorkers)
+
+    try:
+        if maxPending:
+            pending = deque()
+            for job in jobs:
+                pending.append(pool.apply_async(function, (job,)))
+                if len(pending) >= maxPending:
+                    yield pending.popleft().get()
+            while pending:
+                yield pending.popleft().get()
+        else:
+            for result in pool.imap(function, jobs, chunkSize):
+                yield result
+    finally:
+        if ownPool:
+            pool.close()
+            pool.join()
+
+def processDataSet_parallel(dataSet, pickleName=None, pattern = "log_0???.txt", nProcs = None, verbose=False, substractMean=True, pool=None, sharedMemory=False, cache=False):
 
     if not isdir(dataSet):
         print("*! not a directory, skipping")
@@ -213,29 +682,59 @@ def processDataSet_parallel(dataSet, pickleName=None, pattern = "log_0???.txt",
     cols = checkLogFileVersion(dataSet, [columns, columns2])
 
     if verbose: print("* file version checked: {}".format(cols))
-    
-    pool = Pool(nProcs)
+
+    dataFiles = sorted(glob(path.join(dataSet, pattern)))
+
+    if not len(dataFiles) > 0:
+        print("*! no files found")
+        return pd.DataFrame()
+
+    if verbose: print("* iterating over {} files using {} processes".format(len(dataFiles), poolSize(len(dataFiles), nProcs)))
+    # the mean is either removed per file in the workers or globally from the
+    # moments accumulated while the results arrive
+    worker = partial(processDataFile,
+                     cols=cols,
+                     verbose=verbose,
+                     cache=cache,
+                     substractMean="file" if substractMean == "file" else False,
+                    )
+    if sharedMemory:
+        # workers started from here share the resource tracker of this process
+        resource_tracker.ensure_running()
+        worker = partial(sharedMemoryWorker, function=worker)
+
+    accComponents = ["acc_x", "acc_y", "acc_z"]
     frames = list()
-   
-    if verbose: print("* iterating over files")
-    for dfile in sorted(glob(path.join(dataSet, pattern))):
-          frameData = pool.apply_async(processDataFile,(dfile, cols, verbose))
-          frames.append(frameData)
+    moments = None
+    try:
+        for frame in mapOrdered(worker, dataFiles, len(dataFiles), nProcs=nProcs, pool=pool):
+            if frame is None:
+                continue
+            if substractMean in (True, "global") and not sharedMemory and not frame.empty:
+                moments = accumulateMoments(moments, frame[accComponents].values)
+            frames.append(frame)
+    except:
+        # blocks of the files collected so far are not going to be read
+        if sharedMemory:
+            releaseSharedMemory(frames)
+        raise
 
-    pool.close()
-    pool.join()
-    
     if not len(frames) > 0:
-        print("*! no files found")
+        print("*! no valid files found")
         return pd.DataFrame()
 
-    data = pd.concat([d.get() for d in frames])
+    if sharedMemory:
+        data = frameFromSharedMemory(frames)
+    else:
+        data = pd.concat(frames)
   
-    if substractMean:
+    if substractMean in (True, "global"):
         if verbose: print("* substracting mean")
-        for comp in ("acc_x", "acc_y", "acc_z"):
+        if moments is None:
+            moments = momentsOf(data[accComponents].values)
+        for comp, mean in zip(accComponents, moments[1]):
             try:
-                data[comp] -= np.mean(data[comp])
+                data[comp] -= np.array(mean, dtype=data[comp].dtype)
             except:
                 print("*! could not calculate mean, data cleaning needed!")
                 continue
@@ -250,220 +749,2453 @@ def processDataSet_parallel(dataSet, pickleName=None, pattern = "log_0???.txt",
     return data
 
 
-### Functions for analysis
+### shared memory transfer of worker results
 
-def fftTimeSeries(data, newFigure=True, label=None):
+def frameToSharedMemory(df):
     """
-    performs a fft on the given data and plots it.
+    frameToSharedMemory(df):
 
-    returns peak frequency
+    copies the time index and all numeric and boolean columns of a
+    dataframe into one shared memory block, so that only a few bytes of
+    metadata have to be pickled and sent back to the parent process. The
+    block stays registered with the resource tracker of the parent (start it
+    before the pool, see processDataSet_parallel), which removes it should
+    the parent die before frameFromSharedMemory unlinked it.
+
+    returns a dict describing the layout of the block, None for empty frames
     """
 
-    if newFigure:
-        plt.figure()
-    deltaT = data.index.to_series().diff()
-    deltaTMean = np.mean(deltaT) / np.timedelta64(1, 's')
-    print(np.mean(deltaT) / np.timedelta64(1, 's'))
-    FFT = scipy.fftpack.fft(data)
-    PSD = np.abs(FFT) ** 2
-    Frequency = scipy.fftpack.fftfreq(len(data), deltaTMean)
-    Frequency_i = Frequency > 0
+    if df is None or df.empty:
+        return None
 
-    if label:
-        plt.plot(Frequency[Frequency_i], PSD[Frequency_i], label=label)
-    else:
-        plt.plot(Frequency[Frequency_i], PSD[Frequency_i])
+    numeric = [c for c in df.columns if np.issubdtype(df[c].dtype, np.number) or df[c].dtype == bool]
+    if len(numeric) < len(df.columns):
+        print("*! dropping non numeric columns: {}".format([c for c in df.columns if c not in numeric]))
 
-    plt.xlabel("Frequency"); plt.ylabel("Power Spectrum Density")
-    return Frequency[np.argmax(PSD)]
+    rows = len(df)
+    layout = list()
+    offset = rows * 8       # the index is stored first as int64 nanoseconds
+    for c in numeric:
+        dtype = df[c].dtype
+        layout.append((c, dtype.str, offset))
+        offset += -(-rows * dtype.itemsize // 8) * 8
 
-def butter_bandpass(lowcut, highcut, fs, order=5):
-    """
-    generates a butter bandpass filter object
-    """
-    nyq = 0.5 * fs
-    low = lowcut / nyq
-    high = highcut / nyq
-    b, a = butter(order, [low, high], btype='band')
-    return b, a
+    shm = shared_memory.SharedMemory(create=True, size=offset)
+    try:
+        np.ndarray(rows, dtype=np.int64, buffer=shm.buf)[:] = df.index.asi8
+        for c, dtype, columnOffset in layout:
+            np.ndarray(rows, dtype=dtype, buffer=shm.buf, offset=columnOffset)[:] = df[c].values
+    except:
+        shm.close()
+        shm.unlink()
+        raise
 
+    meta = {"name" : shm.name,
+            "rows" : rows,
+            "columns" : layout,
+            "tz" : str(df.index.tz) if df.index.tz is not None else None,
+            "indexName" : df.index.name,
+           }
+    shm.close()
 
-def butter_bandpass_filter(data, lowcut, highcut, fs, order=5):
+    return meta
+
+def releaseSharedMemory(metas):
     """
-    appliess a butter bandpass filter to the given dataDir
+    unlinks the shared memory blocks of the given metas (see
+    frameToSharedMemory), blocks that are already gone are skipped
     """
-    b, a = butter_bandpass(lowcut, highcut, fs, order=order)
-    y = lfilter(b, a, data)
-    return y
 
-def integrateVelocityAcceleration(df,
-                                  verbose=False,
-                                  resampleInterval="30ms",
-                                  filterLowCut=0.1,
-                                  filterHighCut=1,
-                                  filterFrequency=33.333,
-                                  filterOrder=3,
-                                  calculateDeflection=True,
-                                  components = ("x", "y", "z"),
-                                  applyG=True,
-                                 ):
-    g = 9.80665
-    
-    data = pd.DataFrame()
+    for meta in metas:
+        if meta is None:
+            continue
+        try:
+            shm = shared_memory.SharedMemory(name=meta["name"])
+        except FileNotFoundError:
+            continue
+        shm.close()
+        shm.unlink()
 
+def frameFromSharedMemory(metas):
     """
-    1. resample
-    2. filter
-    3. integrate
+    frameFromSharedMemory(metas):
 
-    if applyG:
-        if verbose: print("> applying g")
-        for comp in components:
-            df["acc_{}".format(comp)] = df["acc_{}".format(comp)]*g
-    
-    # add raw components to data frame
-    for comp in components:
-        data.insert(column="acc_{}".format(comp),
-                    value=df["acc_{}".format(comp)],
-                    loc=len(data.columns)
-                   )
-    """
-    # resample data
-    if verbose: print("*    resampling data to {}. Start time: {}".format(resampleInterval, df.index[0]))
-    # resample data and multiply with g!
-    for comp in components:
-        data.insert(column="acc_{}r".format(comp),
-                    value=df["acc_{}".format(comp)].resample(resampleInterval).bfill()*g,
-                    loc=len(data.columns)
-                   )
-
-    # time ins seconds, resampled -> used for integration
-    t = data.index.astype(np.int64)/10**9
-
-     
-    if verbose: print("*    applying filter with order = {} frequency = {} lowcut = {} highcut = {}".format(filterOrder,
-                                                                                                           filterFrequency,
-                                                                                                           filterLowCut,
-                                                                                                           filterHighCut,
-                                                                                                          ))
-    for comp in components:
-        data.insert(column="acc_{}rf".format(comp),
-                    value=butter_bandpass_filter(data["acc_{}r".format(comp)],
-                                                 filterLowCut,
-                                                 filterHighCut,
-                                                 filterFrequency,
-                                                 order=filterOrder),
-                    loc=len(data.columns)
-                   )
-
-
-    if verbose: print("*    integrating acceleration")
-    for comp in components:
-        if verbose: print("*        acceleration {}".format(comp.upper()))
-        # integrate filtered acceleration
-        data.insert(column="vel_{}".format(comp),
-                    value=integrate.cumtrapz(data["acc_{}rf".format(comp)], t, initial=0),
-                    loc=len(data.columns)
-                   )
-    if verbose: print("*    integrating velocity")
-    for comp in components:
-        if verbose: print("*        velocity {}".format(comp.upper()))
-        # integrate velocity to yield position
-        data.insert(column="pos_{}".format(comp),
-                    value=integrate.cumtrapz(data["vel_{}".format(comp)], t, initial=0),
-                    loc=len(data.columns)
-                   )
-        
-    if calculateDeflection:
-        if verbose: print("*    calculating deflection")
-        data.insert(column = "deflection",
-                    value = np.sqrt(np.power(data.pos_z, 2) + np.power(data.pos_x, 2)),
-                    loc = len(data.columns),
-                   )
+    builds one dataframe from a list of shared memory blocks written by
+    frameToSharedMemory. The final arrays are allocated once and every block
+    is copied into place using its own layout; all blocks have to hold the
+    same columns, their dtypes are promoted to a common one. If all columns
+    share one dtype, the dataframe is built on top of the preallocated block
+    without further copy. The blocks are unlinked in any case, also if the
+    layouts do not match.
 
-    return data
+    returns a dataframe
+    """
 
-def applyIntegration_parallel(dataset, 
-                              verbose=False,
-                              nProcs=32,
-                              integrationInterval="10min",
-                              resampleInterval="30ms",
-                              filterLowCut=0.1,
-                              filterHighCut=1,
-                              filterFrequency=30,
-                              filterOrder=3,
-                              calculateDeflection=True, 
-                              components = ("x", "y", "z"),
-                              applyG=True,
-                             ):
+    metas = [m for m in metas if m is not None]
+    if not metas:
+        return pd.DataFrame()
 
-    # create a pool of workers
-    pool = Pool(nProcs)
-    frames = list()
+    try:
+        names = [c for c, dtype, offset in metas[0]["columns"]]
+        dtypes = dict()
+        for meta in metas:
+            layout = {c : dtype for c, dtype, offset in meta["columns"]}
+            if sorted(layout) != sorted(names):
+                raise Exception("shared memory blocks with different columns: {} and {}".format(names, list(layout)))
+            if meta["tz"] != metas[0]["tz"]:
+                raise Exception("shared memory blocks with different time zones: {} and {}".format(metas[0]["tz"], meta["tz"]))
+            for c in names:
+                dtypes[c] = np.result_type(dtypes.get(c, layout[c]), layout[c])
+
+        total = sum(m["rows"] for m in metas)
+        index = np.empty(total, dtype=np.int64)
+        single = len(set(dtypes.values())) == 1
+        if single:
+            block = np.empty((total, len(names)), dtype=dtypes[names[0]], order="F")
+            values = {c : block[:, j] for j, c in enumerate(names)}
+        else:
+            values = {c : np.empty(total, dtype=dtypes[c]) for c in names}
+
+        start = 0
+        for meta in metas:
+            shm = shared_memory.SharedMemory(name=meta["name"])
+            try:
+                rows = meta["rows"]
+                index[start:start + rows] = np.ndarray(rows, dtype=np.int64, buffer=shm.buf)
+                for c, dtype, offset in meta["columns"]:
+                    values[c][start:start + rows] = np.ndarray(rows, dtype=dtype, buffer=shm.buf, offset=offset)
+            finally:
+                shm.close()
+            start += rows
+    finally:
+        releaseSharedMemory(metas)
+
+    index = pd.DatetimeIndex(pd.to_datetime(index, unit="ns", utc=metas[0]["tz"] is not None),
+                             name=metas[0]["indexName"])
+    if metas[0]["tz"] is not None:
+        index = index.tz_convert(metas[0]["tz"])
+
+    if single:
+        return pd.DataFrame(block, index=index, columns=names, copy=False)
+
+    return pd.DataFrame(values, index=index, columns=names)
+
+def sharedMemoryWorker(job, function):
+    """
+    runs function on the given job in a worker process and returns the
+    resulting dataframe via shared memory (see frameToSharedMemory)
+    """
 
-    if verbose: print("* integration interval set to {}. Starting integration with {} threads".format(integrationInterval, nProcs))
-    ## iterate over the sample intervalls and enable parallel integration
-    for t, dataSample in dataset.resample(integrationInterval):
-        if verbose: print("* integration start: {}".format(t))
-        
-        frames.append(
-            pool.apply_async(
-                integrateVelocityAcceleration, (dataSample,
-                                                verbose,
-                                                resampleInterval,
-                                                filterLowCut,
-                                                filterHighCut,
-                                                filterFrequency,
-                                                filterOrder,
-                                                calculateDeflection,
-                                                components
-                                                )))
-
-    pool.close()
-    pool.join()
-
-    frames = pd.concat([d.get() for d in frames])
-    
-    return frames
+    return frameToSharedMemory(function(job))
 
-def applyIntegration(dataset, 
-                     verbose=False,
-                     integrationInterval="10min",
-                     resampleInterval="30ms",
-                     filterLowCut=0.1,
-                     filterHighCut=1,
-                     filterFrequency=30,
-                     filterOrder=3,
-                     calculateDeflection=True, 
-                     components = ("x", "y", "z"),
-                     applyG=True,
-                    ):
-   
-    frames = list()
+def statisticsWorker(job, function, statistics, sharedMemory=False):
+    """
+    runs function (e.g. an integration worker) on the given job and applies
+    statistics (e.g. windowStatistics of stats.py) to the resulting
+    dataframe in the same worker process
 
-    if verbose: print("* integration interval set to {}".format(integrationInterval))
-    ## iterate over the sample intervalls and enable parallel integration
-    for t, dataSample in dataset.resample(integrationInterval):
-        if verbose: print("* integration start: {}".format(t))
-        
-        frames.append(integrateVelocityAcceleration(dataSample,
-                                                    verbose,
-                                                    resampleInterval,
-                                                    filterLowCut,
-                                                    filterHighCut,
-                                                    filterFrequency,
-                                                    filterOrder,
-                                                    calculateDeflection,
-                                                    components
-                                                   ))
+    returns the dataframe (via shared memory if sharedMemory) and its
+    statistics
+    """
 
-    frames = pd.concat(frames)
-    
-    return frames
+    frame = function(job)
 
+    return (frameToSharedMemory(frame) if sharedMemory else frame), statistics(frame)
 
 
-def correctTime(df, runTime, gpsTimeStamp, verbose=False):
+### streaming processing of logfiles
+
+def iterDataSet(dataSet, pattern="log_0???.txt", nProcs=None, memoryBudget=512*2**20, verbose=False, cache=False, substractMean=False, pool=None):
+    """
+    iterDataSet(dataSet, pattern="log_0???.txt", nProcs=None, memoryBudget=512*2**20, cache=False, substractMean=False, pool=None):
+
+    generator yielding the cleaned and GPS corrected data of a box directory
+    in time ordered chunks. The files are processed in parallel (see
+    mapOrdered), but at most nProcs files are in flight at any time and
+    results are collected in file order, hence the output is deterministic.
+    A chunk is yielded as soon as the collected frames exceed memoryBudget
+    (bytes), so the whole campaign is never held in memory at once. Rows
+    older than the last yielded time stamp (overlapping files) are dropped
+    to keep the output time ordered.
+    substractMean="file" removes the acceleration mean of every file in the
+    workers, a global mean is not available in a single pass.
+
+    yields dataframes
+    """
+
+    if not isdir(dataSet):
+        print("*! not a directory, skipping")
+        return
+
+    cols = checkLogFileVersion(dataSet, [columns, columns2])
+    dataFiles = sorted(glob(path.join(dataSet, pattern)))
+    nProcs = poolSize(len(dataFiles), nProcs)
+
+    if verbose: print("* streaming {} files from {}, memory budget {:.0f} MB".format(len(dataFiles),
+                                                                                     dataSet,
+                                                                                     memoryBudget / 2**20))
+
+    frames = list()
+    framesSize = 0
+    lastTime = None
+
+    for frame in mapOrdered(partial(processDataFile, cols=cols, verbose=verbose, cache=cache, substractMean=substractMean),
+                            dataFiles,
+                            len(dataFiles),
+                            nProcs=nProcs,
+                            pool=pool,
+                            maxPending=nProcs,
+                           ):
+        if frame is None or frame.empty:
+            continue
+
+        frames.append(frame)
+        framesSize += frame.memory_usage(index=True, deep=True).sum()
+
+        if framesSize < memoryBudget:
+            continue
+
+        chunk = mergeChunk(frames, lastTime, verbose=verbose)
+        frames = list()
+        framesSize = 0
+        if not chunk.empty:
+            lastTime = chunk.index[-1]
+            yield chunk
+
+    if frames:
+        chunk = mergeChunk(frames, lastTime, verbose=verbose)
+        if not chunk.empty:
+            yield chunk
+
+def mergeChunk(frames, lastTime=None, verbose=False):
+    """
+    concatenates a list of frames into one time ordered frame without
+    duplicated indices, dropping all rows up to lastTime
+
+    returns a dataframe
+    """
+
+    chunk = pd.concat(frames).sort_index()
+    chunk = chunk.loc[~chunk.index.duplicated(keep="first")]
+
+    if lastTime is not None:
+        overlap = chunk.index <= lastTime
+        if overlap.any():
+            if verbose: print("*! dropping {} rows overlapping with the previous chunk".format(overlap.sum()))
+            chunk = chunk.loc[~overlap]
+
+    return chunk
+
+
+### incremental processing of logfiles
+
+# column holding the log file of every row of incrementally processed data,
+# so the rows of a changed file can be replaced exactly
+SOURCECOLUMN = "logfile"
+
+def hashFile(dataFile, blockSize=2**20):
+    """
+    returns the sha1 hex digest of the content of a given file
+    """
+
+    sha1 = hashlib.sha1()
+    with open(dataFile, "rb") as f:
+        for block in iter(lambda: f.read(blockSize), b""):
+            sha1.update(block)
+
+    return sha1.hexdigest()
+
+def readManifest(manifestPath):
+    """
+    reads in a manifest written by writeManifest
+
+    returns a dict with the file names as keys, empty if there is no manifest
+    """
+
+    if not manifestPath or not isfile(manifestPath):
+        return dict()
+
+    with open(manifestPath) as manifestFile:
+        return json.load(manifestFile)
+
+def writeManifest(manifest, manifestPath):
+    """
+    writes a manifest (dict of file entries) as json to the given path
+    """
+
+    with open(manifestPath, "w") as manifestFile:
+        json.dump(manifest, manifestFile, indent=1, sort_keys=True)
+
+def changedFiles(dataSet, manifest, pattern="log_0???.txt", verbose=False):
+    """
+    changedFiles(dataSet, manifest, pattern="log_0???.txt"):
+
+    compares the files in a given box directory with the manifest. Files with
+    unchanged size and mtime are skipped without reading them, for all other
+    files the content hash decides whether the file needs to be parsed again.
+
+    returns a list of new or changed files and a dict holding the current
+    signature (path, size, mtime, hash) of every file found
+    """
+
+    changed = list()
+    signatures = dict()
+
+    for dataFile in sorted(glob(path.join(dataSet, pattern))):
+        name = path.basename(dataFile)
+        fileStat = stat(dataFile)
+        entry = manifest.get(name, dict())
+
+        signature = {"path" : dataFile, "size" : fileStat.st_size, "mtime" : fileStat.st_mtime}
+
+        if entry.get("size") == signature["size"] and entry.get("mtime") == signature["mtime"]:
+            signature["hash"] = entry.get("hash")
+        else:
+            signature["hash"] = hashFile(dataFile)
+            if signature["hash"] != entry.get("hash"):
+                if verbose: print("*    new or changed file: {}".format(name))
+                changed.append(dataFile)
+
+        signatures[name] = signature
+
+    return changed, signatures
+
+def processDataSet_incremental(dataSet, data=None, manifestPath=None, pattern="log_0???.txt", nProcs=None, verbose=False, pool=None, substractMean=False):
+    """
+    processDataSet_incremental(dataSet, data=None, manifestPath=None, pattern="log_0???.txt", nProcs=None, pool=None, substractMean=False):
+
+    only parses the files of a box directory that are not yet listed in the
+    manifest or whose content changed since the last run and merges them into
+    data, the result of the previous run. Every row carries the name of its
+    log file (SOURCECOLUMN), rows of changed files are replaced by that name,
+    files overlapping the time range of a changed or removed file are parsed
+    again, as their rows may have been dropped as duplicates. Rows of files
+    no longer found in the box are removed from data and manifest. Duplicated
+    time stamps keep the row of the first file, as in a full run. Without previous
+    data (or previous data without SOURCECOLUMN) the manifest is ignored and
+    all files are parsed again.
+    The manifest holds path, size, mtime, content hash, row count and the
+    first/last time stamp of every file and is updated in place.
+    As unchanged files are not read again, only the per file mean
+    (substractMean="file") can be removed.
+
+    returns the merged data and the updated manifest
+    """
+
+    if not isdir(dataSet):
+        print("*! not a directory, skipping")
+        return data, dict()
+
+    manifest = readManifest(manifestPath)
+
+    if data is not None and SOURCECOLUMN not in data.columns:
+        print("*! previous data has no {} column, rebuilding from scratch".format(SOURCECOLUMN))
+        data = None
+    if data is None and manifest:
+        if verbose: print("* no previous data, ignoring the manifest")
+        manifest = dict()
+
+    if verbose: print("* checking {} against manifest ({} files known)".format(dataSet, len(manifest)))
+    changed, signatures = changedFiles(dataSet, manifest, pattern=pattern, verbose=verbose)
+
+    if verbose: print("* {} of {} files new or changed".format(len(changed), len(signatures)))
+
+    for name in signatures:
+        if name in manifest:
+            signatures[name].update({k : manifest[name][k] for k in ("rows", "first", "last") if k in manifest[name]})
+
+    # files that vanished from the box are dropped from manifest and data
+    removed = [name for name in manifest if name not in signatures]
+    if removed and verbose: print("* {} files removed: {}".format(len(removed), ", ".join(sorted(removed))))
+
+    # rows of unchanged files that lost a duplicate time stamp against a
+    # changed or removed file are missing from data, so every file
+    # overlapping the previous time range of those files is parsed again
+    stale = removed + [path.basename(dfile) for dfile in changed]
+    ranges = [(pd.Timestamp(manifest[name]["first"]), pd.Timestamp(manifest[name]["last"]))
+              for name in stale if name in manifest and manifest[name].get("first")]
+    for name, signature in signatures.items():
+        if signature["path"] in changed or not signature.get("first"):
+            continue
+        first, last = pd.Timestamp(signature["first"]), pd.Timestamp(signature["last"])
+        if any(first <= end and start <= last for start, end in ranges):
+            if verbose: print("*    overlapping file: {}".format(name))
+            changed.append(signature["path"])
+
+    for name in removed:
+        del manifest[name]
+
+    # remove the rows of removed files and of the previous versions of the
+    # files parsed again
+    if data is not None:
+        parsed = [path.basename(dfile) for dfile in changed]
+        data = data.loc[data[SOURCECOLUMN].isin(list(signatures)) & ~data[SOURCECOLUMN].isin(parsed)]
+
+    if not changed:
+        manifest.update(signatures)
+        return data, manifest
+
+    cols = checkLogFileVersion(dataSet, [columns, columns2])
+
+    frames = mapOrdered(partial(processDataFile, cols=cols, verbose=verbose, substractMean=substractMean == "file" and "file"),
+                        changed,
+                        len(changed),
+                        nProcs=nProcs,
+                        pool=pool,
+                       )
+
+    newFrames = list()
+    for dfile, frame in zip(changed, frames):
+        name = path.basename(dfile)
+
+        if frame is None or frame.empty:
+            signatures[name].update({"rows" : 0, "first" : None, "last" : None})
+            continue
+
+        signatures[name].update({"rows" : len(frame),
+                                 "first" : frame.index[0].isoformat(),
+                                 "last" : frame.index[-1].isoformat(),
+                                })
+        frame[SOURCECOLUMN] = name
+        newFrames.append(frame)
+
+    manifest.update(signatures)
+
+    if data is not None:
+        newFrames.insert(0, data)
+
+    if not newFrames:
+        return data, manifest
+
+    # bring the rows into file order first and sort stably afterwards, so a
+    # duplicated time stamp keeps the row of the first file, just like the
+    # full run (processDataSet_parallel followed by keep='first')
+    data = pd.concat(newFrames)
+    fileOrder = {name : i for i, name in enumerate(sorted(signatures))}
+    data = data.iloc[np.argsort(data[SOURCECOLUMN].astype(str).map(fileOrder).to_numpy(), kind="mergesort")]
+    data = data.sort_index(kind="mergesort")
+    data = data.loc[~data.index.duplicated(keep="first")]
+    data[SOURCECOLUMN] = data[SOURCECOLUMN].astype("category")
+
+    return data, manifest
+
+
+### Functions for analysis
+
+def fftTimeSeries(data, newFigure=True, label=None):
+    """
+    performs a fft on the given data and plots it.
+
+    returns peak frequency
+    """
+
+    if newFigure:
+        plt.figure()
+    deltaT = data.index.to_series().diff()
+    deltaTMean = np.mean(deltaT) / np.timedelta64(1, 's')
+    print(np.mean(deltaT) / np.timedelta64(1, 's'))
+    FFT = scipy.fftpack.fft(data)
+    PSD = np.abs(FFT) ** 2
+    Frequency = scipy.fftpack.fftfreq(len(data), deltaTMean)
+    Frequency_i = Frequency > 0
+
+    if label:
+        plt.plot(Frequency[Frequency_i], PSD[Frequency_i], label=label)
+    else:
+        plt.plot(Frequency[Frequency_i], PSD[Frequency_i])
+
+    plt.xlabel("Frequency"); plt.ylabel("Power Spectrum Density")
+    return Frequency[np.argmax(PSD)]
+
+# available filter implementations: transfer function (legacy), second-order
+# sections and forward-backward second-order sections (zero-phase)
+FILTERTYPES = ("lfilter", "sos", "zerophase")
+
+@lru_cache(maxsize=64)
+def butter_bandpass(lowcut, highcut, fs, order=5):
+    """
+    generates a butter bandpass filter object, designs are cached
+    """
+    nyq = 0.5 * fs
+    low = lowcut / nyq
+    high = highcut / nyq
+    b, a = butter(order, [low, high], btype='band')
+    return b, a
+
+
+@lru_cache(maxsize=64)
+def butter_bandpass_sos(lowcut, highcut, fs, order=5):
+    """
+    generates a butter bandpass filter in second-order sections, which is
+    numerically stable at low cutoffs, designs are cached
+    """
+    nyq = 0.5 * fs
+    low = lowcut / nyq
+    high = highcut / nyq
+    return butter(order, [low, high], btype='band', output='sos')
+
+def filterBank(data, lowcut, highcut, fs, order=5, filterType="lfilter", axis=0):
+    """
+    filterBank(data, lowcut, highcut, fs, order=5, filterType="lfilter", axis=0):
+
+    applies a butter bandpass filter to all channels of data at once along
+    the given axis. filterType is one of FILTERTYPES:
+
+        lfilter:   transfer function (b, a), as used so far
+        sos:       second-order sections
+        zerophase: second-order sections, forward and backward (no phase lag)
+
+    returns the filtered data
+    """
+
+    if filterType == "lfilter":
+        b, a = butter_bandpass(lowcut, highcut, fs, order=order)
+        return lfilter(b, a, data, axis=axis)
+
+    sos = butter_bandpass_sos(lowcut, highcut, fs, order=order)
+
+    if filterType == "sos":
+        return sosfilt(sos, data, axis=axis)
+
+    if filterType == "zerophase":
+        # shorten the padding for short windows
+        padlen = min(3 * (2 * len(sos) + 1), np.shape(data)[axis] - 1)
+        return sosfiltfilt(sos, data, axis=axis, padlen=padlen)
+
+    raise Exception("unknown filter type: {}, available types: {}".format(filterType, FILTERTYPES))
+
+def butter_bandpass_filter(data, lowcut, highcut, fs, order=5, filterType="lfilter"):
+    """
+    appliess a butter bandpass filter to the given dataDir
+    """
+    return filterBank(data, lowcut, highcut, fs, order=order, filterType=filterType, axis=-1)
+
+# available integration engines: double cumulative trapezoid in the time domain
+# and division by (i omega)^2 in the frequency domain
+INTEGRATIONENGINES = ("time", "frequency")
+
+def periodicPadding(values, p, axis=0):
+    """
+    periodicPadding(values, p, axis=0):
+
+    appends p <= n samples along axis that blend with a raised cosine from
+    the start of the window (the periodic continuation after its end) into
+    the last p samples (the periodic predecessors of its start)
+
+    returns the padded array
+    """
+
+    n = values.shape[axis]
+    if p > n:
+        raise Exception("cannot pad {} samples with {} samples".format(n, p))
+
+    shape = [1] * values.ndim
+    shape[axis] = -1
+    weight = (0.5 - 0.5 * np.cos(np.pi * (np.arange(p) + 1) / (p + 1))).reshape(shape)
+
+    head = np.take(values, np.arange(p), axis=axis)
+    tail = np.take(values, np.arange(n - p, n), axis=axis)
+
+    return np.concatenate((values, (1 - weight) * head + weight * tail), axis=axis)
+
+def spectralIntegration(values, fs, lowcut, highcut, order=3, axis=0):
+    """
+    spectralIntegration(values, fs, lowcut, highcut, order=3, axis=0):
+
+    band limits and integrates equally spaced accelerations twice in the
+    frequency domain: one rfft along axis, a spectral mask with the
+    magnitude response of a butter bandpass (zero phase, no DC), division
+    by i omega for velocity and (i omega)^2 for position and an inverse rfft.
+    Works on arrays of any shape, e.g. (samples, axes) or (windows, samples,
+    axes) with axis=1, so all windows and axes are transformed at once.
+    The window is treated as periodic and the results have zero mean.
+    Window lengths with large prime factors (e.g. 10min at 33ms, 2 * 9091
+    samples) transform several times slower, so the window is padded to the
+    next fast length (next_fast_len) and trimmed afterwards. The
+    padding blends the periodic continuation after the end of the window
+    into the samples before its start, so both joints stay continuous.
+
+    returns the filtered acceleration, velocity and position
+    """
+
+    values = np.asarray(values, dtype=np.float64)
+    n = values.shape[axis]
+
+    m = next_fast_len(n, real=True)
+    if m > n:
+        values = periodicPadding(values, m - n, axis=axis)
+    else:
+        m = n
+
+    frequencies = np.fft.rfftfreq(m, 1 / fs)
+    _, response = sosfreqz(butter_bandpass_sos(lowcut, highcut, fs, order=order), worN=frequencies, fs=fs)
+    mask = np.abs(response)
+    mask[0] = 0
+
+    omega = 2 * np.pi * frequencies
+    omega[0] = 1
+
+    shape = [1] * values.ndim
+    shape[axis] = -1
+    mask = mask.reshape(shape)
+    integrator = 1 / (1j * omega.reshape(shape))
+
+    spectrum = np.fft.rfft(values, axis=axis) * mask
+    filtered = np.fft.irfft(spectrum, m, axis=axis)
+    spectrum *= integrator
+    velocity = np.fft.irfft(spectrum, m, axis=axis)
+    spectrum *= integrator
+    position = np.fft.irfft(spectrum, m, axis=axis)
+
+    if m > n:
+        window = [slice(None)] * values.ndim
+        window[axis] = slice(0, n)
+        window = tuple(window)
+        filtered, velocity, position = (x[window] - x[window].mean(axis=axis, keepdims=True) for x in (filtered, velocity, position))
+
+    return filtered, velocity, position
+
+def resampleBackfill(time, interval, origin=None, start=None):
+    """
+    resampleBackfill(time, interval, origin=None, start=None):
+
+    resamples samples with int64 time stamps (ns) onto an equally spaced grid
+    with the given interval (ns or pandas offset string). Every grid point
+    takes the first sample at or after its time stamp, the grid starts at
+    the first multiple of interval (counted from origin, default: midnight
+    UTC of the first sample) at or before the first sample, which equals
+    pd.DataFrame.resample(interval).bfill(). If start is given, the grid
+    starts there instead (continuation of a previous chunk)
+
+    returns the grid time stamps (int64, ns) and the indices of the samples
+    """
+
+    time = np.asarray(time, dtype=np.int64)
+    interval = pd.Timedelta(interval).value
+
+    if origin is None:
+        origin = time[0] - time[0] % (24 * 3600 * 10**9)
+
+    first = origin + (time[0] - origin) // interval * interval if start is None else start
+    last = origin + (time[-1] - origin) // interval * interval
+    grid = np.arange(first, last + interval, interval, dtype=np.int64)
+
+    return grid, np.searchsorted(time, grid, side="left")
+
+# available resampling methods, see interpolateGrid
+RESAMPLEMETHODS = ("bfill", "linear", "nearest")
+
+def interpolateGrid(time, values, grid, method="bfill", maxGap=None, bounds=None):
+    """
+    interpolateGrid(time, values, grid, method="bfill", maxGap=None, bounds=None):
+
+    maps samples with int64 time stamps (ns) and (N, k) values onto grid
+    time stamps of any shape (e.g. (M,) or (windows, M)) using searchsorted
+    for all channels at once. method is one of RESAMPLEMETHODS:
+
+        bfill:   first sample at or after the grid point (pandas bfill)
+        linear:  linear interpolation between the surrounding samples
+        nearest: closest sample
+
+    If maxGap (ns or pandas offset string) is given, grid points between two
+    samples further apart than maxGap are reported as gaps.
+
+    If bounds (first, last sample index, broadcastable to grid, e.g. (windows,
+    1) arrays) is given, every grid point only sees the samples within its
+    bounds, so the windows of a stacked grid are resampled as if they were
+    resampled one by one.
+
+    returns the values (grid.shape + (k,)) and the gap mask (grid.shape,
+    None if maxGap is None)
+    """
+
+    time = np.asarray(time, dtype=np.int64)
+    values = np.asarray(values)
+    first, last = (0, len(time) - 1) if bounds is None else bounds
+
+    after = np.clip(np.searchsorted(time, grid, side="left"), first, last)
+    before = np.maximum(after - 1, first)
+    exact = time[after] == grid
+
+    if method == "bfill":
+        resampled = values[after]
+    elif method in ("linear", "nearest"):
+        span = time[after] - time[before]
+        weight = np.where(exact | (span <= 0), 1.0, (grid - time[before]) / np.maximum(span, 1))
+        if method == "nearest":
+            resampled = values[np.where(weight >= 0.5, after, before)]
+        else:
+            weight = weight[..., np.newaxis]
+            resampled = values[before] * (1 - weight) + values[after] * weight
+    else:
+        raise Exception("unknown resample method: {}, available methods: {}".format(method, RESAMPLEMETHODS))
+
+    gaps = None
+    if maxGap is not None:
+        gaps = ~exact & (time[after] - time[before] > pd.Timedelta(maxGap).value)
+
+    return resampled, gaps
+
+def windowGridMask(grid, time, integrationInterval, resampleInterval, origin):
+    """
+    windowGridMask(grid, time, integrationInterval, resampleInterval, origin):
+
+    marks the grid time stamps (int64, ns) that a per window integration
+    (applyIntegration) of samples with the time stamps time produces: every
+    non empty integrationInterval window (counted from origin) is resampled
+    from the grid point at or before its first sample up to the grid point
+    at or before its last sample. Drivers with a continuous grid (streaming,
+    overlapping windows) use it to return the same rows.
+
+    returns a boolean mask of grid
+    """
+
+    grid = np.asarray(grid, dtype=np.int64)
+    time = np.asarray(time, dtype=np.int64)
+    if len(time) == 0:
+        return np.zeros(grid.shape, dtype=bool)
+
+    step = pd.Timedelta(resampleInterval).value
+    interval = pd.Timedelta(integrationInterval).value
+
+    windowIds = (time - origin) // interval
+    starts = np.flatnonzero(np.r_[True, windowIds[1:] != windowIds[:-1]])
+    ends = np.r_[starts[1:], len(time)] - 1
+    firsts = origin + (time[starts] - origin) // step * step
+    lasts = origin + (time[ends] - origin) // step * step
+
+    window = np.searchsorted(firsts, grid, side="right") - 1
+
+    return (window >= 0) & (grid <= lasts[np.maximum(window, 0)])
+
+def resampleUniform(time, values, interval, origin=None, start=None, method="bfill", maxGap=None):
+    """
+    resampleUniform(time, values, interval, origin=None, start=None, method="bfill", maxGap=None):
+
+    resamples (N, k) values with int64 time stamps (ns) onto an equally
+    spaced grid, see resampleBackfill for the grid and interpolateGrid for
+    method and maxGap
+
+    returns the grid time stamps (int64, ns), the values and the gap mask
+    """
+
+    grid, _ = resampleBackfill(time, interval, origin=origin, start=start)
+    resampled, gaps = interpolateGrid(time, values, grid, method=method, maxGap=maxGap)
+
+    return grid, resampled, gaps
+
+# available integration backends: numpy (reference, default), numba (fused
+# kernel) and auto (numba if installed and applicable, otherwise numpy). numba
+# has to be opted into, compiling the kernel takes a few seconds per process
+BACKENDS = ("numpy", "numba", "auto")
+
+def fusedIntegrationLoop(windows, k, b, a, sos, dt, gaps, deflectionA, deflectionB, calculateDeflection):
+    """
+    fusedIntegrationLoop(windows, k, b, a, sos, dt, gaps, deflectionA, deflectionB, calculateDeflection):
+
+    filters, integrates twice and calculates the deflection of a (windows,
+    samples, 4k [+ 1]) block in a single pass over the samples of every
+    channel, see integrateGrid. The filter is applied as transfer function
+    (b, a, direct form II transposed as scipy's lfilter) or, if sos has
+    rows, as cascade of second-order sections (as scipy's sosfilt). gaps is
+    a (windows, samples) mask or an empty (0, 0) array.
+
+    plain python, compiled with numba if available (jitFusedIntegrationLoop)
+    """
+
+    nWindows = windows.shape[0]
+    nSamples = windows.shape[1]
+    order = len(a) - 1
+    nSections = sos.shape[0]
+    hasGaps = gaps.shape[0] > 0
+    halfStep = 0.5 * dt
+
+    for w in range(nWindows):
+        for c in range(k):
+            z = np.zeros(max(order, 1))
+            zs = np.zeros((max(nSections, 1), 2))
+
+            for i in range(nSamples):
+                x = windows[w, i, c]
+
+                if nSections > 0:
+                    y = x
+                    for s in range(nSections):
+                        out = sos[s, 0] * y + zs[s, 0]
+                        zs[s, 0] = sos[s, 1] * y - sos[s, 4] * out + zs[s, 1]
+                        zs[s, 1] = sos[s, 2] * y - sos[s, 5] * out
+                        y = out
+                else:
+                    y = z[0] + x * b[0]
+                    for j in range(order - 1):
+                        z[j] = z[j + 1] + x * b[j + 1] - y * a[j + 1]
+                    z[order - 1] = x * b[order] - y * a[order]
+
+                gap = hasGaps and gaps[w, i]
+                if gap:
+                    y = 0.0
+                windows[w, i, k + c] = y
+
+                if i == 0:
+                    windows[w, i, 2*k + c] = 0.0
+                    windows[w, i, 3*k + c] = 0.0
+                elif gap:
+                    windows[w, i, 2*k + c] = windows[w, i - 1, 2*k + c]
+                    windows[w, i, 3*k + c] = windows[w, i - 1, 3*k + c]
+                else:
+                    velocity = windows[w, i - 1, 2*k + c] + (y + windows[w, i - 1, k + c]) * halfStep
+                    windows[w, i, 2*k + c] = velocity
+                    windows[w, i, 3*k + c] = windows[w, i - 1, 3*k + c] + (velocity + windows[w, i - 1, 2*k + c]) * halfStep
+
+        if calculateDeflection:
+            for i in range(nSamples):
+                windows[w, i, 4*k] = math.hypot(windows[w, i, 3*k + deflectionA], windows[w, i, 3*k + deflectionB])
+
+# compiled per process: numba's on-disk cache records the module name, which
+# differs between the bin scripts (bikbox) and package imports (yasb.bikbox)
+jitFusedIntegrationLoop = njit(nogil=True)(fusedIntegrationLoop) if njit is not None else None
+
+def fusedIntegration(block,
+                     k,
+                     resampleInterval="30ms",
+                     filterLowCut=0.1,
+                     filterHighCut=1,
+                     filterFrequency=33.333,
+                     filterOrder=3,
+                     calculateDeflection=True,
+                     deflectionAxes=(0, 2),
+                     filterType="lfilter",
+                     gaps=None,
+                     loop=None,
+                    ):
+    """
+    fusedIntegration(block, k, resampleInterval="30ms", filterLowCut=0.1, filterHighCut=1, filterFrequency=33.333, filterOrder=3, calculateDeflection=True, deflectionAxes=(0, 2), filterType="lfilter", gaps=None, loop=None):
+
+    time domain filtering and integration of a (samples, 4k [+ 1]) or
+    (windows, samples, 4k [+ 1]) block in place with the fused kernel
+    (default: the numba compiled loop), filterType is lfilter or sos
+
+    returns block
+    """
+
+    if loop is None:
+        loop = jitFusedIntegrationLoop
+    if loop is None:
+        raise Exception("the fused integration kernel requires numba -> pip install numba")
+
+    if filterType == "sos":
+        sos = np.ascontiguousarray(butter_bandpass_sos(filterLowCut, filterHighCut, filterFrequency, order=filterOrder), dtype=np.float64)
+        b = a = np.zeros(1)
+    elif filterType == "lfilter":
+        b, a = butter_bandpass(filterLowCut, filterHighCut, filterFrequency, order=filterOrder)
+        b, a = np.asarray(b / a[0], dtype=np.float64), np.asarray(a / a[0], dtype=np.float64)
+        sos = np.zeros((0, 6))
+    else:
+        raise Exception("filter type {} is not supported by the fused kernel, use lfilter or sos".format(filterType))
+
+    windows = block.reshape((-1,) + block.shape[-2:])
+    if not np.shares_memory(windows, block):
+        raise Exception("the fused kernel requires a contiguous block")
+
+    gapMask = np.zeros((0, 0), dtype=np.bool_) if gaps is None else gaps.reshape(windows.shape[:2])
+
+    loop(windows,
+         k,
+         b,
+         a,
+         sos,
+         pd.Timedelta(resampleInterval).value / 10**9,
+         gapMask,
+         deflectionAxes[0],
+         deflectionAxes[1],
+         calculateDeflection,
+        )
+
+    return block
+
+@lru_cache(maxsize=None)
+def checkFusedIntegration(rtol=1e-9, atol=1e-12):
+    """
+    compares the compiled fused kernel with the numpy reference path on a
+    random signal (with a gap) for both filter types, once per process
+
+    returns True if all results agree within the tolerance
+    """
+
+    if jitFusedIntegrationLoop is None:
+        return False
+
+    rng = np.random.default_rng(0)
+    k = 3
+    reference = np.zeros((2, 4000, 4 * k + 1))
+    reference[..., :k] = rng.standard_normal((2, 4000, k))
+    gaps = np.zeros((2, 4000), dtype=bool)
+    gaps[1, 1000:1200] = True
+
+    for filterType in ("lfilter", "sos"):
+        for mask in (None, gaps):
+            fused = reference.copy()
+            fusedIntegration(fused, k, filterType=filterType, gaps=mask)
+            expected = integrateGrid(reference.copy(), k, filterType=filterType, gaps=mask, backend="numpy")
+            if not np.allclose(fused, expected, rtol=rtol, atol=atol):
+                return False
+
+    return True
+
+def integrationBackend(backend="numpy", filterType="lfilter", integrationEngine="time"):
+    """
+    resolves the integration backend: numba is used if requested (or auto),
+    installed, applicable (time domain, lfilter or sos) and checked against
+    the numpy reference (checkFusedIntegration). An explicitly requested but
+    unusable numba backend raises an exception.
+
+    returns numpy or numba
+    """
+
+    if backend == "numpy":
+        return "numpy"
+
+    if backend not in BACKENDS:
+        raise Exception("unknown backend: {}, available backends: {}".format(backend, BACKENDS))
+
+    usable = jitFusedIntegrationLoop is not None and integrationEngine == "time" and filterType in ("lfilter", "sos")
+
+    if backend == "numba" and not usable:
+        raise Exception("the numba backend requires numba and supports time domain integration with lfilter or sos filters only")
+
+    if usable:
+        try:
+            matches = checkFusedIntegration()
+        except Exception as e:
+            if backend == "numba":
+                raise Exception("the numba backend could not be compiled -> {}".format(e))
+            print("*! could not compile the fused kernel, using numpy -> {}".format(e))
+            return "numpy"
+
+    if usable and not matches:
+        if backend == "numba":
+            raise Exception("the numba backend does not match the numpy reference, use the numpy backend")
+        print("*! fused kernel does not match the numpy reference, using numpy")
+        return "numpy"
+
+    return "numba" if usable else "numpy"
+
+def integrateGrid(block,
+                  k,
+                  resampleInterval="30ms",
+                  filterLowCut=0.1,
+                  filterHighCut=1,
+                  filterFrequency=33.333,
+                  filterOrder=3,
+                  calculateDeflection=True,
+                  deflectionAxes=(0, 2),
+                  detrend=None,
+                  filterType="lfilter",
+                  integrationEngine="time",
+                  gaps=None,
+                  backend="numpy",
+                 ):
+    """
+    integrateGrid(block, k, resampleInterval="30ms", filterLowCut=0.1, filterHighCut=1, filterFrequency=33.333, filterOrder=3, calculateDeflection=True, deflectionAxes=(0, 2), detrend=None, filterType="lfilter", integrationEngine="time", gaps=None, backend="numpy"):
+
+    filters and integrates k axes of acceleration sampled on an equally
+    spaced grid in place. block is a (samples, 4k [+ 1]) or (windows,
+    samples, 4k [+ 1]) array whose first k columns hold the resampled
+    acceleration, the remaining columns are filled as described in
+    integrationKernel. Every window is integrated independently.
+
+    gaps is an optional boolean mask of the samples (block.shape[:-1])
+    without measurements: the filtered acceleration is set to zero there and
+    velocity and position are held, so that gaps do not add displacement.
+    The frequency engine fills gaps with the mean of the window before the
+    transform.
+
+    backend selects the numpy reference path or the fused numba kernel, see
+    integrationBackend
+
+    returns block
+    """
+
+    resampled = block[..., :k]
+    filtered = block[..., k:2*k]
+    velocity = block[..., 2*k:3*k]
+    position = block[..., 3*k:4*k]
+    axis = block.ndim - 2
+
+    # remove the mean or linear trend of the window (slow sensor bias drift)
+    if detrend:
+        resampled[:] = detrendWindow(resampled, mode=detrend, axis=axis)
+
+    if gaps is not None and not gaps.any():
+        gaps = None
+
+    if integrationBackend(backend, filterType, integrationEngine) == "numba":
+        return fusedIntegration(block,
+                                k,
+                                resampleInterval=resampleInterval,
+                                filterLowCut=filterLowCut,
+                                filterHighCut=filterHighCut,
+                                filterFrequency=filterFrequency,
+                                filterOrder=filterOrder,
+                                calculateDeflection=calculateDeflection,
+                                deflectionAxes=deflectionAxes,
+                                filterType=filterType,
+                                gaps=gaps,
+                               )
+
+    if integrationEngine == "frequency":
+        fs = 10**9 / pd.Timedelta(resampleInterval).value
+        source = resampled
+        if gaps is not None:
+            valid = ~gaps[..., np.newaxis]
+            mean = np.sum(resampled * valid, axis=axis, keepdims=True) / np.maximum(np.sum(valid, axis=axis, keepdims=True), 1)
+            source = np.where(valid, resampled, mean)
+        filtered[:], velocity[:], position[:] = spectralIntegration(source, fs, filterLowCut, filterHighCut, order=filterOrder, axis=axis)
+        if gaps is not None:
+            filtered[gaps] = 0
+    elif integrationEngine == "time":
+        filtered[:] = filterBank(resampled, filterLowCut, filterHighCut, filterFrequency, order=filterOrder, filterType=filterType, axis=axis)
+        if gaps is not None:
+            filtered[gaps] = 0
+
+        # cumulative trapezoidal integration along the time axis, no increments within gaps
+        dt = pd.Timedelta(resampleInterval).value / 10**9
+        increments = (filtered[..., 1:, :] + filtered[..., :-1, :]) * (0.5 * dt)
+        if gaps is not None:
+            increments[gaps[..., 1:]] = 0
+        velocity[..., 0, :] = 0
+        np.cumsum(increments, axis=axis, out=velocity[..., 1:, :])
+
+        increments = (velocity[..., 1:, :] + velocity[..., :-1, :]) * (0.5 * dt)
+        if gaps is not None:
+            increments[gaps[..., 1:]] = 0
+        position[..., 0, :] = 0
+        np.cumsum(increments, axis=axis, out=position[..., 1:, :])
+    else:
+        raise Exception("unknown integration engine: {}, available engines: {}".format(integrationEngine, INTEGRATIONENGINES))
+
+    if calculateDeflection:
+        np.hypot(position[..., deflectionAxes[0]], position[..., deflectionAxes[1]], out=block[..., 4*k])
+
+    return block
+
+def integrationKernel(acc,
+                      time,
+                      resampleInterval="30ms",
+                      filterLowCut=0.1,
+                      filterHighCut=1,
+                      filterFrequency=33.333,
+                      filterOrder=3,
+                      calculateDeflection=True,
+                      deflectionAxes=(0, 2),
+                      detrend=None,
+                      origin=None,
+                      g=9.80665,
+                      filterType="lfilter",
+                      integrationEngine="time",
+                      resampleMethod="bfill",
+                      maxGap=None,
+                      backend="numpy",
+                     ):
+    """
+    integrationKernel(acc, time, resampleInterval="30ms", filterLowCut=0.1, filterHighCut=1, filterFrequency=33.333, filterOrder=3, calculateDeflection=True, deflectionAxes=(0, 2), detrend=None, origin=None, filterType="lfilter", integrationEngine="time", resampleMethod="bfill", maxGap=None, backend="numpy"):
+
+    array version of integrateVelocityAcceleration: takes a (N, k) array of
+    accelerations (in g) and the int64 time stamps (ns) of the samples and
+    resamples, filters and integrates all k axes at once. The result is
+    written into one preallocated (M, 4k + 1) block with the column groups
+
+        resampled acceleration | filtered acceleration | velocity | position | deflection
+
+    deflection is the horizontal norm of the positions of deflectionAxes
+    and only filled if calculateDeflection is True, otherwise the block has
+    4k columns. filterType selects the filter implementation, see filterBank.
+    With integrationEngine="frequency" filtering and integration are done
+    in the frequency domain at the resampled rate instead, see
+    spectralIntegration (filterFrequency and filterType are not used).
+
+    resampleMethod and maxGap are passed to interpolateGrid. If maxGap is
+    given, samples within gaps are masked (see integrateGrid) and the mask
+    is appended to the block as a last column (1.0 within gaps).
+
+    returns the grid time stamps (int64, ns) and the block
+    """
+
+    acc = np.asarray(acc)
+    if acc.ndim == 1:
+        acc = acc[:, np.newaxis]
+    k = acc.shape[1]
+
+    grid, resampled, gaps = resampleUniform(time, acc, resampleInterval, origin=origin, method=resampleMethod, maxGap=maxGap)
+
+    block = np.empty((len(grid), 4 * k + (1 if calculateDeflection else 0) + (1 if gaps is not None else 0)), dtype=np.float64)
+    np.multiply(resampled, g, out=block[:, :k])
+    if gaps is not None:
+        block[:, -1] = gaps
+
+    integrateGrid(block,
+                  k,
+                  resampleInterval=resampleInterval,
+                  filterLowCut=filterLowCut,
+                  filterHighCut=filterHighCut,
+                  filterFrequency=filterFrequency,
+                  filterOrder=filterOrder,
+                  calculateDeflection=calculateDeflection,
+                  deflectionAxes=deflectionAxes,
+                  detrend=detrend,
+                  filterType=filterType,
+                  integrationEngine=integrationEngine,
+                  gaps=gaps,
+                  backend=backend,
+                 )
+
+    return grid, block
+
+def integrateVelocityAcceleration(df,
+                                  verbose=False,
+                                  resampleInterval="30ms",
+                                  filterLowCut=0.1,
+                                  filterHighCut=1,
+                                  filterFrequency=33.333,
+                                  filterOrder=3,
+                                  calculateDeflection=True,
+                                  components = ("x", "y", "z"),
+                                  applyG=True,
+                                  detrend=None,
+                                  filterType="lfilter",
+                                  integrationEngine="time",
+                                  resampleMethod="bfill",
+                                  maxGap=None,
+                                  backend="numpy",
+                                 ):
+    """
+    integrateVelocityAcceleration(df, verbose=False, resampleInterval="30ms", filterLowCut=0.1, filterHighCut=1, filterFrequency=33.333, filterOrder=3, calculateDeflection=True, components=("x", "y", "z"), detrend=None, filterType="lfilter", integrationEngine="time", resampleMethod="bfill", maxGap=None, backend="numpy"):
+
+    resamples, filters and integrates the acceleration components of a
+    dataframe twice, see integrationKernel
+
+    returns a dataframe with the columns acc_?r, acc_?rf, vel_?, pos_?,
+    deflection (horizontal norm of pos_x and pos_z) and, if maxGap is
+    given, gap (True within gaps longer than maxGap)
+    """
+
+    components = list(components)
+    calculateDeflection = calculateDeflection and "x" in components and "z" in components
+
+    if verbose: print("*    resampling data to {} ({}). Start time: {}".format(resampleInterval, resampleMethod, df.index[0]))
+    if verbose and detrend: print("*    detrending data: {}".format(detrend))
+    if verbose: print("*    applying {} filter with order = {} frequency = {} lowcut = {} highcut = {}".format(filterType,
+                                                                                                              filterOrder,
+                                                                                                              filterFrequency,
+                                                                                                              filterLowCut,
+                                                                                                              filterHighCut,
+                                                                                                             ))
+    if verbose: print("*    integrating acceleration and velocity, {} domain, {} backend".format(integrationEngine,
+                                                                                         integrationBackend(backend, filterType, integrationEngine)))
+
+    # pandas aligns resample bins to midnight of the first day in the time zone of the index
+    origin = df.index[0].normalize().value
+
+    grid, block = integrationKernel(df[["acc_{}".format(comp) for comp in components]].values,
+                                    df.index.values.astype(np.int64),
+                                    resampleInterval=resampleInterval,
+                                    filterLowCut=filterLowCut,
+                                    filterHighCut=filterHighCut,
+                                    filterFrequency=filterFrequency,
+                                    filterOrder=filterOrder,
+                                    calculateDeflection=calculateDeflection,
+                                    deflectionAxes=(components.index("x"), components.index("z")) if calculateDeflection else (0, 0),
+                                    detrend=detrend,
+                                    origin=origin,
+                                    filterType=filterType,
+                                    integrationEngine=integrationEngine,
+                                    resampleMethod=resampleMethod,
+                                    maxGap=maxGap,
+                                    backend=backend,
+                                   )
+
+    if verbose and calculateDeflection: print("*    calculating deflection")
+
+    return integrationFrame(grid, block, components, calculateDeflection, df.index, gapColumn=maxGap is not None)
+
+def integrationColumns(components=("x", "y", "z"), calculateDeflection=True, gapColumn=False):
+    """
+    returns the column names of an integration block, see integrationKernel
+    """
+
+    names = ["acc_{}r".format(comp) for comp in components] \
+          + ["acc_{}rf".format(comp) for comp in components] \
+          + ["vel_{}".format(comp) for comp in components] \
+          + ["pos_{}".format(comp) for comp in components]
+    if calculateDeflection:
+        names.append("deflection")
+    if gapColumn:
+        names.append("gap")
+
+    return names
+
+def integrationFrame(grid, block, components, calculateDeflection, like, gapColumn=False):
+    """
+    wraps the grid (int64, ns) and block of an integration kernel into a
+    dataframe whose index has the name and time zone of the index like
+    """
+
+    index = pd.DatetimeIndex(pd.to_datetime(grid, unit="ns", utc=True), name=like.name)
+    if like.tz is not None:
+        index = index.tz_convert(like.tz)
+    else:
+        index = index.tz_localize(None)
+
+    data = pd.DataFrame(block, index=index, columns=integrationColumns(components, calculateDeflection, gapColumn), copy=False)
+    if gapColumn:
+        data["gap"] = data["gap"].astype(bool)
+
+    return data
+
+### streaming integration
+
+def streamingIntegrator(resampleInterval="30ms",
+                        filterLowCut=0.1,
+                        filterHighCut=1,
+                        filterFrequency=33.333,
+                        filterOrder=3,
+                        resetInterval="1h",
+                        maxGap="1min",
+                        calculateDeflection=True,
+                        deflectionAxes=(0, 2),
+                        g=9.80665,
+                        filterType="lfilter",
+                       ):
+    """
+    streamingIntegrator(resampleInterval="30ms", filterLowCut=0.1, filterHighCut=1, filterFrequency=33.333, filterOrder=3, resetInterval="1h", maxGap="1min", calculateDeflection=True, deflectionAxes=(0, 2), filterType="lfilter"):
+
+    creates the state of a streaming integration: the filter coefficients,
+    the filter state (zi), the next grid time stamp and the last filtered
+    acceleration, velocity and position. Chunks passed to
+    streamingIntegrationKernel continue exactly where the previous chunk
+    ended, so there is no filter transient at chunk borders.
+
+    To bound the drift of the double integration, velocity and position are
+    reset to zero at every multiple of resetInterval (counted from midnight
+    of the first sample, None disables the resets). Gaps in the data longer
+    than maxGap restart the whole state. Zero-phase filtering needs the
+    whole signal and is not available, filterType is lfilter or sos.
+
+    returns the state (dict)
+    """
+
+    if filterType == "lfilter":
+        coefficients = butter_bandpass(filterLowCut, filterHighCut, filterFrequency, order=filterOrder)
+    elif filterType == "sos":
+        coefficients = butter_bandpass_sos(filterLowCut, filterHighCut, filterFrequency, order=filterOrder)
+    else:
+        raise Exception("filter type {} is not supported when streaming, use lfilter or sos".format(filterType))
+
+    return {"interval" : pd.Timedelta(resampleInterval).value,
+            "reset" : pd.Timedelta(resetInterval).value if resetInterval else None,
+            "maxGap" : pd.Timedelta(maxGap).value,
+            "filterType" : filterType,
+            "coefficients" : coefficients,
+            "calculateDeflection" : calculateDeflection,
+            "deflectionAxes" : deflectionAxes,
+            "g" : g,
+            "origin" : None,
+            "next" : None,
+            "zi" : None,
+            "last" : None,
+           }
+
+def resetStreamingIntegrator(state):
+    """
+    drops filter state and integration constants of a streaming integrator,
+    the next chunk starts a new integration
+
+    returns the state
+    """
+
+    state.update({"next" : None, "zi" : None, "last" : None})
+
+    return state
+
+def cumulativeTrapezoid(values, grid, out, previous=None, resets=()):
+    """
+    cumulativeTrapezoid(values, grid, out, previous=None, resets=()):
+
+    integrates the columns of values over the time stamps grid (int64, ns)
+    into out. previous = (time, value, integral) of the last sample of the
+    previous chunk continues that integral, otherwise the integral starts
+    at zero. At the row indices resets the integral restarts at zero.
+
+    returns out
+    """
+
+    increments = np.empty_like(values)
+    increments[1:] = (values[1:] + values[:-1]) * 0.5 * (np.diff(grid) / 10**9)[:, np.newaxis]
+
+    if previous is None:
+        increments[0] = 0
+    else:
+        time, value, integral = previous
+        increments[0] = integral + (values[0] + value) * 0.5 * (grid[0] - time) / 10**9
+
+    increments[resets] = 0
+    bounds = np.unique(np.concatenate(([0], resets, [len(values)])).astype(np.int64))
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        np.cumsum(increments[start:end], axis=0, out=out[start:end])
+
+    return out
+
+def streamingIntegrationKernel(state, acc, time):
+    """
+    streamingIntegrationKernel(state, acc, time):
+
+    resamples, filters and integrates the next chunk of a stream of
+    accelerations ((N, k) array in g, int64 time stamps in ns) using and
+    updating the given streamingIntegrator state. Grid points after the last
+    sample of the chunk are produced with the next chunk. Gaps longer than
+    maxGap, between chunks or within a chunk, restart the integration.
+
+    returns the grid time stamps (int64, ns) and the block, see integrationKernel
+    """
+
+    acc = np.asarray(acc)
+    if acc.ndim == 1:
+        acc = acc[:, np.newaxis]
+    time = np.asarray(time, dtype=np.int64)
+    k = acc.shape[1]
+    width = 4 * k + (1 if state["calculateDeflection"] else 0)
+
+    if len(time) == 0:
+        return np.empty(0, dtype=np.int64), np.empty((0, width))
+
+    if state["next"] is not None and time[0] - state["next"] > state["maxGap"]:
+        resetStreamingIntegrator(state)
+
+    # gaps within the chunk restart the integration as well, the parts
+    # between the gaps are integrated one after the other
+    splits = np.flatnonzero(np.diff(time) > state["maxGap"]) + 1
+    if len(splits):
+        parts = list()
+        for i, (part, partTime) in enumerate(zip(np.split(acc, splits), np.split(time, splits))):
+            if i > 0:
+                resetStreamingIntegrator(state)
+            parts.append(streamingIntegrationKernel(state, part, partTime))
+        return np.concatenate([grid for grid, _ in parts]), np.concatenate([block for _, block in parts])
+
+    if state["origin"] is None:
+        state["origin"] = time[0] - time[0] % (24 * 3600 * 10**9)
+
+    grid, indices = resampleBackfill(time, state["interval"], origin=state["origin"], start=state["next"])
+
+    block = np.empty((len(grid), width), dtype=np.float64)
+    if len(grid) == 0:
+        return grid, block
+
+    resampled = block[:, :k]
+    filtered = block[:, k:2*k]
+    velocity = block[:, 2*k:3*k]
+    position = block[:, 3*k:4*k]
+
+    np.multiply(acc[indices], state["g"], out=resampled)
+
+    # start the filter in its steady state for the first sample
+    if state["filterType"] == "sos":
+        sos = state["coefficients"]
+        if state["zi"] is None:
+            state["zi"] = sosfilt_zi(sos)[:, :, np.newaxis] * resampled[0]
+        filtered[:], state["zi"] = sosfilt(sos, resampled, axis=0, zi=state["zi"])
+    else:
+        b, a = state["coefficients"]
+        if state["zi"] is None:
+            state["zi"] = lfilter_zi(b, a)[:, np.newaxis] * resampled[0]
+        filtered[:], state["zi"] = lfilter(b, a, resampled, axis=0, zi=state["zi"])
+
+    resets = np.empty(0, dtype=np.int64)
+    if state["reset"]:
+        resets = np.flatnonzero((grid - state["origin"]) % state["reset"] == 0)
+
+    last = state["last"]
+    cumulativeTrapezoid(filtered, grid, velocity, None if last is None else (last[0], last[1], last[2]), resets)
+    cumulativeTrapezoid(velocity, grid, position, None if last is None else (last[0], last[2], last[3]), resets)
+
+    if state["calculateDeflection"]:
+        axes = state["deflectionAxes"]
+        np.hypot(position[:, axes[0]], position[:, axes[1]], out=block[:, -1])
+
+    state["next"] = grid[-1] + state["interval"]
+    state["last"] = (grid[-1], filtered[-1].copy(), velocity[-1].copy(), position[-1].copy())
+
+    return grid, block
+
+def streamIntegration(state, df, components=("x", "y", "z"), verbose=False):
+    """
+    streamIntegration(state, df, components=("x", "y", "z")):
+
+    dataframe version of streamingIntegrationKernel, the state has to be
+    created for the same components (deflectionAxes)
+
+    returns the integrated chunk as a dataframe, see integrateVelocityAcceleration
+    """
+
+    components = list(components)
+
+    if df.empty:
+        return pd.DataFrame(columns=integrationColumns(components, state["calculateDeflection"]))
+
+    # align the grid to midnight of the first day in the time zone of the data, as pandas does
+    if state["origin"] is None:
+        state["origin"] = df.index[0].normalize().value
+
+    if verbose: print("* integrating chunk: {} - {}".format(df.index[0], df.index[-1]))
+
+    grid, block = streamingIntegrationKernel(state,
+                                             df[["acc_{}".format(comp) for comp in components]].values,
+                                             df.index.values.astype(np.int64),
+                                            )
+
+    return integrationFrame(grid, block, components, state["calculateDeflection"], df.index)
+
+def iterIntegration(chunks, state, components=("x", "y", "z"), verbose=False):
+    """
+    iterIntegration(chunks, state, components=("x", "y", "z")):
+
+    integrates an iterable of consecutive dataframes (e.g. from iterDataSet or
+    a live logger) chunk by chunk with the given streamingIntegrator state
+
+    yields one integrated dataframe per chunk
+    """
+
+    for chunk in chunks:
+        yield streamIntegration(state, chunk, components=components, verbose=verbose)
+
+def applyIntegration_streaming(dataset,
+                               verbose=False,
+                               chunkInterval="10min",
+                               resetInterval="1h",
+                               resampleInterval="30ms",
+                               filterLowCut=0.1,
+                               filterHighCut=1,
+                               filterFrequency=30,
+                               filterOrder=3,
+                               calculateDeflection=True,
+                               components = ("x", "y", "z"),
+                               maxGap="1min",
+                               filterType="lfilter",
+                              ):
+    """
+    applyIntegration_streaming(dataset, verbose=False, chunkInterval="10min", resetInterval="1h", resampleInterval="30ms", filterLowCut=0.1, filterHighCut=1, filterFrequency=30, filterOrder=3, calculateDeflection=True, components=("x", "y", "z"), maxGap="1min", filterType="lfilter"):
+
+    integrates a dataset chunk by chunk with a streamingIntegrator, unlike
+    applyIntegration the filter state is carried over the chunk borders and
+    the integration is only restarted every resetInterval. The stream runs
+    on a continuous grid, the result is cut to the grid points of
+    applyIntegration with integrationInterval = chunkInterval (see
+    windowGridMask), so both return the same rows.
+
+    returns the integrated dataframe
+    """
+
+    components = list(components)
+    calculateDeflection = calculateDeflection and "x" in components and "z" in components
+
+    state = streamingIntegrator(resampleInterval=resampleInterval,
+                                filterLowCut=filterLowCut,
+                                filterHighCut=filterHighCut,
+                                filterFrequency=filterFrequency,
+                                filterOrder=filterOrder,
+                                resetInterval=resetInterval,
+                                maxGap=maxGap,
+                                calculateDeflection=calculateDeflection,
+                                deflectionAxes=(components.index("x"), components.index("z")) if calculateDeflection else (0, 0),
+                                filterType=filterType,
+                               )
+
+    if verbose: print("* streaming integration, chunks of {}, reset every {}".format(chunkInterval, resetInterval))
+    chunks = (chunk for _, chunk in dataset.resample(chunkInterval) if not chunk.empty)
+
+    frames = [frame for frame in iterIntegration(chunks, state, components, verbose) if not frame.empty]
+
+    if not frames:
+        return pd.DataFrame(columns=integrationColumns(components, calculateDeflection))
+
+    frames = pd.concat(frames)
+
+    return frames.loc[windowGridMask(frames.index.asi8,
+                                     dataset.index.asi8,
+                                     chunkInterval,
+                                     resampleInterval,
+                                     dataset.index[0].normalize().value,
+                                    )]
+
+def applyIntegration_parallel(dataset, 
+                              verbose=False,
+                              nProcs=None,
+                              integrationInterval="10min",
+                              resampleInterval="30ms",
+                              filterLowCut=0.1,
+                              filterHighCut=1,
+                              filterFrequency=30,
+                              filterOrder=3,
+                              calculateDeflection=True, 
+                              components = ("x", "y", "z"),
+                              applyG=True,
+                              pool=None,
+                              sharedMemory=False,
+                              detrend=None,
+                              filterType="lfilter",
+                              integrationEngine="time",
+                              resampleMethod="bfill",
+                              maxGap=None,
+                              backend="numpy",
+                              overlap=None,
+                              statistics=None,
+                             ):
+    """
+    applyIntegration_parallel(dataset, verbose=False, nProcs=None, integrationInterval="10min", ..., overlap=None, statistics=None):
+
+    integrates the integrationInterval windows of dataset in a pool of
+    workers, see integrateVelocityAcceleration for the parameters.
+
+    If overlap (e.g. "1min") is given, every worker gets overlap of extra
+    data before and after its window as warm-up and cool-down and the
+    results of neighbouring windows are cross-faded over the shared
+    2 * overlap, see crossFadeWindows, so the stitched series has no jumps
+    at the window borders. overlap has to be shorter than half the
+    integration interval. The stitched series is cut to the grid points of
+    applyIntegration (see windowGridMask).
+
+    If statistics is given (a picklable function of a dataframe, e.g. a
+    partial of windowStatistics from stats.py, whose windows divide the
+    integration interval), it is applied to every integrated window in the
+    worker, so the statistics come without an extra pass over the result.
+    The statistics of a window are taken from the worker owning it (with
+    overlap before cross-fading).
+
+    returns the integrated dataframe, and the statistics if requested
+    """
+
+    windows = dataset.resample(integrationInterval)
+
+    if overlap is not None:
+        overlap = pd.Timedelta(overlap)
+        interval = pd.Timedelta(integrationInterval)
+        if not overlap * 2 < interval:
+            raise Exception("overlap ({}) has to be shorter than half the integration interval ({})".format(overlap, interval))
+
+    if verbose: print("* integration interval set to {}, overlap {}. Starting integration with {} processes".format(integrationInterval,
+                                                                                                                   overlap,
+                                                                                                                   poolSize(len(windows), nProcs)))
+
+    starts = list()
+
+    def samples():
+        ## iterate over the sample intervalls and enable parallel integration
+        for t, dataSample in windows:
+            if dataSample.empty:
+                continue
+            if verbose: print("* integration start: {}".format(t))
+            starts.append(t)
+            if overlap is not None:
+                # extend the window by the warm-up and cool-down samples
+                first = dataset.index.searchsorted(t - overlap, side="left")
+                last = dataset.index.searchsorted(t + interval + overlap, side="left")
+                dataSample = dataset.iloc[first:last]
+            yield dataSample
+
+    # compile and check the fused kernel once, workers forked afterwards
+    # inherit it instead of compiling it again
+    backend = integrationBackend(backend, filterType, integrationEngine)
+
+    worker = partial(integrateVelocityAcceleration,
+                     verbose=verbose,
+                     resampleInterval=resampleInterval,
+                     filterLowCut=filterLowCut,
+                     filterHighCut=filterHighCut,
+                     filterFrequency=filterFrequency,
+                     filterOrder=filterOrder,
+                     calculateDeflection=calculateDeflection,
+                     components=components,
+                     detrend=detrend,
+                     filterType=filterType,
+                     integrationEngine=integrationEngine,
+                     resampleMethod=resampleMethod,
+                     maxGap=maxGap,
+                     backend=backend,
+                    )
+    if sharedMemory:
+        # workers started from here share the resource tracker of this process
+        resource_tracker.ensure_running()
+    if statistics is not None:
+        worker = partial(statisticsWorker, function=worker, statistics=statistics, sharedMemory=sharedMemory)
+    elif sharedMemory:
+        worker = partial(sharedMemoryWorker, function=worker)
+
+    results = list()
+    try:
+        results.extend(mapOrdered(worker, samples(), len(windows), nProcs=nProcs, pool=pool))
+    except:
+        # blocks of the windows collected so far are not going to be read
+        if sharedMemory:
+            releaseSharedMemory([r[0] for r in results] if statistics is not None else results)
+        raise
+    frames = results
+
+    if statistics is not None:
+        frames = [frame for frame, windowStat in results]
+        windowStats = [windowStat for frame, windowStat in results]
+        # keep the statistics windows owned by the integration window, the
+        # resampling grid or the overlap may reach into the neighbours
+        interval = pd.Timedelta(integrationInterval)
+        windowStats = [w.loc[(w.index >= t) & (w.index < t + interval)] for w, t in zip(windowStats, starts)]
+        windowStats = pd.concat(windowStats) if windowStats else pd.DataFrame()
+
+    if overlap is not None:
+        if sharedMemory:
+            metas = frames
+            try:
+                frames = [frameFromSharedMemory([meta]) for meta in metas]
+            finally:
+                releaseSharedMemory(metas)
+        # the position columns the kernel took the deflection from
+        components = list(components)
+        deflection = calculateDeflection and "x" in components and "z" in components
+        columns = integrationColumns(components, deflection, maxGap is not None)
+        positions = columns[3 * len(components):4 * len(components)]
+        frames = crossFadeWindows(list(frames),
+                                  starts,
+                                  interval,
+                                  overlap,
+                                  columns=columns,
+                                  deflectionColumns=(positions[components.index("x")], positions[components.index("z")]) if deflection else None,
+                                 )
+        if not frames.empty:
+            frames = frames.loc[windowGridMask(frames.index.asi8,
+                                               dataset.index.asi8,
+                                               integrationInterval,
+                                               resampleInterval,
+                                               dataset.index[0].normalize().value,
+                                              )]
+    elif sharedMemory:
+        frames = frameFromSharedMemory(frames)
+    else:
+        frames = pd.concat(frames)
+
+    if statistics is not None:
+        return frames, windowStats
+
+    return frames
+
+def crossFadeWindows(frames, starts, interval, overlap, columns=None, deflectionColumns=("pos_x", "pos_z")):
+    """
+    crossFadeWindows(frames, starts, interval, overlap, columns=None, deflectionColumns=("pos_x", "pos_z")):
+
+    stitches integrated windows that were computed with overlap of extra
+    data on both sides (see applyIntegration_parallel). Every frame is cut
+    to [start - overlap, start + interval + overlap), where neighbouring
+    frames share time stamps they are blended linearly from the earlier to
+    the later window. The deflection is recalculated from the blended
+    deflectionColumns (the positions the kernel took the deflection from),
+    gap flags are combined. columns (see integrationColumns) are the
+    columns of the result if there is nothing to stitch.
+
+    returns the stitched dataframe
+    """
+
+    pieces = list()
+    previous = None
+
+    for frame, start in zip(frames, starts):
+        if frame is None or frame.empty:
+            continue
+        frame = frame.loc[(frame.index >= start - overlap) & (frame.index < start + interval + overlap)]
+
+        if previous is None:
+            previous = frame
+            continue
+
+        shared = previous.index.intersection(frame.index)
+        if len(shared) < 2:
+            pieces.append(previous.loc[previous.index < frame.index[0]])
+            previous = frame
+            continue
+
+        # weight of the later window, rising linearly from 0 to 1
+        weight = np.asarray((shared - shared[0]) / (shared[-1] - shared[0]), dtype=np.float64)[:, np.newaxis]
+
+        earlier = previous.loc[shared]
+        later = frame.loc[shared]
+        numeric = [c for c in frame.columns if c != "gap"]
+        blended = pd.DataFrame(earlier[numeric].values * (1 - weight) + later[numeric].values * weight,
+                               index=shared,
+                               columns=numeric,
+                              )
+        if "gap" in frame.columns:
+            blended["gap"] = earlier["gap"].values | later["gap"].values
+        if "deflection" in blended.columns:
+            blended["deflection"] = np.hypot(blended[deflectionColumns[0]], blended[deflectionColumns[1]])
+
+        pieces.append(previous.loc[previous.index < shared[0]])
+        pieces.append(blended[frame.columns])
+        previous = frame.loc[frame.index > shared[-1]]
+
+    if previous is not None:
+        pieces.append(previous)
+
+    if not pieces:
+        return pd.DataFrame(columns=columns)
+
+    return pd.concat(pieces)
+
+def applyIntegration(dataset, 
+                     verbose=False,
+                     integrationInterval="10min",
+                     resampleInterval="30ms",
+                     filterLowCut=0.1,
+                     filterHighCut=1,
+                     filterFrequency=30,
+                     filterOrder=3,
+                     calculateDeflection=True, 
+                     components = ("x", "y", "z"),
+                     applyG=True,
+                     detrend=None,
+                     filterType="lfilter",
+                     integrationEngine="time",
+                     resampleMethod="bfill",
+                     maxGap=None,
+                     backend="numpy",
+                     statistics=None,
+                    ):
+   
+    frames = list()
+    windowStats = list()
+
+    if verbose: print("* integration interval set to {}".format(integrationInterval))
+    ## iterate over the sample intervalls and enable parallel integration
+    for t, dataSample in dataset.resample(integrationInterval):
+        if dataSample.empty:
+            continue
+        if verbose: print("* integration start: {}".format(t))
+        
+        frames.append(integrateVelocityAcceleration(dataSample,
+                                                    verbose,
+                                                    resampleInterval,
+                                                    filterLowCut,
+                                                    filterHighCut,
+                                                    filterFrequency,
+                                                    filterOrder,
+                                                    calculateDeflection,
+                                                    components,
+                                                    detrend=detrend,
+                                                    filterType=filterType,
+                                                    integrationEngine=integrationEngine,
+                                                    resampleMethod=resampleMethod,
+                                                    maxGap=maxGap,
+                                                    backend=backend,
+                                                   ))
+        if statistics is not None:
+            windowStat = statistics(frames[-1])
+            # keep the statistics windows owned by the integration window
+            windowStats.append(windowStat.loc[(windowStat.index >= t) & (windowStat.index < t + pd.Timedelta(integrationInterval))])
+
+    frames = pd.concat(frames)
+
+    if statistics is not None:
+        return frames, pd.concat(windowStats)
+    
+    return frames
+
+
+
+def batchedIntegrationKernel(acc,
+                             time,
+                             integrationInterval="10min",
+                             resampleInterval="30ms",
+                             filterLowCut=0.1,
+                             filterHighCut=1,
+                             filterFrequency=33.333,
+                             filterOrder=3,
+                             calculateDeflection=True,
+                             deflectionAxes=(0, 2),
+                             detrend=None,
+                             origin=None,
+                             g=9.80665,
+                             filterType="lfilter",
+                             integrationEngine="time",
+                             batchSize=256,
+                             resampleMethod="bfill",
+                             maxGap=None,
+                             backend="numpy",
+                            ):
+    """
+    batchedIntegrationKernel(acc, time, integrationInterval="10min", resampleInterval="30ms", ..., batchSize=256, resampleMethod="bfill", maxGap=None, backend="numpy"):
+
+    integrates all integrationInterval windows of a (N, k) acceleration
+    array at once, with the same result as calling integrationKernel for
+    every window (as applyIntegration does). The windows are put on their
+    resampling grid and stacked into (windows, samples, 4k + 1) tensors,
+    which are filtered and integrated with one vectorized call per batch.
+    Windows are grouped by their grid length, so ragged windows (start and
+    end of the data, gaps) are processed without padding; gaps within a
+    window are resampled with resampleMethod and masked if longer than
+    maxGap, see integrationKernel. At most batchSize windows are processed
+    at once to bound memory.
+
+    returns the grid time stamps (int64, ns) and the block of all windows
+    """
+
+    acc = np.asarray(acc)
+    if acc.ndim == 1:
+        acc = acc[:, np.newaxis]
+    time = np.asarray(time, dtype=np.int64)
+    k = acc.shape[1]
+    width = 4 * k + (1 if calculateDeflection else 0) + (1 if maxGap is not None else 0)
+
+    if len(time) == 0:
+        return np.empty(0, dtype=np.int64), np.empty((0, width))
+
+    step = pd.Timedelta(resampleInterval).value
+    interval = pd.Timedelta(integrationInterval).value
+    if origin is None:
+        origin = time[0] - time[0] % (24 * 3600 * 10**9)
+
+    # first and last sample of every (non empty) window
+    windowIds = (time - origin) // interval
+    starts = np.flatnonzero(np.r_[True, windowIds[1:] != windowIds[:-1]])
+    ends = np.r_[starts[1:], len(time)] - 1
+
+    firsts = origin + (time[starts] - origin) // step * step
+    lengths = (origin + (time[ends] - origin) // step * step - firsts) // step + 1
+    offsets = np.r_[0, np.cumsum(lengths)]
+
+    grid = np.empty(offsets[-1], dtype=np.int64)
+    block = np.empty((offsets[-1], width), dtype=np.float64)
+
+    for length in np.unique(lengths):
+        windows = np.flatnonzero(lengths == length)
+        for batch in range(0, len(windows), batchSize):
+            batch = windows[batch:batch + batchSize]
+
+            times = firsts[batch][:, np.newaxis] + np.arange(length, dtype=np.int64) * step
+            tensor = np.empty((len(batch), length, width), dtype=np.float64)
+            resampled, gaps = interpolateGrid(time,
+                                              acc,
+                                              times,
+                                              method=resampleMethod,
+                                              maxGap=maxGap,
+                                              bounds=(starts[batch][:, np.newaxis], ends[batch][:, np.newaxis]),
+                                             )
+            np.multiply(resampled, g, out=tensor[..., :k])
+            if gaps is not None:
+                tensor[..., -1] = gaps
+
+            integrateGrid(tensor,
+                          k,
+                          resampleInterval=resampleInterval,
+                          filterLowCut=filterLowCut,
+                          filterHighCut=filterHighCut,
+                          filterFrequency=filterFrequency,
+                          filterOrder=filterOrder,
+                          calculateDeflection=calculateDeflection,
+                          deflectionAxes=deflectionAxes,
+                          detrend=detrend,
+                          filterType=filterType,
+                          integrationEngine=integrationEngine,
+                          gaps=gaps,
+                          backend=backend,
+                         )
+
+            rows = (offsets[batch][:, np.newaxis] + np.arange(length)).ravel()
+            grid[rows] = times.ravel()
+            block[rows] = tensor.reshape(-1, width)
+
+    return grid, block
+
+def applyIntegration_batched(dataset,
+                             verbose=False,
+                             integrationInterval="10min",
+                             resampleInterval="30ms",
+                             filterLowCut=0.1,
+                             filterHighCut=1,
+                             filterFrequency=30,
+                             filterOrder=3,
+                             calculateDeflection=True,
+                             components = ("x", "y", "z"),
+                             detrend=None,
+                             filterType="lfilter",
+                             integrationEngine="time",
+                             batchSize=256,
+                             resampleMethod="bfill",
+                             maxGap=None,
+                             backend="numpy",
+                            ):
+    """
+    applyIntegration_batched(dataset, verbose=False, integrationInterval="10min", resampleInterval="30ms", filterLowCut=0.1, filterHighCut=1, filterFrequency=30, filterOrder=3, calculateDeflection=True, components=("x", "y", "z"), detrend=None, filterType="lfilter", integrationEngine="time", batchSize=256, resampleMethod="bfill", maxGap=None, backend="numpy"):
+
+    same as applyIntegration, but without iterating over the windows in
+    pandas, see batchedIntegrationKernel
+
+    returns the integrated dataframe
+    """
+
+    components = list(components)
+    calculateDeflection = calculateDeflection and "x" in components and "z" in components
+
+    if dataset.empty:
+        return pd.DataFrame(columns=integrationColumns(components, calculateDeflection, maxGap is not None))
+
+    if verbose: print("* batched integration, interval set to {}, {} windows per batch".format(integrationInterval, batchSize))
+
+    grid, block = batchedIntegrationKernel(dataset[["acc_{}".format(comp) for comp in components]].values,
+                                           dataset.index.values.astype(np.int64),
+                                           integrationInterval=integrationInterval,
+                                           resampleInterval=resampleInterval,
+                                           filterLowCut=filterLowCut,
+                                           filterHighCut=filterHighCut,
+                                           filterFrequency=filterFrequency,
+                                           filterOrder=filterOrder,
+                                           calculateDeflection=calculateDeflection,
+                                           deflectionAxes=(components.index("x"), components.index("z")) if calculateDeflection else (0, 0),
+                                           detrend=detrend,
+                                           origin=dataset.index[0].normalize().value,
+                                           filterType=filterType,
+                                           integrationEngine=integrationEngine,
+                                           batchSize=batchSize,
+                                           resampleMethod=resampleMethod,
+                                           maxGap=maxGap,
+                                           backend=backend,
+                                          )
+
+    return integrationFrame(grid, block, components, calculateDeflection, dataset.index, gapColumn=maxGap is not None)
+
+
+### orientation and earth frame rotation
+
+def rotationMatrices(roll, pitch, yaw, degrees=True):
+    """
+    rotationMatrices(roll, pitch, yaw, degrees=True):
+
+    builds the rotation matrices from the sensor (body) frame to the earth
+    frame of the IMU for arrays of euler angles at once, using the z-y-x
+    (yaw, pitch, roll) convention R = Rz(yaw) Ry(pitch) Rx(roll). At zero
+    angles the earth frame equals the sensor frame, i.e. its axes keep the
+    meaning of the box axes (x and z horizontal for the deflection).
+
+    returns an (N, 3, 3) array
+    """
+
+    angles = [np.asarray(a, dtype=np.float64) for a in (roll, pitch, yaw)]
+    if degrees:
+        angles = [np.radians(a) for a in angles]
+    cr, cp, cy = [np.cos(a) for a in angles]
+    sr, sp, sy = [np.sin(a) for a in angles]
+
+    matrices = np.empty(cr.shape + (3, 3), dtype=np.float64)
+    matrices[..., 0, 0] = cy * cp
+    matrices[..., 0, 1] = cy * sp * sr - sy * cr
+    matrices[..., 0, 2] = cy * sp * cr + sy * sr
+    matrices[..., 1, 0] = sy * cp
+    matrices[..., 1, 1] = sy * sp * sr + cy * cr
+    matrices[..., 1, 2] = sy * sp * cr - cy * sr
+    matrices[..., 2, 0] = -sp
+    matrices[..., 2, 1] = cp * sr
+    matrices[..., 2, 2] = cp * cr
+
+    return matrices
+
+def rotateVectors(matrices, vectors):
+    """
+    rotates (N, 3) vectors with (N, 3, 3) matrices, one matrix per vector
+
+    returns the rotated (N, 3) vectors
+    """
+
+    return np.einsum("nij,nj->ni", matrices, vectors)
+
+def tiltCompensatedHeading(mag, roll, pitch, degrees=True):
+    """
+    tiltCompensatedHeading(mag, roll, pitch, degrees=True):
+
+    calculates the heading from (N, 3) magnetometer readings, compensating
+    the tilt of the sensor with roll and pitch (same convention as
+    rotationMatrices): the magnetic field is projected onto the horizontal
+    plane and the heading is the angle of its horizontal component
+
+    returns the heading in degrees (or radians if degrees is False)
+    """
+
+    mag = np.asarray(mag, dtype=np.float64)
+    roll = np.asarray(roll, dtype=np.float64)
+    pitch = np.asarray(pitch, dtype=np.float64)
+    if degrees:
+        roll, pitch = np.radians(roll), np.radians(pitch)
+
+    cr, sr = np.cos(roll), np.sin(roll)
+    cp, sp = np.cos(pitch), np.sin(pitch)
+
+    horizontalX = mag[:, 0] * cp + mag[:, 1] * sr * sp + mag[:, 2] * cr * sp
+    horizontalY = mag[:, 1] * cr - mag[:, 2] * sr
+    heading = np.arctan2(-horizontalY, horizontalX)
+
+    return np.degrees(heading) if degrees else heading
+
+def rotateToEarthFrame(df,
+                       components=("acc_x", "acc_y", "acc_z"),
+                       angles=("roll", "pitch", "yaw"),
+                       magneticCorrection=False,
+                       magnetic=("mag_x", "mag_y", "mag_z"),
+                       degrees=True,
+                       chunkSize=2**18,
+                       verbose=False,
+                       quaternions=None,
+                      ):
+    """
+    rotateToEarthFrame(df, components=("acc_x", "acc_y", "acc_z"), angles=("roll", "pitch", "yaw"), magneticCorrection=False, magnetic=("mag_x", "mag_y", "mag_z"), degrees=True, chunkSize=2**18, quaternions=None):
+
+    rotates the given vector components (e.g. the accelerations) of every
+    sample from the sensor frame into the earth frame of the IMU, see
+    rotationMatrices. If magneticCorrection is True, the yaw angle is
+    replaced by the tilt compensated magnetic heading. The rotation matrices
+    are built and applied in chunks of chunkSize samples, so no (N, 3, 3)
+    array of a whole campaign is created. Samples without angles are
+    left as they are. If quaternions ((N, 4) array or dataframe aligned with
+    df, e.g. from estimateOrientation) are given, they define the rotation
+    instead of the angles of the firmware.
+
+    returns a copy of df with the rotated components
+    """
+
+    if quaternions is not None:
+        angles = ()
+        magneticCorrection = False
+        quaternions = np.asarray(quaternions, dtype=np.float64)
+        if len(quaternions) != len(df):
+            raise Exception("quaternions ({}) and data ({}) differ in length".format(len(quaternions), len(df)))
+
+    missing = [c for c in list(components) + list(angles) if c not in df.columns]
+    if magneticCorrection:
+        missing += [c for c in magnetic if c not in df.columns]
+    if missing:
+        raise Exception("rotation to the earth frame requires the columns: {}".format(missing))
+
+    if verbose: print("* rotating {} into the earth frame{}".format(list(components), ", magnetic heading" if magneticCorrection else ""))
+
+    vectors = df[list(components)].values
+    rotated = np.array(vectors, dtype=np.float64)
+    if quaternions is None:
+        roll, pitch, yaw = [df[c].values for c in angles]
+    if magneticCorrection:
+        mag = df[list(magnetic)].values
+
+    for start in range(0, len(df), chunkSize):
+        chunk = slice(start, start + chunkSize)
+        if quaternions is not None:
+            matrices = quaternionMatrices(quaternions[chunk])
+        else:
+            heading = tiltCompensatedHeading(mag[chunk], roll[chunk], pitch[chunk], degrees=degrees) if magneticCorrection else yaw[chunk]
+            matrices = rotationMatrices(roll[chunk], pitch[chunk], heading, degrees=degrees)
+        result = rotateVectors(matrices, rotated[chunk])
+        valid = np.isfinite(result).all(axis=1)
+        rotated[chunk][valid] = result[valid]
+
+    data = df.copy()
+    for j, c in enumerate(components):
+        data[c] = rotated[:, j].astype(df[c].dtype)
+
+    return data
+
+def eulerToQuaternion(roll, pitch, yaw, degrees=True):
+    """
+    converts euler angles (z-y-x convention, see rotationMatrices) to unit
+    quaternions
+
+    returns an (N, 4) array (w, x, y, z)
+    """
+
+    angles = [np.asarray(a, dtype=np.float64) * 0.5 for a in (roll, pitch, yaw)]
+    if degrees:
+        angles = [np.radians(a) for a in angles]
+    cr, cp, cy = [np.cos(a) for a in angles]
+    sr, sp, sy = [np.sin(a) for a in angles]
+
+    return np.stack([cr * cp * cy + sr * sp * sy,
+                     sr * cp * cy - cr * sp * sy,
+                     cr * sp * cy + sr * cp * sy,
+                     cr * cp * sy - sr * sp * cy,
+                    ], axis=-1)
+
+def quaternionToEuler(quaternions, degrees=True):
+    """
+    converts (N, 4) unit quaternions (w, x, y, z) to euler angles (z-y-x
+    convention, see rotationMatrices)
+
+    returns roll, pitch and yaw
+    """
+
+    w, x, y, z = [quaternions[..., i] for i in range(4)]
+
+    roll = np.arctan2(2 * (w * x + y * z), 1 - 2 * (x * x + y * y))
+    pitch = np.arcsin(np.clip(2 * (w * y - z * x), -1, 1))
+    yaw = np.arctan2(2 * (w * z + x * y), 1 - 2 * (y * y + z * z))
+
+    if degrees:
+        return np.degrees(roll), np.degrees(pitch), np.degrees(yaw)
+
+    return roll, pitch, yaw
+
+def quaternionMatrices(quaternions):
+    """
+    builds the rotation matrices (sensor to earth frame) of (N, 4) unit
+    quaternions (w, x, y, z) at once
+
+    returns an (N, 3, 3) array
+    """
+
+    w, x, y, z = [np.asarray(quaternions, dtype=np.float64)[..., i] for i in range(4)]
+
+    matrices = np.empty(w.shape + (3, 3), dtype=np.float64)
+    matrices[..., 0, 0] = 1 - 2 * (y * y + z * z)
+    matrices[..., 0, 1] = 2 * (x * y - w * z)
+    matrices[..., 0, 2] = 2 * (x * z + w * y)
+    matrices[..., 1, 0] = 2 * (x * y + w * z)
+    matrices[..., 1, 1] = 1 - 2 * (x * x + z * z)
+    matrices[..., 1, 2] = 2 * (y * z - w * x)
+    matrices[..., 2, 0] = 2 * (x * z - w * y)
+    matrices[..., 2, 1] = 2 * (y * z + w * x)
+    matrices[..., 2, 2] = 1 - 2 * (x * x + y * y)
+
+    return matrices
+
+def quaternionMultiply(p, q):
+    """
+    hamilton product of (N, 4) or (4,) quaternions (w, x, y, z)
+
+    returns the product p q
+    """
+
+    p = np.asarray(p, dtype=np.float64)
+    q = np.asarray(q, dtype=np.float64)
+    pw, px, py, pz = [p[..., i] for i in range(4)]
+    qw, qx, qy, qz = [q[..., i] for i in range(4)]
+
+    return np.stack([pw * qw - px * qx - py * qy - pz * qz,
+                     pw * qx + px * qw + py * qz - pz * qy,
+                     pw * qy - px * qz + py * qw + pz * qx,
+                     pw * qz + px * qy - py * qx + pz * qw,
+                    ], axis=-1)
+
+# axes of the box, the vertical one carries gravity when the box is level
+AXES = ("x", "y", "z")
+
+def verticalPermutation(verticalAxis="y"):
+    """
+    verticalPermutation(verticalAxis="y"):
+
+    the orientation filters expect gravity on the last axis. A cyclic
+    permutation of the box axes moves the vertical axis of the box there
+    while keeping a right handed frame.
+
+    returns the column order of the permuted axes and the quaternion of the
+    permutation (box frame to filter frame)
+    """
+
+    if verticalAxis not in AXES:
+        raise Exception("unknown vertical axis: {}, available axes: {}".format(verticalAxis, AXES))
+
+    k = AXES.index(verticalAxis)
+    order = [(k + 1) % 3, (k + 2) % 3, k]
+
+    # rotation of 0 or +-120 degrees about the diagonal (1, 1, 1)
+    permutation = {2 : (1.0, 0.0, 0.0, 0.0), 1 : (0.5, 0.5, 0.5, 0.5), 0 : (0.5, -0.5, -0.5, -0.5)}[k]
+
+    return order, np.array(permutation)
+
+def accelerometerAngles(acc, degrees=True):
+    """
+    calculates roll and pitch from (N, 3) accelerometer readings, assuming
+    the sensor measures gravity only (+1 g along z when level, see
+    verticalPermutation for other vertical axes)
+
+    returns roll and pitch
+    """
+
+    acc = np.asarray(acc, dtype=np.float64)
+    roll = np.arctan2(acc[:, 1], acc[:, 2])
+    pitch = np.arctan2(-acc[:, 0], np.hypot(acc[:, 1], acc[:, 2]))
+
+    if degrees:
+        return np.degrees(roll), np.degrees(pitch)
+
+    return roll, pitch
+
+# available orientation estimators, see estimateOrientation
+ORIENTATIONMETHODS = ("complementary", "madgwick")
+
+def complementaryFilter(gyro, acc, mag, dt, timeConstant=1.0):
+    """
+    complementaryFilter(gyro, acc, mag, dt, timeConstant=1.0):
+
+    vectorized complementary filter: roll and pitch from the accelerometer
+    and the tilt compensated magnetic heading are low passed, the euler
+    rates from the gyroscope (rad/s, (N, 3)) are integrated and high passed,
+    both with the same first order filter (time constant in seconds), which
+    runs as one lfilter call per angle. dt is the time step of every sample
+    (seconds).
+
+    returns (N, 4) unit quaternions (w, x, y, z)
+    """
+
+    gyro = np.asarray(gyro, dtype=np.float64)
+    dt = np.asarray(dt, dtype=np.float64)
+
+    roll, pitch = accelerometerAngles(acc, degrees=False)
+    yaw = np.unwrap(tiltCompensatedHeading(mag, roll, pitch, degrees=False))
+
+    # euler rates from the body rates
+    sr, cr = np.sin(roll), np.cos(roll)
+    cp = np.maximum(np.cos(pitch), 1e-6)
+    tp = np.sin(pitch) / cp
+    rates = np.stack([gyro[:, 0] + (sr * gyro[:, 1] + cr * gyro[:, 2]) * tp,
+                      cr * gyro[:, 1] - sr * gyro[:, 2],
+                      (sr * gyro[:, 1] + cr * gyro[:, 2]) / cp,
+                     ], axis=-1)
+
+    # angle[n] = alpha * (angle[n - 1] + rate[n] * dt[n]) + (1 - alpha) * measurement[n]
+    alpha = timeConstant / (timeConstant + np.median(dt))
+    measurements = np.stack([roll, pitch, yaw], axis=-1)
+    inputs = alpha * rates * dt[:, np.newaxis] + (1 - alpha) * measurements
+    angles = lfilter([1.0], [1.0, -alpha], inputs, axis=0, zi=alpha * measurements[:1])[0]
+
+    return eulerToQuaternion(angles[:, 0], angles[:, 1], angles[:, 2], degrees=False)
+
+def madgwickLoop(gyro, acc, mag, dt, beta, q, out):
+    """
+    madgwickLoop(gyro, acc, mag, dt, beta, q, out):
+
+    Madgwick's gradient descent orientation filter (MARG version), one
+    update per sample starting from the unit quaternion q. Samples with
+    non finite readings keep the previous orientation.
+
+    plain python, compiled with numba if available (jitMadgwickLoop)
+    """
+
+    q0, q1, q2, q3 = q[0], q[1], q[2], q[3]
+
+    for n in range(gyro.shape[0]):
+        gx, gy, gz = gyro[n, 0], gyro[n, 1], gyro[n, 2]
+        ax, ay, az = acc[n, 0], acc[n, 1], acc[n, 2]
+        mx, my, mz = mag[n, 0], mag[n, 1], mag[n, 2]
+
+        accNorm = math.sqrt(ax * ax + ay * ay + az * az)
+        magNorm = math.sqrt(mx * mx + my * my + mz * mz)
+        if not (math.isfinite(gx + gy + gz + accNorm + magNorm + dt[n]) and accNorm > 0 and magNorm > 0):
+            out[n, 0], out[n, 1], out[n, 2], out[n, 3] = q0, q1, q2, q3
+            continue
+
+        # rate of change of the quaternion from the gyroscope
+        qDot0 = 0.5 * (-q1 * gx - q2 * gy - q3 * gz)
+        qDot1 = 0.5 * (q0 * gx + q2 * gz - q3 * gy)
+        qDot2 = 0.5 * (q0 * gy - q1 * gz + q3 * gx)
+        qDot3 = 0.5 * (q0 * gz + q1 * gy - q2 * gx)
+
+        ax, ay, az = ax / accNorm, ay / accNorm, az / accNorm
+        mx, my, mz = mx / magNorm, my / magNorm, mz / magNorm
+
+        _2q0mx = 2 * q0 * mx
+        _2q0my = 2 * q0 * my
+        _2q0mz = 2 * q0 * mz
+        _2q1mx = 2 * q1 * mx
+        _2q0 = 2 * q0
+        _2q1 = 2 * q1
+        _2q2 = 2 * q2
+        _2q3 = 2 * q3
+        _2q0q2 = 2 * q0 * q2
+        _2q2q3 = 2 * q2 * q3
+        q0q0 = q0 * q0
+        q0q1 = q0 * q1
+        q0q2 = q0 * q2
+        q0q3 = q0 * q3
+        q1q1 = q1 * q1
+        q1q2 = q1 * q2
+        q1q3 = q1 * q3
+        q2q2 = q2 * q2
+        q2q3 = q2 * q3
+        q3q3 = q3 * q3
+
+        # reference direction of the earth's magnetic field
+        hx = mx * q0q0 - _2q0my * q3 + _2q0mz * q2 + mx * q1q1 + _2q1 * my * q2 + _2q1 * mz * q3 - mx * q2q2 - mx * q3q3
+        hy = _2q0mx * q3 + my * q0q0 - _2q0mz * q1 + _2q1mx * q2 - my * q1q1 + my * q2q2 + _2q2 * mz * q3 - my * q3q3
+        _2bx = math.sqrt(hx * hx + hy * hy)
+        _2bz = -_2q0mx * q2 + _2q0my * q1 + mz * q0q0 + _2q1mx * q3 - mz * q1q1 + _2q2 * my * q3 - mz * q2q2 + mz * q3q3
+        _4bx = 2 * _2bx
+        _4bz = 2 * _2bz
+
+        # gradient descent step
+        fx = 2 * q1q3 - _2q0q2 - ax
+        fy = 2 * q0q1 + _2q2q3 - ay
+        fz = 1 - 2 * q1q1 - 2 * q2q2 - az
+        bx = _2bx * (0.5 - q2q2 - q3q3) + _2bz * (q1q3 - q0q2) - mx
+        by = _2bx * (q1q2 - q0q3) + _2bz * (q0q1 + q2q3) - my
+        bz = _2bx * (q0q2 + q1q3) + _2bz * (0.5 - q1q1 - q2q2) - mz
+
+        s0 = -_2q2 * fx + _2q1 * fy - _2bz * q2 * bx + (-_2bx * q3 + _2bz * q1) * by + _2bx * q2 * bz
+        s1 = _2q3 * fx + _2q0 * fy - 4 * q1 * fz + _2bz * q3 * bx + (_2bx * q2 + _2bz * q0) * by + (_2bx * q3 - _4bz * q1) * bz
+        s2 = -_2q0 * fx + _2q3 * fy - 4 * q2 * fz + (-_4bx * q2 - _2bz * q0) * bx + (_2bx * q1 + _2bz * q3) * by + (_2bx * q0 - _4bz * q2) * bz
+        s3 = _2q1 * fx + _2q2 * fy + (-_4bx * q3 + _2bz * q1) * bx + (-_2bx * q0 + _2bz * q2) * by + _2bx * q1 * bz
+
+        sNorm = math.sqrt(s0 * s0 + s1 * s1 + s2 * s2 + s3 * s3)
+        if sNorm > 0:
+            qDot0 -= beta * s0 / sNorm
+            qDot1 -= beta * s1 / sNorm
+            qDot2 -= beta * s2 / sNorm
+            qDot3 -= beta * s3 / sNorm
+
+        q0 += qDot0 * dt[n]
+        q1 += qDot1 * dt[n]
+        q2 += qDot2 * dt[n]
+        q3 += qDot3 * dt[n]
+
+        qNorm = math.sqrt(q0 * q0 + q1 * q1 + q2 * q2 + q3 * q3)
+        q0, q1, q2, q3 = q0 / qNorm, q1 / qNorm, q2 / qNorm, q3 / qNorm
+        out[n, 0], out[n, 1], out[n, 2], out[n, 3] = q0, q1, q2, q3
+
+    return out
+
+# compiled per process, see jitFusedIntegrationLoop
+jitMadgwickLoop = njit(nogil=True)(madgwickLoop) if njit is not None else None
+
+def madgwickFilter(gyro, acc, mag, dt, beta=0.1):
+    """
+    madgwickFilter(gyro, acc, mag, dt, beta=0.1):
+
+    runs Madgwick's orientation filter over gyroscope (rad/s), accelerometer
+    and magnetometer readings ((N, 3) each) with time steps dt (seconds).
+    The filter starts from the orientation given by the first accelerometer
+    and magnetometer sample. Compiled with numba if available, otherwise
+    the (slow) python loop is used.
+
+    returns (N, 4) unit quaternions (w, x, y, z)
+    """
+
+    gyro = np.ascontiguousarray(gyro, dtype=np.float64)
+    acc = np.ascontiguousarray(acc, dtype=np.float64)
+    mag = np.ascontiguousarray(mag, dtype=np.float64)
+    dt = np.ascontiguousarray(dt, dtype=np.float64)
+
+    roll, pitch = accelerometerAngles(acc[:1], degrees=False)
+    yaw = tiltCompensatedHeading(mag[:1], roll, pitch, degrees=False)
+    q = eulerToQuaternion(roll, pitch, yaw, degrees=False)[0]
+
+    out = np.empty((len(gyro), 4))
+
+    if jitMadgwickLoop is not None:
+        try:
+            return jitMadgwickLoop(gyro, acc, mag, dt, float(beta), q, out)
+        except Exception as e:
+            print("*! could not compile the orientation filter, using python -> {}".format(e))
+
+    return madgwickLoop(gyro, acc, mag, dt, float(beta), q, out)
+
+def estimateOrientation(df,
+                        method="complementary",
+                        gyro=("rot_x", "rot_y", "rot_z"),
+                        acc=("acc_x", "acc_y", "acc_z"),
+                        mag=("mag_x", "mag_y", "mag_z"),
+                        gyroDegrees=True,
+                        timeConstant=1.0,
+                        beta=0.1,
+                        verticalAxis="y",
+                        verbose=False,
+                       ):
+    """
+    estimateOrientation(df, method="complementary", gyro=("rot_x", "rot_y", "rot_z"), acc=("acc_x", "acc_y", "acc_z"), mag=("mag_x", "mag_y", "mag_z"), gyroDegrees=True, timeConstant=1.0, beta=0.1, verticalAxis="y"):
+
+    fuses the gyroscope, accelerometer and magnetometer channels of a
+    dataframe into an orientation (sensor to earth frame, same convention as
+    rotationMatrices) with a complementary filter (timeConstant in seconds)
+    or Madgwick's filter (gain beta), see ORIENTATIONMETHODS. Missing
+    readings are filled with the previous ones.
+
+    verticalAxis is the box axis carrying gravity when the box is level
+    (y for the box, x and z are the horizontal deflection plane). The earth
+    frame keeps the axis names of the box, i.e. a level box at rest is not
+    rotated and gravity stays on the vertical axis.
+
+    returns a dataframe with the quaternion columns q_w, q_x, q_y, q_z
+    """
+
+    if method not in ORIENTATIONMETHODS:
+        raise Exception("unknown orientation method: {}, available methods: {}".format(method, ORIENTATIONMETHODS))
+
+    missing = [c for c in list(gyro) + list(acc) + list(mag) if c not in df.columns]
+    if missing:
+        raise Exception("orientation estimation requires the columns: {}".format(missing))
+
+    columns = ["q_w", "q_x", "q_y", "q_z"]
+    if df.empty:
+        return pd.DataFrame(columns=columns, index=df.index)
+
+    if verbose: print("* estimating orientation ({}) {} - {}".format(method, df.index[0], df.index[-1]))
+
+    readings = df[list(gyro) + list(acc) + list(mag)].astype(np.float64).ffill().bfill().values
+    rates = np.radians(readings[:, :3]) if gyroDegrees else readings[:, :3]
+
+    # filter with the vertical axis last
+    order, permutation = verticalPermutation(verticalAxis)
+    rates = rates[:, order]
+    readings = np.concatenate([readings[:, 3:6][:, order], readings[:, 6:9][:, order]], axis=1)
+    readings = np.concatenate([rates, readings], axis=1)
+
+    time = df.index.asi8
+    dt = np.diff(time, prepend=time[0]) / 10**9
+    if len(dt) > 1:
+        dt[0] = np.median(dt[1:])
+
+    if method == "complementary":
+        quaternions = complementaryFilter(rates, readings[:, 3:6], readings[:, 6:9], dt, timeConstant=timeConstant)
+    else:
+        quaternions = madgwickFilter(rates, readings[:, 3:6], readings[:, 6:9], dt, beta=beta)
+
+    # back to the axes of the box: R = P^T R_filter P
+    conjugate = permutation * np.array([1.0, -1.0, -1.0, -1.0])
+    quaternions = quaternionMultiply(quaternionMultiply(conjugate, quaternions), permutation)
+
+    return pd.DataFrame(quaternions, index=df.index, columns=columns)
+
+def estimateOrientation_parallel(df, interval="1h", nProcs=None, pool=None, verbose=False, **kwargs):
+    """
+    estimateOrientation_parallel(df, interval="1h", nProcs=None, pool=None, **kwargs):
+
+    estimates the orientation of independent windows (interval) of a
+    dataframe in a pool of workers, every window starts its own filter.
+    kwargs are passed to estimateOrientation.
+
+    returns a dataframe with the quaternion columns q_w, q_x, q_y, q_z
+    """
+
+    windows = [w for t, w in df.resample(interval) if not w.empty]
+
+    if verbose: print("* estimating orientation of {} windows using {} processes".format(len(windows), poolSize(len(windows), nProcs)))
+
+    if not windows:
+        return pd.DataFrame(columns=["q_w", "q_x", "q_y", "q_z"])
+
+    worker = partial(estimateOrientation, verbose=verbose, **kwargs)
+
+    return pd.concat(list(mapOrdered(worker, windows, len(windows), nProcs=nProcs, pool=pool)))
+
+def oscillationDirection(df, components=("pos_x", "pos_z")):
+    """
+    calculates the direction of the horizontal displacement (angle from the
+    first towards the second component, in degrees within [0, 360))
+
+    returns a series
+    """
+
+    direction = np.degrees(np.arctan2(df[components[1]].values, df[components[0]].values)) % 360
+
+    return pd.Series(direction, index=df.index, name="direction")
+
+def correctTime(df, runTime, gpsTimeStamp, verbose=False):
 
     powerOnTimeUnix = gpsTimeStamp - runTime
     powerOnTime = pd.to_datetime(powerOnTimeUnix, unit="s", utc=True)
@@ -483,51 +3215,130 @@ def correctTime(df, runTime, gpsTimeStamp, verbose=False):
 
     if verbose: print("done")
 
-def GPSDateTimeCorrection(df, verbose=False):
-
+def decodeGPSTime(gpstime):
     """
-    this function extracts the last valid time stamp and the corresponding run time of the box
-    and corrects the time index of the given data frame
+    decodes GPS time stamps of the form YYYY-MM-DD-hh-mm-ss to unix time in
+    seconds in one vectorized pass over the raw bytes. Time stamps without
+    a (date) lock, e.g. 0000-00-00-00-00-00 or 2000-00-00-12-13-14, and
+    anything not matching the format (other lengths, non ascii characters,
+    missing values) are marked invalid.
+
+    returns an int64 array of seconds and a boolean mask of valid time stamps
     """
 
-    try:
+    # non ascii characters become "?" and fail the format check below
+    raw = np.array([v.encode("ascii", errors="replace") if isinstance(v, str) else v if isinstance(v, bytes) else b""
+                    for v in np.asarray(gpstime, dtype=object).ravel()], dtype="S")
+    wellFormed = np.char.str_len(raw) == 19
+    raw = np.where(wellFormed, raw, b"").astype("S19")
+    chars = raw.view(np.uint8).reshape(-1, 19)
+    digits = chars.astype(np.int64) - ord("0")
 
-        """
-        this method has a know edge case: if the last available time stamp has a time lock, 
-        but no date lock, the time stamp might look something like this: 
-        
-        2000-00-00-12-13-14
+    digitPositions = [0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18]
+    valid = wellFormed & np.all(chars[:, digitPositions] - np.uint8(ord("0")) <= 9, axis=1)
+    valid &= np.all(chars[:, [4, 7, 10, 13, 16]] == ord("-"), axis=1)
 
-        which fails later in the programm when trying to generate a valid datetime object from
-        the time stamp (line 482). This is currently caught via an exception, however, this is far from ideal.
-        As there is currently no easy fix, the whole concept should be re-evaluated
-        """
+    # year, month, day, hour, minute, second via one matrix product
+    weights = np.zeros((19, 6), dtype=np.int64)
+    for i, (start, stop) in enumerate(((0, 4), (5, 7), (8, 10), (11, 13), (14, 16), (17, 19))):
+        weights[start:stop, i] = 10 ** np.arange(stop - start - 1, -1, -1)
+    year, month, day, hour, minute, second = (digits @ weights).T
 
-        lastUniqueGPSTimeStamp = pd.unique(
-                df.loc[(df.gpstime != "0000-00-00-00-00-00") & 
-                       (df.gpstime != "2000-00-00-00-00-00")
-                      ].gpstime)[-1]
-    except:
-        print("no GPS time stamp available, skipping")
-        return False
+    valid &= (year > 2000) & (month >= 1) & (month <= 12) & (day >= 1) & (day <= 31)
+    valid &= (hour < 24) & (minute < 60) & (second < 61)
+
+    # days since 1970-01-01 of the proleptic gregorian calendar
+    y = year - (month <= 2)
+    era = y // 400
+    yoe = y - era * 400
+    doy = (153 * np.where(month > 2, month - 3, month + 9) + 2) // 5 + day - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    days = era * 146097 + doe - 719468
+
+    seconds = days * 86400 + hour * 3600 + minute * 60 + second
+
+    return np.where(valid, seconds, -1), valid
 
-    runTime = df.loc[df.gpstime == lastUniqueGPSTimeStamp].runtime[0] / 1000.0  # convert to seconds!
-    runTimeZero = df.runtime[0]/1000.0
+def GPSDateTimeCorrection(df, verbose=False, maxDrift=1e-3, maxResidual=1.0):
 
-    deltaRunTime = runTime - runTimeZero
+    """
+    this function corrects the time index of the given data frame by fitting the run
+    time of the box against all valid GPS time stamps (least squares, offset and
+    clock drift) and rebuilding the index from the run time.
+
+    The GPS time stamp only has a resolution of one second, hence only the samples
+    where the time stamp changes are used as anchors, placed midway between the
+    sample and its predecessor where the second started. Anchors deviating more than
+    maxResidual seconds from the first fit are dropped and the fit is repeated. If the
+    fitted drift exceeds maxDrift (or only one anchor is available), the drift is
+    ignored and only the offset is used. Samples without a finite run time get NaT.
+
+    returns True if the index was corrected, False if the time stamps could not
+    be decoded
+    """
+
+    if "gpstime" not in df.columns or df.empty:
+        print("no GPS time stamp available, skipping")
+        return False
 
-    gpsTime = df.loc[df.gpstime == lastUniqueGPSTimeStamp].gpstime[0]
-    if verbose: print("found time stamp: {} runtime: {}, run time since beginning: {}".format(gpsTime, runTime, (runTime - runTimeZero)))
-    date = gpsTime.split("-")[:3]
-    time = gpsTime.split("-")[3:]
+    # the time stamp only changes once per second -> decode the unique values only
     try:
-        gpsDateTime = pd.to_datetime("{} {}".format("-".join(date), ":".join(time)), utc=True).value / 10**9
+        codes, uniqueGPSTime = pd.factorize(df.gpstime.values)
+        uniqueSeconds, uniqueValid = decodeGPSTime(uniqueGPSTime)
+        runTime = df.runtime.values.astype(np.float64) / 1000.0  # convert to seconds!
     except Exception as e:
-        print("failed to generate gpsDateTime for {} : {}".format(date, time))
-        print("skipping dataframe")
+        print("could not decode GPS time stamps, skipping -> {}".format(e))
+        return False
+
+    gpsSeconds = uniqueSeconds[codes]
+    finite = np.isfinite(runTime)
+    valid = uniqueValid[codes] & (codes >= 0) & finite
+
+    if not valid.any():
+        print("no GPS time stamp available, skipping")
         return False
+
+    # anchors: first sample of every new valid GPS second. The second started
+    # somewhere between the previous and this sample, the run time of the
+    # anchor is taken in the middle of both (unbiased by the sample period)
+    validIndex = np.flatnonzero(valid)
+    changes = np.flatnonzero(np.diff(gpsSeconds[validIndex]) != 0) + 1
+    if len(changes):
+        anchors = validIndex[changes]
+        anchorTime = 0.5 * (runTime[anchors] + runTime[validIndex[changes - 1]])
+    else:
+        anchors = validIndex[-1:]
+        anchorTime = runTime[anchors]
+
+    # fit relative to a reference to keep the float precision
+    gpsReference = gpsSeconds[anchors[0]]
+    runTimeMean = np.mean(anchorTime)
+    x = anchorTime - runTimeMean
+    y = (gpsSeconds[anchors] - gpsReference) - anchorTime
+
+    def fit(x, y):
+        if len(x) < 2 or np.ptp(x) == 0:
+            return 0.0, np.median(y)
+        drift, offset = np.polyfit(x, y, 1)
+        if abs(drift) > maxDrift:
+            return 0.0, np.median(y)
+        return drift, offset
+
+    drift, offset = fit(x, y)
+    inliers = np.abs(y - (offset + drift * x)) <= maxResidual
+    if not inliers.all() and inliers.any():
+        drift, offset = fit(x[inliers], y[inliers])
+
+    if verbose: print("found {} GPS anchors, offset: {} s, drift: {} ppm".format(len(anchors),
+                                                                                  gpsReference + offset,
+                                                                                  drift * 1e6))
+
+    runTime = np.where(finite, runTime, runTimeMean)
+    trueTime = np.round((runTime + offset + drift * (runTime - runTimeMean)) * 10**9).astype(np.int64)
+    trueTime = np.where(finite, gpsReference * 10**9 + trueTime, pd.NaT.value)
+
     if verbose: print("correcting time")
-    correctTime(df, runTime=deltaRunTime, gpsTimeStamp=gpsDateTime)
+    df.index = pd.DatetimeIndex(pd.to_datetime(trueTime, unit="ns", utc=True), name="truetime")
     return True
 
 
@@ -0,0 +1,383 @@
+"""
+module containing methods for the operational modal analysis of yasb
+accelerations (natural frequencies, mode shapes and damping of the tower):
+
+- cross-spectral matrices and output correlations of all windows, batched
+- frequency domain decomposition (FDD)
+- covariance driven stochastic subspace identification (SSI-COV)
+
+The spectra and correlations of a dataset are the expensive part and can
+be cached in a npz file, so re-running the identification with different
+bands or model orders only repeats the per window SVD / eigen work, which
+is done in a pool of workers.
+"""
+
+import numpy as np
+import pandas as pd
+import hashlib
+from functools import partial
+from os import path
+from os import makedirs
+from os import replace as replaceFile
+from scipy.signal import get_window, decimate, find_peaks
+# yasb.stats when imported as package, stats with yasb/ on sys.path
+try:
+    from .stats import gridWindows, samplingFrequency, windowOrigin
+    from .bikbox import mapOrdered
+except ImportError:
+    from stats import gridWindows, samplingFrequency, windowOrigin
+    from bikbox import mapOrdered
+
+# available identification methods, see modalAnalysis
+MODALMETHODS = ("fdd", "ssi")
+
+def crossSpectralMatrices(segments, fs, nperseg, noverlap=None, window="hann", batchSize=64):
+    """
+    crossSpectralMatrices(segments, fs, nperseg, noverlap=None, window="hann", batchSize=64):
+
+    Welch estimate of the one-sided cross-spectral density matrices of
+    segments of shape (windows, samples, channels). All sub-segments of a
+    batch of windows are transformed by one rfft, the matrices are formed
+    by one einsum. noverlap defaults to half of nperseg.
+
+    returns the frequencies and the matrices of shape
+    (windows, frequencies, channels, channels)
+    """
+
+    nperseg = min(nperseg, segments.shape[1])
+    if noverlap is None:
+        noverlap = nperseg // 2
+    step = nperseg - noverlap
+
+    taper = get_window(window, nperseg)
+    scale = 1 / (fs * np.sum(taper ** 2))
+    frequencies = np.fft.rfftfreq(nperseg, 1 / fs)
+
+    # one-sided: double everything but DC and Nyquist
+    weights = np.full(len(frequencies), 2.0)
+    weights[0] = 1
+    if nperseg % 2 == 0:
+        weights[-1] = 1
+
+    starts = np.arange(0, segments.shape[1] - nperseg + 1, step)
+    spectra = np.empty((len(segments), len(frequencies), segments.shape[2], segments.shape[2]), dtype=np.complex128)
+
+    for batch in range(0, len(segments), batchSize):
+        # (windows, sub-segments, samples, channels)
+        parts = segments[batch:batch + batchSize][:, starts[:, np.newaxis] + np.arange(nperseg)]
+        parts = parts - parts.mean(axis=2, keepdims=True)
+        transformed = np.fft.rfft(parts * taper[:, np.newaxis], axis=2)
+        spectra[batch:batch + batchSize] = np.einsum("wsfi,wsfj->wfij", transformed, transformed.conj()) * (scale / len(starts))
+
+    return frequencies, spectra * weights[:, np.newaxis, np.newaxis]
+
+def outputCorrelations(segments, lags):
+    """
+    outputCorrelations(segments, lags):
+
+    unbiased output correlation matrices R_i = E[y(k + i) y(k)^T] of the
+    (mean free) segments of shape (windows, samples, channels) for the lags
+    0 ... lags - 1, all windows at once
+
+    returns an array of shape (windows, lags, channels, channels)
+    """
+
+    segments = segments - segments.mean(axis=1, keepdims=True)
+    n = segments.shape[1]
+
+    correlations = np.empty((len(segments), lags, segments.shape[2], segments.shape[2]))
+    for i in range(lags):
+        correlations[:, i] = np.einsum("wni,wnj->wij", segments[:, i:], segments[:, :n - i]) / (n - i)
+
+    return correlations
+
+def modalCacheKey(df, columns, **params):
+    """
+    returns a key identifying the data and the parameters of modalSpectra
+    """
+
+    digest = hashlib.sha1()
+    digest.update(np.ascontiguousarray(df.index.asi8).tobytes())
+    digest.update(np.ascontiguousarray(df[list(columns)].values, dtype=np.float64).tobytes())
+    digest.update(repr((list(columns), sorted(params.items()))).encode())
+
+    return digest.hexdigest()
+
+def modalSpectra(df,
+                 columns=("acc_x", "acc_y", "acc_z"),
+                 interval="10min",
+                 fs=None,
+                 nperseg=None,
+                 window="hann",
+                 lags=32,
+                 decimation=5,
+                 minCoverage=0.9,
+                 batchSize=64,
+                 cacheDir=None,
+                 verbose=False,
+                ):
+    """
+    modalSpectra(df, columns=("acc_x", "acc_y", "acc_z"), interval="10min", fs=None, nperseg=None, window="hann", lags=32, decimation=5, minCoverage=0.9, batchSize=64, cacheDir=None):
+
+    calculates the intermediate results of the modal analysis of every
+    window (interval, see gridWindows): the cross-spectral matrices for the
+    FDD (nperseg defaults to an eighth of the window) and the output
+    correlations for the SSI-COV, which are calculated from the signals
+    decimated by decimation (the natural frequencies of the tower are far
+    below the sampling frequency). If cacheDir is given, the results are
+    kept in a npz file named after the data and the parameters and are
+    read from there on later calls.
+
+    returns a dict with the window start times (index), the coverage, the
+    frequencies, the spectra, the correlations and the sampling frequency
+    of the correlations (fsCorrelations)
+    """
+
+    if fs is None:
+        fs = samplingFrequency(df.index)
+
+    params = dict(interval=interval, fs=float(fs), nperseg=nperseg, window=window, lags=lags, decimation=decimation, minCoverage=minCoverage, origin=windowOrigin(df.index))
+
+    cacheFile = None
+    if cacheDir is not None:
+        cacheFile = path.join(cacheDir, "modal_{}.npz".format(modalCacheKey(df, columns, **params)))
+        if path.isfile(cacheFile):
+            if verbose: print("* reading modal spectra from cache: {}".format(cacheFile))
+            with np.load(cacheFile) as cache:
+                result = {k: cache[k] for k in cache.files}
+            index = pd.to_datetime(result["index"], utc=True)
+            result["index"] = index.tz_convert(df.index.tz) if df.index.tz is not None else index.tz_localize(None)
+            result["fsCorrelations"] = float(result["fsCorrelations"])
+            return result
+
+    index, segments, coverage = gridWindows(df, columns, interval=interval, fs=fs, minCoverage=minCoverage, origin=params["origin"])
+
+    if verbose: print("* calculating spectra and correlations of {} windows".format(len(index)))
+
+    if not nperseg:
+        nperseg = max(segments.shape[1] // 8, 1)
+    frequencies, spectra = crossSpectralMatrices(segments, fs, nperseg, window=window, batchSize=batchSize)
+
+    if decimation > 1:
+        segments = decimate(segments, decimation, axis=1, zero_phase=True)
+    correlations = outputCorrelations(segments, lags)
+
+    result = {"index": index,
+              "coverage": coverage,
+              "frequencies": frequencies,
+              "spectra": spectra,
+              "correlations": correlations,
+              "fsCorrelations": fs / max(decimation, 1),
+             }
+
+    if cacheFile is not None:
+        makedirs(cacheDir, exist_ok=True)
+        # write to a temporary file first, so that a crash never leaves a broken cache
+        tempFile = "{}.tmp.npz".format(cacheFile[:-len(".npz")])
+        np.savez(tempFile, **dict(result, index=index.asi8))
+        replaceFile(tempFile, cacheFile)
+        if verbose: print("* wrote modal spectra to cache: {}".format(cacheFile))
+
+    return result
+
+def realModeShapes(shapes):
+    """
+    converts complex mode shapes (..., channels) to real ones: every shape
+    is rotated so that its largest component is real and positive, the
+    real part is normalized to unit length
+    """
+
+    largest = np.take_along_axis(shapes, np.argmax(np.abs(shapes), axis=-1)[..., np.newaxis], axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        shapes = np.real(shapes * np.exp(-1j * np.angle(largest)))
+        return shapes / np.linalg.norm(shapes, axis=-1, keepdims=True)
+
+def fddWorker(spectra, frequencies, band, nModes):
+    """
+    frequency domain decomposition of a batch of windows: SVD of the
+    cross-spectral matrices at every frequency, the largest peaks of the
+    first singular value within band are the modes, the first singular
+    vectors their shapes
+
+    returns the frequencies (windows, nModes), the first singular values
+    (windows, nModes) and the mode shapes (windows, nModes, channels)
+    """
+
+    u, s, vh = np.linalg.svd(spectra)
+    inBand = np.flatnonzero((frequencies >= band[0]) & (frequencies <= band[1]))
+
+    modeFrequencies = np.full((len(spectra), nModes), np.nan)
+    values = np.full((len(spectra), nModes), np.nan)
+    shapes = np.full((len(spectra), nModes, spectra.shape[-1]), np.nan)
+
+    for w in range(len(spectra)):
+        peaks, _ = find_peaks(s[w, inBand, 0])
+        peaks = inBand[peaks[np.argsort(s[w, inBand[peaks], 0])[::-1][:nModes]]]
+        peaks = np.sort(peaks)
+        modeFrequencies[w, :len(peaks)] = frequencies[peaks]
+        values[w, :len(peaks)] = s[w, peaks, 0]
+        shapes[w, :len(peaks)] = realModeShapes(u[w, peaks, :, 0])
+
+    return modeFrequencies, values, shapes
+
+def ssiPoles(correlations, fs, order):
+    """
+    ssiPoles(correlations, fs, order):
+
+    covariance driven stochastic subspace identification of one window:
+    the block Toeplitz matrix of the output correlations (lags 1 ... 2p) is
+    decomposed by an SVD, truncated to the model order and the system
+    matrix is estimated from the shifted observability matrix
+
+    returns the frequencies (Hz), damping ratios and (complex) mode shapes
+    of all poles with positive frequency
+    """
+
+    lags, channels = correlations.shape[0], correlations.shape[1]
+    p = (lags - 1) // 2
+
+    toeplitz = np.block([[correlations[p + i - j] for j in range(p)] for i in range(p)])
+    u, s, vh = np.linalg.svd(toeplitz)
+
+    observability = u[:, :order] * np.sqrt(s[:order])
+    system = np.linalg.lstsq(observability[:-channels], observability[channels:], rcond=None)[0]
+    eigenvalues, eigenvectors = np.linalg.eig(system)
+
+    poles = np.log(eigenvalues.astype(np.complex128)) * fs
+    frequencies = np.abs(poles) / (2 * np.pi)
+    damping = -np.real(poles) / np.abs(poles)
+    shapes = (observability[:channels] @ eigenvectors).T
+
+    positive = np.imag(poles) > 0
+    order = np.argsort(frequencies[positive])
+
+    return frequencies[positive][order], damping[positive][order], shapes[positive][order]
+
+def ssiWorker(correlations, fs, orders, band, nModes, maxDamping=0.2, frequencyTolerance=0.01, dampingTolerance=0.05):
+    """
+    stochastic subspace identification of a batch of windows for all model
+    orders. A pole of the largest order is stable if the next smaller order
+    has a pole within frequencyTolerance (relative) and dampingTolerance
+    (absolute); the nModes stable poles within band and with a damping
+    ratio between 0 and maxDamping are the modes
+
+    returns the frequencies and damping ratios (windows, nModes) and the
+    mode shapes (windows, nModes, channels)
+    """
+
+    orders = sorted(orders)
+    channels = correlations.shape[-1]
+
+    modeFrequencies = np.full((len(correlations), nModes), np.nan)
+    damping = np.full((len(correlations), nModes), np.nan)
+    shapes = np.full((len(correlations), nModes, channels), np.nan)
+
+    for w in range(len(correlations)):
+        if not np.all(np.isfinite(correlations[w])):
+            continue
+
+        previous = ssiPoles(correlations[w], fs, orders[-2]) if len(orders) > 1 else None
+        f, d, phi = ssiPoles(correlations[w], fs, orders[-1])
+
+        physical = (f >= band[0]) & (f <= band[1]) & (d > 0) & (d < maxDamping)
+        if previous is not None and len(previous[0]):
+            distance = np.abs(f[:, np.newaxis] - previous[0][np.newaxis, :]) / f[:, np.newaxis]
+            nearest = np.argmin(distance, axis=1)
+            physical &= (distance[np.arange(len(f)), nearest] < frequencyTolerance) & (np.abs(d - previous[1][nearest]) < dampingTolerance)
+        elif previous is not None:
+            physical[:] = False
+
+        stable = np.flatnonzero(physical)[:nModes]
+        modeFrequencies[w, :len(stable)] = f[stable]
+        damping[w, :len(stable)] = d[stable]
+        shapes[w, :len(stable)] = realModeShapes(phi[stable])
+
+    return modeFrequencies, damping, shapes
+
+def starWorker(chunk, worker):
+    """
+    calls worker with the arrays of a chunk as arguments
+    """
+
+    return worker(*chunk)
+
+def mapWindows(worker, arrays, nProcs=None, pool=None, chunkSize=32):
+    """
+    applies worker to chunks of windows (the first axis of every array) in
+    a pool of workers (see mapOrdered) and concatenates the returned arrays
+
+    returns a tuple of arrays
+    """
+
+    n = len(arrays[0])
+    chunks = [tuple(a[i:i + chunkSize] for a in arrays) for i in range(0, n, chunkSize)]
+
+    results = list(mapOrdered(partial(starWorker, worker=worker), chunks, len(chunks), nProcs=nProcs, pool=pool))
+
+    return tuple(np.concatenate(r) for r in zip(*results))
+
+def modalAnalysis(df,
+                  method="fdd",
+                  columns=("acc_x", "acc_y", "acc_z"),
+                  band=(0.1, 2.0),
+                  nModes=2,
+                  orders=(30, 32),
+                  maxDamping=0.2,
+                  spectra=None,
+                  nProcs=None,
+                  pool=None,
+                  verbose=False,
+                  **kwargs
+                 ):
+    """
+    modalAnalysis(df, method="fdd", columns=("acc_x", "acc_y", "acc_z"), band=(0.1, 2.0), nModes=2, orders=(30, 32), maxDamping=0.2, spectra=None, nProcs=None, pool=None, **kwargs):
+
+    identifies up to nModes modes within band (Hz) for every window with
+    the frequency domain decomposition (method="fdd") or the covariance
+    driven stochastic subspace identification (method="ssi", the two
+    largest model orders are used for the stability check, they are
+    limited by the number of lags times the channels). The intermediate
+    spectra are taken from spectra (a result of modalSpectra) or calculated
+    with kwargs passed to modalSpectra (e.g. cacheDir). The per window work
+    runs in a pool of workers.
+
+    returns a dataframe indexed by the window start with the frequencies
+    (f_<mode>) and the singular values (s_<mode>, fdd) or damping ratios
+    (d_<mode>, ssi) of the modes, and the mode shapes of shape
+    (windows, nModes, channels)
+    """
+
+    if method not in MODALMETHODS:
+        raise Exception("unknown modal analysis method: {}, available methods: {}".format(method, MODALMETHODS))
+
+    if spectra is None:
+        spectra = modalSpectra(df, columns=columns, verbose=verbose, **kwargs)
+
+    index = spectra["index"]
+    if verbose: print("* modal analysis ({}) of {} windows".format(method, len(index)))
+
+    if method == "fdd":
+        frequencies = spectra["frequencies"]
+        worker = partial(fddWorker, frequencies=frequencies, band=band, nModes=nModes)
+        arrays = (spectra["spectra"],)
+        second = "s"
+    else:
+        maxOrder = (spectra["correlations"].shape[1] - 1) // 2 * spectra["correlations"].shape[2]
+        if max(orders) > maxOrder:
+            raise Exception("model order {} exceeds the maximum order {} of the correlations, increase lags".format(max(orders), maxOrder))
+        worker = partial(ssiWorker, fs=spectra["fsCorrelations"], orders=tuple(orders), band=band, nModes=nModes, maxDamping=maxDamping)
+        arrays = (spectra["correlations"],)
+        second = "d"
+
+    if not len(index):
+        names = ["f_{}".format(m) for m in range(nModes)] + ["{}_{}".format(second, m) for m in range(nModes)]
+        return pd.DataFrame(columns=names, dtype=np.float64), np.empty((0, nModes, len(columns)))
+
+    modeFrequencies, values, shapes = mapWindows(worker, arrays, nProcs=nProcs, pool=pool)
+
+    table = pd.DataFrame(np.column_stack([modeFrequencies, values]),
+                         index=index,
+                         columns=["f_{}".format(m) for m in range(nModes)] + ["{}_{}".format(second, m) for m in range(nModes)],
+                        )
+
+    return table, shapes
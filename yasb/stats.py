@@ -0,0 +1,641 @@
+"""
+module containing statistical and spectral methods for working with
+processed yasb data (e.g. the output of applyIntegration):
+
+- batched Welch power spectral densities of fixed length windows
+- tracking of the peak (eigen) frequency over time
+- per window statistics (moments, extremes, percentiles, exceedances)
+- rainflow counting, cycle histograms and damage equivalent loads
+
+Nothing is plotted. A window is gridded onto a uniform sample raster once,
+all windows and channels are then transformed by one batched call, months
+of data are split into chunks (e.g. days) that are processed in a pool of
+workers.
+"""
+
+import numpy as np
+import pandas as pd
+from functools import partial
+from scipy.signal import welch
+
+# the pool helpers of bikbox, as package or flat with yasb/ on sys.path
+try:
+    from .bikbox import mapOrdered, momentsOf
+except ImportError:
+    from bikbox import mapOrdered, momentsOf
+
+# optional just in time compiler for the rainflow counting
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+def samplingFrequency(index):
+    """
+    estimates the sampling frequency (Hz) of a DatetimeIndex from the
+    median time step
+    """
+
+    if len(index) < 2:
+        raise Exception("at least two samples are required to estimate the sampling frequency")
+
+    return 10**9 / np.median(np.diff(index.asi8))
+
+def windowOrigin(index):
+    """
+    returns the origin (int64, ns) of the windows of a time sorted
+    DatetimeIndex: midnight of the first sample in the time zone of the
+    index, the origin of the integration windows of applyIntegration and its
+    variants, so statistics line up with the integrated windows they describe
+    """
+
+    return index[0].normalize().value if len(index) else 0
+
+def windowNumbers(index, width, origin=None):
+    """
+    windowNumbers(index, width, origin=None):
+
+    assigns the samples of a time sorted DatetimeIndex to windows of width
+    (ns) counted from origin (int64, ns, default: windowOrigin)
+
+    returns the window number of every sample and the origin
+    """
+
+    if origin is None:
+        origin = windowOrigin(index)
+
+    return (index.asi8 - origin) // width, origin
+
+def windowIndex(starts, tz):
+    """
+    converts window start times (int64, ns) to a DatetimeIndex in the time
+    zone tz (None for naive time stamps)
+    """
+
+    index = pd.to_datetime(starts, utc=True)
+    if tz is not None:
+        return index.tz_convert(tz)
+
+    return index.tz_localize(None)
+
+def gridWindows(df, columns, interval="10min", fs=None, minCoverage=0.9, fill="mean", origin=None):
+    """
+    gridWindows(df, columns, interval="10min", fs=None, minCoverage=0.9, fill="mean", origin=None):
+
+    places the samples of the given columns onto a uniform raster (fs, Hz)
+    per window (interval, counted from origin, see windowNumbers). Empty
+    raster points are filled with the mean of the window (fill="mean") or
+    interpolated linearly between the neighbouring samples of the window
+    (fill="linear"), windows covering less than minCoverage of the raster
+    are dropped.
+
+    returns the start times of the windows, an array of shape
+    (windows, samples, columns) and the coverage of every window
+    """
+
+    if fs is None:
+        fs = samplingFrequency(df.index)
+
+    width = pd.Timedelta(interval).value
+    n = int(round(width / 10**9 * fs))
+    values = df[list(columns)].values.astype(np.float64)
+
+    numbers, origin = windowNumbers(df.index, width, origin)
+    starts, inverse = np.unique(numbers, return_inverse=True)
+    position = np.minimum(((df.index.asi8 - origin - numbers * width) * fs / 10**9).astype(np.int64), n - 1)
+
+    segments = np.full((len(starts), n, len(columns)), np.nan)
+    segments[inverse, position] = values
+
+    valid = np.isfinite(segments)
+    coverage = valid.all(axis=2).sum(axis=1) / n
+    keep = coverage >= minCoverage
+    segments, valid, starts, coverage = segments[keep], valid[keep], starts[keep], coverage[keep]
+
+    if fill == "linear":
+        # interpolate on the flattened raster, then hold the first and last
+        # sample of every window, so no window borrows from its neighbours
+        position = np.arange(n)
+        for j in range(len(columns)):
+            flat = segments[..., j].ravel()
+            known = valid[..., j].ravel()
+            if not known.any():
+                continue
+            flat = np.interp(np.arange(len(flat)), np.flatnonzero(known), flat[known]).reshape(-1, n)
+            first = np.argmax(valid[..., j], axis=1)[:, np.newaxis]
+            last = n - 1 - np.argmax(valid[..., j][:, ::-1], axis=1)[:, np.newaxis]
+            flat = np.where(position < first, np.take_along_axis(flat, first, axis=1), flat)
+            segments[..., j] = np.where(position > last, np.take_along_axis(flat, last, axis=1), flat)
+    elif fill == "mean":
+        counts = np.maximum(valid.sum(axis=1), 1)
+        means = np.where(valid, segments, 0).sum(axis=1) / counts
+        segments = np.where(valid, segments, means[:, np.newaxis, :])
+    else:
+        raise Exception("unknown fill method: {}, available methods: mean, linear".format(fill))
+
+    return windowIndex(origin + starts * width, df.index.tz), segments, coverage
+
+def welchWindows(df,
+                 columns=("pos_x", "pos_z"),
+                 interval="10min",
+                 fs=None,
+                 nperseg=None,
+                 noverlap=None,
+                 window="hann",
+                 minCoverage=0.9,
+                 fill="mean",
+                 origin=None,
+                ):
+    """
+    welchWindows(df, columns=("pos_x", "pos_z"), interval="10min", fs=None, nperseg=None, noverlap=None, window="hann", minCoverage=0.9, fill="mean", origin=None):
+
+    calculates the Welch power spectral density of every window and column
+    in one batched call. nperseg defaults to an eighth of the window,
+    noverlap to half of nperseg, see gridWindows for the windowing.
+
+    returns the start times of the windows, the frequencies, the psd of shape
+    (windows, frequencies, columns) and the coverage of every window
+    """
+
+    if fs is None:
+        fs = samplingFrequency(df.index)
+
+    index, segments, coverage = gridWindows(df, columns, interval=interval, fs=fs, minCoverage=minCoverage, fill=fill, origin=origin)
+
+    if not nperseg:
+        nperseg = max(segments.shape[1] // 8, 1)
+
+    frequencies, psd = welch(segments,
+                             fs=fs,
+                             window=window,
+                             nperseg=min(nperseg, segments.shape[1]),
+                             noverlap=noverlap,
+                             detrend="constant",
+                             axis=1,
+                            )
+
+    return index, frequencies, psd, coverage
+
+def peakFrequencies(frequencies, psd, band=None, axis=1):
+    """
+    peakFrequencies(frequencies, psd, band=None, axis=1):
+
+    finds the peak of the psd along the frequency axis within the given
+    band (lower, upper in Hz), refined by a parabola through the peak bin
+    and its neighbours
+
+    returns the peak frequencies and the psd at the peaks
+    """
+
+    psd = np.moveaxis(psd, axis, -1)
+
+    mask = np.ones(len(frequencies), dtype=bool)
+    if band is not None:
+        mask = (frequencies >= band[0]) & (frequencies <= band[1])
+    if not mask.any():
+        raise Exception("no frequencies within band: {}".format(band))
+
+    peak = np.argmax(np.where(mask, psd, -np.inf), axis=-1)[..., np.newaxis]
+    neighbours = np.clip(np.concatenate([peak - 1, peak, peak + 1], axis=-1), 0, len(frequencies) - 1)
+    a, b, c = np.moveaxis(np.take_along_axis(psd, neighbours, axis=-1), -1, 0)
+
+    curvature = a - 2 * b + c
+    with np.errstate(invalid="ignore", divide="ignore"):
+        shift = np.where(curvature < 0, 0.5 * (a - c) / curvature, 0)
+    shift = np.clip(shift, -0.5, 0.5)
+
+    peak = peak[..., 0]
+    step = frequencies[1] - frequencies[0] if len(frequencies) > 1 else 0
+
+    return frequencies[peak] + shift * step, b - 0.25 * (a - c) * shift
+
+def peakFrequencyWorker(df, columns, interval, band, **kwargs):
+    """
+    calculates the peak frequencies of all windows of one chunk, see
+    trackPeakFrequency
+    """
+
+    frame = pd.DataFrame(columns=["f_{}".format(c) for c in columns] + ["f_peak", "coverage"], dtype=np.float64)
+    if len(df) < 2:
+        return frame
+
+    index, frequencies, psd, coverage = welchWindows(df, columns, interval=interval, **kwargs)
+    if not len(index):
+        return frame
+
+    f, _ = peakFrequencies(frequencies, psd, band=band)
+    fSum, _ = peakFrequencies(frequencies, psd.sum(axis=2), band=band, axis=1)
+
+    return pd.DataFrame(np.column_stack([f, fSum, coverage]), index=index, columns=frame.columns)
+
+def trackPeakFrequency(df,
+                       columns=("pos_x", "pos_z"),
+                       interval="10min",
+                       band=(0.1, 1.0),
+                       chunkInterval="1D",
+                       nProcs=None,
+                       pool=None,
+                       verbose=False,
+                       **kwargs
+                      ):
+    """
+    trackPeakFrequency(df, columns=("pos_x", "pos_z"), interval="10min", band=(0.1, 1.0), chunkInterval="1D", nProcs=None, pool=None, **kwargs):
+
+    tracks the peak frequency (e.g. the first eigenfrequency of the tower)
+    within band over time: the data is split into chunks (chunkInterval, a
+    multiple of interval) which are processed in a pool of workers, every
+    window of every chunk gets its Welch psd (kwargs are passed to
+    welchWindows). The sampling frequency and the window origin are set once
+    for all chunks.
+
+    returns a dataframe indexed by the window start with the peak frequency
+    of every column (f_<column>), of the summed psd of all columns (f_peak)
+    and the coverage of the window
+    """
+
+    if "fs" not in kwargs or kwargs["fs"] is None:
+        kwargs["fs"] = samplingFrequency(df.index)
+    # all chunks count their windows from the same origin
+    if kwargs.get("origin") is None:
+        kwargs["origin"] = windowOrigin(df.index)
+
+    chunks = [c for t, c in df[list(columns)].resample(chunkInterval) if not c.empty]
+
+    if verbose: print("* tracking peak frequency of {} chunks, fs = {:.3f} Hz".format(len(chunks), kwargs["fs"]))
+
+    worker = partial(peakFrequencyWorker, columns=columns, interval=interval, band=band, **kwargs)
+
+    results = list(mapOrdered(worker, chunks, len(chunks), nProcs=nProcs, pool=pool))
+
+    if not results:
+        return peakFrequencyWorker(df.iloc[:0], columns, interval, band)
+
+    return pd.concat(results).sort_index()
+
+# available per window statistics, see windowStatistics
+STATISTICS = ("count", "mean", "std", "rms", "min", "max")
+
+def statisticsColumns(columns, statistics=STATISTICS, percentiles=(), thresholds=()):
+    """
+    returns the column names of the statistics of the given columns:
+    <column>_<statistic>, <column>_p<percentile> and <column>_exceed_<threshold>
+    """
+
+    names = list()
+    for c in columns:
+        names += ["{}_{}".format(c, s) for s in statistics]
+        names += ["{}_p{:g}".format(c, q) for q in percentiles]
+        names += ["{}_exceed_{:g}".format(c, t) for t in thresholds]
+
+    return names
+
+def windowStatistics(df,
+                     columns=None,
+                     interval="10min",
+                     statistics=("mean", "std", "rms", "min", "max"),
+                     percentiles=(),
+                     thresholds=(),
+                     origin=None,
+                    ):
+    """
+    windowStatistics(df, columns=None, interval="10min", statistics=("mean", "std", "rms", "min", "max"), percentiles=(), thresholds=(), origin=None):
+
+    calculates the given statistics (see STATISTICS), percentiles (0 - 100,
+    linear interpolation as np.percentile) and exceedance counts (number of
+    samples above every threshold) of all columns and all windows
+    (interval, counted from origin, see windowNumbers) of a time sorted
+    dataframe at once, without grouping in pandas. Columns default to the
+    positions and the deflection, missing values are ignored. Mean, std and
+    rms come from the moments of every window (momentsOf), a single pass
+    over the data.
+
+    returns a dataframe indexed by the window start, see statisticsColumns
+    """
+
+    if columns is None:
+        columns = [c for c in df.columns if c.startswith("pos_") or c == "deflection"]
+    columns = list(columns)
+
+    unknown = [s for s in statistics if s not in STATISTICS]
+    if unknown:
+        raise Exception("unknown statistics: {}, available statistics: {}".format(unknown, STATISTICS))
+
+    names = statisticsColumns(columns, statistics, percentiles, thresholds)
+    if df.empty:
+        return pd.DataFrame(columns=names, dtype=np.float64)
+
+    width = pd.Timedelta(interval).value
+    windowIds, origin = windowNumbers(df.index, width, origin)
+    starts = np.flatnonzero(np.r_[True, windowIds[1:] != windowIds[:-1]])
+    inverse = np.cumsum(np.r_[False, windowIds[1:] != windowIds[:-1]])
+
+    values = df[columns].values.astype(np.float64)
+    finite = np.isfinite(values)
+
+    count, mean, m2 = momentsOf(values, starts)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(count > 0, mean, np.nan)
+        results = {"count": count.astype(np.float64),
+                   "mean": mean,
+                   "std": np.sqrt(m2 / (count - 1)),
+                   "rms": np.sqrt(mean ** 2 + m2 / count),
+                   "min": np.where(count > 0, np.minimum.reduceat(np.where(finite, values, np.inf), starts, axis=0), np.nan),
+                   "max": np.where(count > 0, np.maximum.reduceat(np.where(finite, values, -np.inf), starts, axis=0), np.nan),
+                  }
+
+    for q in percentiles:
+        results["p{:g}".format(q)] = np.empty_like(mean)
+    if percentiles:
+        for j in range(len(columns)):
+            # sort by window, then by value, missing values last in every window
+            ordered = values[np.lexsort((values[:, j], inverse)), j]
+            for q in percentiles:
+                position = starts + q / 100 * np.maximum(count[:, j] - 1, 0)
+                lower = np.floor(position).astype(np.int64)
+                upper = np.ceil(position).astype(np.int64)
+                percentile = ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+                results["p{:g}".format(q)][:, j] = np.where(count[:, j] > 0, percentile, np.nan)
+
+    for t in thresholds:
+        results["exceed_{:g}".format(t)] = np.add.reduceat(values > t, starts, axis=0).astype(np.float64)
+
+    keys = list(statistics) + ["p{:g}".format(q) for q in percentiles] + ["exceed_{:g}".format(t) for t in thresholds]
+    table = np.stack([results[key] for key in keys], axis=-1).reshape(len(starts), -1)
+
+    return pd.DataFrame(table, index=windowIndex(origin + windowIds[starts] * width, df.index.tz), columns=names)
+
+def statisticsAccumulator(**kwargs):
+    """
+    statisticsAccumulator(**kwargs):
+
+    creates the state of a streaming statistics accumulator, kwargs are
+    passed to windowStatistics. Feed time ordered chunks (e.g. from
+    iterIntegration) with accumulateStatistics and collect the result with
+    finalizeStatistics. Only the samples of the last, still open window are
+    kept between chunks, the window origin is taken from the first chunk.
+
+    returns the state dict
+    """
+
+    return {"options": dict(kwargs),
+            "width": pd.Timedelta(kwargs.get("interval", "10min")).value,
+            "pending": None,
+            "results": list(),
+           }
+
+def accumulateStatistics(state, df):
+    """
+    accumulateStatistics(state, df):
+
+    adds a time ordered chunk to a statisticsAccumulator, the statistics of
+    all windows completed by the chunk are calculated
+
+    returns the statistics of the completed windows
+    """
+
+    if state["pending"] is not None:
+        df = pd.concat([state["pending"], df])
+    if df.empty:
+        state["pending"] = df
+        return windowStatistics(df, **state["options"])
+
+    if state["options"].get("origin") is None:
+        state["options"]["origin"] = windowOrigin(df.index)
+
+    # the window of the last sample may continue in the next chunk
+    origin = state["options"]["origin"]
+    last = origin + (df.index.asi8[-1] - origin) // state["width"] * state["width"]
+    split = np.searchsorted(df.index.asi8, last, side="left")
+
+    completed = windowStatistics(df.iloc[:split], **state["options"])
+    state["pending"] = df.iloc[split:]
+    state["results"].append(completed)
+
+    return completed
+
+def finalizeStatistics(state):
+    """
+    finalizeStatistics(state):
+
+    closes the last window of a statisticsAccumulator
+
+    returns the statistics of all windows
+    """
+
+    if state["pending"] is not None and not state["pending"].empty:
+        state["results"].append(windowStatistics(state["pending"], **state["options"]))
+        state["pending"] = None
+
+    results = [r for r in state["results"] if not r.empty]
+    if not results:
+        return windowStatistics(pd.DataFrame(), **state["options"]) if state["options"].get("columns") else pd.DataFrame()
+
+    return pd.concat(results)
+
+def turningPoints(values):
+    """
+    extracts the turning points (local extrema, first and last sample) of
+    a series, missing values and plateaus are removed
+
+    returns the values of the turning points
+    """
+
+    values = np.asarray(values, dtype=np.float64)
+    values = values[np.isfinite(values)]
+    if len(values) < 3:
+        return values
+
+    # drop plateaus, then keep the points where the slope changes its sign
+    values = values[np.r_[True, np.diff(values) != 0]]
+    slope = np.sign(np.diff(values))
+    turning = np.r_[True, slope[1:] != slope[:-1], True]
+
+    return values[turning]
+
+def rainflowLoop(points, ranges, means, counts):
+    """
+    rainflowLoop(points, ranges, means, counts):
+
+    three point rainflow counting (ASTM E1049) of a series of turning
+    points. The stack and the cycle arrays (ranges, means, counts, at
+    least len(points) long) are preallocated, nothing is allocated per
+    cycle. Residual ranges are counted as half cycles.
+
+    plain python, compiled with numba if available (jitRainflowLoop)
+
+    returns the number of cycles written
+    """
+
+    stack = np.empty(len(points), dtype=np.float64)
+    top = 0
+    n = 0
+
+    for i in range(len(points)):
+        stack[top] = points[i]
+        top += 1
+
+        while top >= 3:
+            x = abs(stack[top - 1] - stack[top - 2])
+            y = abs(stack[top - 2] - stack[top - 3])
+            if x < y:
+                break
+
+            ranges[n] = y
+            means[n] = 0.5 * (stack[top - 2] + stack[top - 3])
+            if top == 3:
+                # y contains the first point: half cycle, drop the first point
+                counts[n] = 0.5
+                stack[0] = stack[1]
+                stack[1] = stack[2]
+                top = 2
+            else:
+                # full cycle, drop both points of y
+                counts[n] = 1.0
+                stack[top - 3] = stack[top - 1]
+                top -= 2
+            n += 1
+
+    for j in range(top - 1):
+        ranges[n] = abs(stack[j + 1] - stack[j])
+        means[n] = 0.5 * (stack[j + 1] + stack[j])
+        counts[n] = 0.5
+        n += 1
+
+    return n
+
+# compiled per process: numba's on-disk cache records the module name, which
+# differs between the bin scripts (stats) and package imports (yasb.stats)
+jitRainflowLoop = njit(nogil=True)(rainflowLoop) if njit is not None else None
+
+def rainflow(values):
+    """
+    rainflow(values):
+
+    rainflow counting of a series, see turningPoints and rainflowLoop
+
+    returns the ranges, means and counts (0.5 or 1) of all cycles
+    """
+
+    points = turningPoints(values)
+
+    ranges = np.empty(max(len(points), 1), dtype=np.float64)
+    means = np.empty_like(ranges)
+    counts = np.empty_like(ranges)
+
+    n = None
+    if jitRainflowLoop is not None:
+        try:
+            n = jitRainflowLoop(points, ranges, means, counts)
+        except Exception as e:
+            print("*! could not compile the rainflow counting, using python -> {}".format(e))
+    if n is None:
+        n = rainflowLoop(points, ranges, means, counts)
+
+    return ranges[:n], means[:n], counts[:n]
+
+def damageEquivalentLoad(ranges, counts, exponent=4, equivalentCycles=600):
+    """
+    damageEquivalentLoad(ranges, counts, exponent=4, equivalentCycles=600):
+
+    calculates the damage equivalent load (range) of rainflow cycles for
+    the given Wöhler exponent (m), i.e. the constant range that causes the
+    same damage in equivalentCycles cycles (e.g. 1 Hz over 10 minutes):
+
+        DEL = (sum(n_i * S_i^m) / N_eq)^(1 / m)
+
+    returns the damage equivalent load
+    """
+
+    return (np.sum(counts * ranges ** exponent) / equivalentCycles) ** (1 / exponent)
+
+def fatigueWorker(df, columns, interval, rangeEdges, exponents, equivalentFrequency, origin=None):
+    """
+    counts the cycles of all windows of one chunk, see fatigueWindows
+
+    returns the window starts, the damage equivalent loads of shape
+    (windows, columns, exponents) and the histograms of shape
+    (windows, columns, bins)
+    """
+
+    width = pd.Timedelta(interval).value
+    values = df[list(columns)].values.astype(np.float64)
+    windowIds, origin = windowNumbers(df.index, width, origin)
+    starts = np.flatnonzero(np.r_[True, windowIds[1:] != windowIds[:-1]]) if len(df) else np.empty(0, dtype=np.int64)
+    ends = np.r_[starts[1:], len(df)]
+
+    dels = np.full((len(starts), len(columns), len(exponents)), np.nan)
+    histograms = np.zeros((len(starts), len(columns), rangeEdges.shape[1] - 1), dtype=np.float64)
+
+    for w, (start, end) in enumerate(zip(starts, ends)):
+        for j in range(len(columns)):
+            ranges, means, counts = rainflow(values[start:end, j])
+            if not len(ranges):
+                continue
+            for e, exponent in enumerate(exponents):
+                dels[w, j, e] = damageEquivalentLoad(ranges, counts, exponent, equivalentFrequency * width / 10**9)
+            histograms[w, j] = np.histogram(ranges, bins=rangeEdges[j], weights=counts)[0]
+
+    return origin + windowIds[starts] * width, dels, histograms
+
+def fatigueWindows(df,
+                   columns=None,
+                   interval="10min",
+                   exponents=(4,),
+                   rangeBins=64,
+                   equivalentFrequency=1.0,
+                   chunkInterval="1D",
+                   nProcs=None,
+                   pool=None,
+                   verbose=False,
+                  ):
+    """
+    fatigueWindows(df, columns=None, interval="10min", exponents=(4,), rangeBins=64, equivalentFrequency=1.0, chunkInterval="1D", nProcs=None, pool=None):
+
+    rainflow counts every window (interval) and column (default: positions
+    and deflection, e.g. the output of applyIntegration) and calculates the
+    damage equivalent loads for all Wöhler exponents, with equivalentFrequency
+    (Hz) times the window length as the number of equivalent cycles. The
+    cycles are collected in range histograms with rangeBins equal bins from
+    0 to the largest possible range (max - min) of every column, or with the
+    given bin edges. Chunks of chunkInterval are processed in a pool of
+    workers.
+
+    returns a dataframe indexed by the window start with the damage
+    equivalent loads (<column>_del_m<exponent>), the histograms of shape
+    (windows, columns, bins) and the bin edges of shape (columns, bins + 1)
+    """
+
+    if columns is None:
+        columns = [c for c in df.columns if c.startswith("pos_") or c == "deflection"]
+    columns = list(columns)
+    names = ["{}_del_m{:g}".format(c, e) for c in columns for e in exponents]
+
+    if np.ndim(rangeBins) == 0:
+        spans = np.nan_to_num((df[columns].max() - df[columns].min()).values.astype(np.float64))
+        rangeEdges = np.stack([np.linspace(0, span if span > 0 else 1, int(rangeBins) + 1) for span in spans])
+    else:
+        rangeEdges = np.tile(np.asarray(rangeBins, dtype=np.float64), (len(columns), 1))
+
+    chunks = [c for t, c in df[columns].resample(chunkInterval) if not c.empty]
+
+    if verbose: print("* rainflow counting {} columns in {} chunks".format(len(columns), len(chunks)))
+
+    worker = partial(fatigueWorker,
+                     columns=columns,
+                     interval=interval,
+                     rangeEdges=rangeEdges,
+                     exponents=tuple(exponents),
+                     equivalentFrequency=equivalentFrequency,
+                     origin=windowOrigin(df.index),
+                    )
+
+    results = list(mapOrdered(worker, chunks, len(chunks), nProcs=nProcs, pool=pool))
+
+    if not results:
+        return pd.DataFrame(columns=names, dtype=np.float64), np.empty((0, len(columns), rangeEdges.shape[1] - 1)), rangeEdges
+
+    starts = np.concatenate([r[0] for r in results])
+    dels = np.concatenate([r[1] for r in results])
+    histograms = np.concatenate([r[2] for r in results])
+
+    return pd.DataFrame(dels.reshape(len(starts), -1), index=windowIndex(starts, df.index.tz), columns=names), histograms, rangeEdges
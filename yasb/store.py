@@ -0,0 +1,225 @@
+"""
+module containing a partitioned, columnar store for campaign data
+
+Data is kept as one parquet file per source and (UTC) day:
+
+    <storeDir>/<source>/<YYYY-MM-DD>.parquet
+
+Reading a store only touches the days within the requested time range, only
+loads the requested columns and pushes the time range down to the parquet
+reader, hence selecting one day and a few columns of a multi-month campaign
+does not require loading the whole campaign.
+
+requires pyarrow
+"""
+
+import pandas as pd
+from os import path
+from os import makedirs
+from glob import glob
+
+# known data sources, one sub directory per source
+SOURCES = ("tom", "integrated", "lidar", "waves", "msr")
+
+# name of the time column within the parquet files
+TIMECOLUMN = "time"
+
+def checkPyArrow():
+    """
+    checks if pyarrow is available, raises an exception if not
+    """
+
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise Exception("the campaign store requires pyarrow -> pip install pyarrow")
+
+def sourceDir(storeDir, source):
+    """
+    returns the directory of the given source within the store
+    """
+
+    if source not in SOURCES:
+        raise Exception("unknown source: {}, available sources: {}".format(source, SOURCES))
+
+    return path.join(storeDir, source)
+
+def toUTC(timeStamp, timeZone="Europe/Berlin"):
+    """
+    converts a time stamp (string or pd.Timestamp) to a UTC pd.Timestamp, naive
+    time stamps are localized to the given time zone first
+    """
+
+    timeStamp = pd.Timestamp(timeStamp)
+    if timeStamp.tzinfo is None:
+        timeStamp = timeStamp.tz_localize(timeZone)
+
+    return timeStamp.tz_convert("UTC")
+
+def dayFiles(storeDir, source, start=None, end=None):
+    """
+    lists all day files of a given source, optionally only the days
+    within [start, end]
+
+    returns a sorted list of file paths
+    """
+
+    files = sorted(glob(path.join(sourceDir(storeDir, source), "????-??-??.parquet")))
+
+    if start is not None:
+        startDay = "{}.parquet".format(toUTC(start).strftime("%Y-%m-%d"))
+        files = [f for f in files if path.basename(f) >= startDay]
+
+    if end is not None:
+        endDay = "{}.parquet".format(toUTC(end).strftime("%Y-%m-%d"))
+        files = [f for f in files if path.basename(f) <= endDay]
+
+    return files
+
+def writeStore(data, storeDir, source, append=True, verbose=False):
+    """
+    writeStore(data, storeDir, source, append=True):
+
+    splits the given time indexed dataframe into UTC days and writes one
+    parquet file per day. If append is True, data of already existing days
+    is merged with the new data (duplicated time stamps keep the new data),
+    otherwise existing days are overwritten.
+
+    returns the list of written files
+    """
+
+    checkPyArrow()
+
+    if data.empty:
+        if verbose: print("*! empty dataframe, nothing to store")
+        return list()
+
+    if not isinstance(data.index, pd.DatetimeIndex):
+        raise Exception("data needs a DatetimeIndex to be stored")
+
+    targetDir = sourceDir(storeDir, source)
+    makedirs(targetDir, exist_ok=True)
+
+    data = data.copy(deep=False)
+    if data.index.tz is None:
+        data.index = data.index.tz_localize("UTC")
+    data.index = data.index.tz_convert("UTC").rename(TIMECOLUMN)
+
+    written = list()
+    for day, dayData in data.groupby(data.index.floor("D")):
+        dayFile = path.join(targetDir, "{}.parquet".format(day.strftime("%Y-%m-%d")))
+
+        if append and path.isfile(dayFile):
+            if verbose: print("*    merging {}".format(dayFile))
+            dayData = pd.concat([pd.read_parquet(dayFile), dayData])
+            dayData = dayData.loc[~dayData.index.duplicated(keep="last")]
+
+        dayData = dayData.sort_index()
+
+        if verbose: print("*    writing {} rows to {}".format(len(dayData), dayFile))
+        dayData.to_parquet(dayFile, engine="pyarrow")
+        written.append(dayFile)
+
+    return written
+
+def readStore(storeDir, source, start=None, end=None, columns=None, timeZone="Europe/Berlin", verbose=False):
+    """
+    readStore(storeDir, source, start=None, end=None, columns=None, timeZone="Europe/Berlin"):
+
+    reads the data of a given source from the store. Only the day files
+    overlapping [start, end] are opened, only the given columns are read and
+    the time range is pushed down to the parquet reader so that row groups
+    outside the range are skipped.
+
+    returns a time indexed dataframe in the given time zone
+    """
+
+    checkPyArrow()
+
+    if start is not None:
+        start = toUTC(start, timeZone)
+    if end is not None:
+        end = toUTC(end, timeZone)
+
+    files = dayFiles(storeDir, source, start, end)
+
+    if not files:
+        if verbose: print("*! no {} data found in {}".format(source, storeDir))
+        return pd.DataFrame(columns=columns)
+
+    filters = list()
+    if start is not None:
+        filters.append((TIMECOLUMN, ">=", start))
+    if end is not None:
+        filters.append((TIMECOLUMN, "<=", end))
+
+    if columns is not None:
+        columns = [c for c in columns if c != TIMECOLUMN] + [TIMECOLUMN]
+
+    frames = list()
+    for dayFile in files:
+        if verbose: print("*    reading {}".format(dayFile))
+        frames.append(pd.read_parquet(dayFile,
+                                      engine="pyarrow",
+                                      columns=columns,
+                                      filters=filters if filters else None,
+                                     ))
+
+    data = pd.concat(frames)
+
+    if TIMECOLUMN in data.columns:
+        data.set_index(TIMECOLUMN, inplace=True)
+
+    if timeZone:
+        data.index = data.index.tz_convert(timeZone)
+
+    return data
+
+def storeSources(storeDir):
+    """
+    returns the sources available in a given store
+    """
+
+    return [s for s in SOURCES if path.isdir(path.join(storeDir, s))]
+
+def writeTOM(data, storeDir, verbose=False):
+    """
+    writes measurements from a yasb device (genTOMPickle.py) to the store
+    """
+
+    return writeStore(data, storeDir, "tom", verbose=verbose)
+
+def writeIntegrated(data, storeDir, verbose=False):
+    """
+    writes filtered and integrated yasb data (processPickle.py) to the store
+    """
+
+    return writeStore(data, storeDir, "integrated", verbose=verbose)
+
+def writeLIDAR(data, storeDir, verbose=False):
+    """
+    writes LIDAR data (genLIDARPickle.py) to the store
+    """
+
+    return writeStore(data, storeDir, "lidar", verbose=verbose)
+
+def writeWaves(data, storeDir, verbose=False):
+    """
+    writes wave buoy data (genWavesPickle.py) to the store. Non numeric columns
+    are converted to strings, as parquet requires a single type per column
+    """
+
+    data = data.copy()
+    for c in data.columns:
+        if data[c].dtype == object:
+            data[c] = data[c].astype(str)
+
+    return writeStore(data, storeDir, "waves", verbose=verbose)
+
+def writeMSR(data, storeDir, verbose=False):
+    """
+    writes measurements from a MSR data logger (genMSRPickle.py) to the store
+    """
+
+    return writeStore(data, storeDir, "msr", verbose=verbose)
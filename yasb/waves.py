@@ -0,0 +1,184 @@
+"""
+module containing methods for working with wave data (e.g. the bulk
+parameters of genWavesPickle.py or the output of fuse.py):
+
+- parametric wave spectra (Pierson-Moskowitz, JONSWAP) of all wave records
+  at once
+- transfer functions between the wave excitation and the tower response
+
+Spectra are one-sided, in m^2/Hz over the frequency f in Hz, and are
+calculated for all records at once as arrays of shape (records, frequencies).
+"""
+
+import numpy as np
+import pandas as pd
+# works as part of the yasb package and flat with yasb/ on sys.path (bin scripts)
+try:
+    from .stats import welchWindows, windowNumbers, windowOrigin
+except ImportError:
+    from stats import welchWindows, windowNumbers, windowOrigin
+
+# available parametric spectra, see waveSpectra
+SPECTRA = ("jonswap", "pm")
+
+def piersonMoskowitz(frequencies, Hs, Tp):
+    """
+    piersonMoskowitz(frequencies, Hs, Tp):
+
+    Pierson-Moskowitz spectra for arrays of significant wave heights (m)
+    and peak periods (s):
+
+        S(f) = 5 / 16 Hs^2 fp^4 f^-5 exp(-5 / 4 (fp / f)^4)
+
+    returns an array of shape (records, frequencies)
+    """
+
+    f = np.asarray(frequencies, dtype=np.float64)[np.newaxis, :]
+    Hs = np.atleast_1d(np.asarray(Hs, dtype=np.float64))[:, np.newaxis]
+    fp = 1 / np.atleast_1d(np.asarray(Tp, dtype=np.float64))[:, np.newaxis]
+
+    with np.errstate(divide="ignore", over="ignore", invalid="ignore"):
+        spectra = 5 / 16 * Hs ** 2 * fp ** 4 / f ** 5 * np.exp(-5 / 4 * (fp / f) ** 4)
+
+    return np.where(f > 0, spectra, 0)
+
+def jonswapGamma(Hs, Tp):
+    """
+    peak enhancement factors of the JONSWAP spectrum from the significant
+    wave height (m) and the peak period (s) as recommended by DNV-RP-C205
+    """
+
+    ratio = np.asarray(Tp, dtype=np.float64) / np.sqrt(np.asarray(Hs, dtype=np.float64))
+
+    return np.where(ratio <= 3.6, 5.0, np.where(ratio >= 5, 1.0, np.exp(5.75 - 1.15 * ratio)))
+
+def jonswap(frequencies, Hs, Tp, gamma=3.3, sigmaA=0.07, sigmaB=0.09):
+    """
+    jonswap(frequencies, Hs, Tp, gamma=3.3, sigmaA=0.07, sigmaB=0.09):
+
+    JONSWAP spectra for arrays of significant wave heights (m), peak
+    periods (s) and peak enhancement factors (a scalar, an array or "dnv",
+    see jonswapGamma). The Pierson-Moskowitz spectrum is enhanced around
+    the peak and scaled by the normalizing factor 1 - 0.287 ln(gamma).
+
+    returns an array of shape (records, frequencies)
+    """
+
+    if isinstance(gamma, str):
+        if gamma != "dnv":
+            raise Exception("unknown peak enhancement factor: {}, use a number or dnv".format(gamma))
+        gamma = jonswapGamma(Hs, Tp)
+
+    f = np.asarray(frequencies, dtype=np.float64)[np.newaxis, :]
+    fp = 1 / np.atleast_1d(np.asarray(Tp, dtype=np.float64))[:, np.newaxis]
+    gamma = np.broadcast_to(np.asarray(gamma, dtype=np.float64), fp.shape[:1])[:, np.newaxis]
+
+    sigma = np.where(f <= fp, sigmaA, sigmaB)
+    enhancement = gamma ** np.exp(-(f - fp) ** 2 / (2 * sigma ** 2 * fp ** 2))
+
+    return (1 - 0.287 * np.log(gamma)) * piersonMoskowitz(frequencies, Hs, Tp) * enhancement
+
+def waveSpectra(waves, frequencies, spectrum="jonswap", gamma=3.3):
+    """
+    waveSpectra(waves, frequencies, spectrum="jonswap", gamma=3.3):
+
+    builds the parametric spectra (see SPECTRA) of all records of a wave
+    dataframe with the significant wave height (Hm0 as in genWavesPickle.py
+    or Hs as in fuse.py) and the peak period (Tp). Records without valid
+    parameters get NaN spectra.
+
+    returns an array of shape (records, frequencies)
+    """
+
+    if spectrum not in SPECTRA:
+        raise Exception("unknown spectrum: {}, available spectra: {}".format(spectrum, SPECTRA))
+
+    height = "Hs" if "Hs" in waves.columns else "Hm0"
+    missing = [c for c in (height, "Tp") if c not in waves.columns]
+    if missing:
+        raise Exception("wave spectra require the columns: {}".format(missing))
+
+    Hs = waves[height].values.astype(np.float64)
+    Tp = waves["Tp"].values.astype(np.float64)
+    valid = np.isfinite(Hs) & np.isfinite(Tp) & (Hs > 0) & (Tp > 0)
+    Hs, Tp = np.where(valid, Hs, 1), np.where(valid, Tp, 1)
+
+    if spectrum == "pm":
+        spectra = piersonMoskowitz(frequencies, Hs, Tp)
+    else:
+        spectra = jonswap(frequencies, Hs, Tp, gamma=gamma)
+
+    return np.where(valid[:, np.newaxis], spectra, np.nan)
+
+def spectralMoment(frequencies, spectra, order=0):
+    """
+    calculates the spectral moments m_n = int f^n S(f) df of spectra of
+    shape (records, frequencies), e.g. Hs = 4 sqrt(m0)
+    """
+
+    return np.trapz(spectra * np.asarray(frequencies, dtype=np.float64) ** order, frequencies, axis=-1)
+
+def transferFunctions(fused,
+                      columns=("pos_x", "pos_z"),
+                      interval="10min",
+                      spectrum="jonswap",
+                      gamma=3.3,
+                      band=None,
+                      threshold=1e-3,
+                      minCoverage=0.4,
+                      **kwargs
+                     ):
+    """
+    transferFunctions(fused, columns=("pos_x", "pos_z"), interval="10min", spectrum="jonswap", gamma=3.3, band=None, threshold=1e-3, minCoverage=0.4, **kwargs):
+
+    estimates the transfer functions between the wave excitation and the
+    measured tower response for every window of a fused dataframe (fuse.py)
+    in one batched computation: the response spectra of all windows and
+    columns come from one Welch call (see welchWindows, kwargs are passed
+    on, gaps are interpolated linearly), the wave spectra of all windows
+    from the bulk parameters at the start of the windows. The amplitude of
+    the transfer function is
+
+        |H(f)| = sqrt(S_response(f) / S_waves(f))
+
+    and is only evaluated where the wave spectrum exceeds threshold times
+    its peak and within band (lower, upper in Hz), NaN elsewhere.
+
+    returns the start times of the windows, the frequencies and the
+    transfer functions of shape (windows, frequencies, columns)
+    """
+
+    columns = list(columns)
+    kwargs.setdefault("fill", "linear")
+    # response and wave windows are counted from the same origin
+    if kwargs.get("origin") is None:
+        kwargs["origin"] = windowOrigin(fused.index)
+
+    index, frequencies, response, coverage = welchWindows(fused,
+                                                          columns,
+                                                          interval=interval,
+                                                          minCoverage=minCoverage,
+                                                          **kwargs
+                                                         )
+
+    if not len(index):
+        return index, frequencies, np.empty((0, len(frequencies), len(columns)))
+
+    # bulk wave parameters of every window (first record within the window)
+    width = pd.Timedelta(interval).value
+    waves = fused.drop(columns=columns, errors="ignore")
+    windowIds, origin = windowNumbers(waves.index, width, kwargs["origin"])
+    first = np.r_[True, windowIds[1:] != windowIds[:-1]]
+    waves = waves.iloc[np.flatnonzero(first)].set_axis(windowIds[first], axis=0)
+    waves = waves.reindex((index.asi8 - origin) // width)
+
+    excitation = waveSpectra(waves, frequencies, spectrum=spectrum, gamma=gamma)
+
+    mask = excitation > threshold * np.nanmax(excitation, axis=1, initial=0)[:, np.newaxis]
+    if band is not None:
+        mask &= (frequencies >= band[0]) & (frequencies <= band[1])
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        transfer = np.sqrt(response / excitation[..., np.newaxis])
+
+    return index, frequencies, np.where(mask[..., np.newaxis], transfer, np.nan)